@@ -39,11 +39,26 @@ import os
 # Biblioteca para leitura e escrita de arquivos CSV (Comma Separated Values)
 import csv
 
+# Arquivos em memória (texto lido de uma fatia do CSV)
+import io
+
+# Funções matemáticas (comparação de floats com tolerância, custos em log)
+import math
+
+# Expressões regulares (separar descrições em palavras)
+import re
+
+# Serialização binária (snapshot das estruturas em disco)
+import pickle
+
+# Hash do conteúdo do CSV (detecta arquivo alterado)
+import hashlib
+
 # Biblioteca para trabalhar com dados em formato JSON (não usada no projeto atual)
 import json
 
 # Classe para trabalhar com datas e horários
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Estruturas de dados especiais do Python:
 # - defaultdict: dicionário que cria valores padrão automaticamente
@@ -56,340 +71,4512 @@ from collections import defaultdict, Counter
 # - Tuple: tupla tipada
 # - Optional: valor que pode ser None
 # - Any: qualquer tipo de dado
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Callable, Iterator
 
 # Biblioteca para controle do sistema (usado para sair do programa)
 import sys
 
+# Pool de processos para carregar o CSV usando vários núcleos
+from concurrent.futures import ProcessPoolExecutor
+
+# Funções auxiliares rápidas (executam em C dentro de map()):
+# - itemgetter/methodcaller: extraem uma coluna de cada linha
+# - mul: multiplicação (quantidade × preço)
+# - islice: fatia um iterador sem criar listas (processamento em blocos)
+# - compress: filtra uma coluna com uma máscara de verdadeiros/falsos
+# - filterfalse: descarta posições marcadas como removidas
+# - chain: junta várias listas de posições sem criar listas intermediárias
+# - eq, lt, ...: operadores de comparação como funções (consultas)
+from operator import itemgetter, methodcaller, mul, eq, ne, lt, le, gt, ge
+from itertools import islice, compress, filterfalse, chain, combinations, accumulate
+
+# Arrays tipados da biblioteca padrão (armazenamento colunar compacto)
+from array import array
+
+# Classe base abstrata para objetos que se comportam como dicionários
+from collections.abc import Mapping
+
+# Busca binária em sequências ordenadas (índice ordenado por valor)
+from bisect import bisect_left, bisect_right, insort
+
+# Heap: os K menores/maiores sem ordenar tudo (consultas com limite)
+import heapq
+
+# Sorteio da metade que sobe em cada compactação do sketch de quantis
+import random
+
+# Chamada adiada com argumentos já fixados (fontes do plano de consulta)
+from functools import partial, lru_cache
+
 
 # ============================================================================
-# CLASSE DATASTRUCTURE - Organização das Estruturas de Dados
+# ARMAZENAMENTO COLUNAR - Vendas guardadas por coluna em vez de por linha
 # ============================================================================
 
-class DataStructure:
+# 📋 CAMPOS DE UMA VENDA (mesma ordem do dicionário criado em adicionar_venda):
+CAMPOS_VENDA: Tuple[str, ...] = (
+    'invoice_no', 'stock_code', 'description', 'quantity',
+    'invoice_date', 'unit_price', 'customer_id', 'country', 'total'
+)
+
+# 🔢 CAMPOS NUMÉRICOS E SEUS TIPOS DE ARRAY:
+# - 'q': inteiro de 64 bits (quantidades podem passar de 80.000)
+# - 'd': float de 64 bits (mesma precisão do float do Python)
+TIPOS_NUMERICOS: Dict[str, str] = {
+    'quantity': 'q',
+    'unit_price': 'd',
+    'total': 'd'
+}
+
+# ✏️ CAMPOS ALTERÁVEIS E SUAS CONVERSÕES (as mesmas de adicionar_venda):
+# - total é derivado; as demais colunas são chaves de índices e agregados
+CONVERSORES_ALTERACAO: Dict[str, Callable[[Any], Any]] = {
+    'quantity': lambda valor: int(float(valor)),
+    'unit_price': float,
+    'description': str
+}
+
+
+class ColunaCodificada:
     """
-      Estruturas de Dados Organizadas
-    
-    Esta classe demonstra como organizar dados usando as estruturas corretas:
-    - LISTAS: Para dados ordenados e pesquisáveis
-    - DICIONÁRIOS: Para acesso rápido por chave
-    - TUPLAS: Para dados imutáveis (que não mudam)
-    - CONTADORES: Para estatísticas automáticas
-    
-    💡 CONCEITO: Cada estrutura tem seu propósito específico!
+      Coluna de Texto com Codificação por Dicionário
+
+    Demonstra:
+    - Cada texto distinto é guardado UMA única vez em `valores`
+    - Cada linha guarda apenas um código inteiro (4 bytes) em `codigos`
+    - Ideal para colunas que se repetem muito (país, fatura, produto)
     """
-    
+
+    __slots__ = ('codigos', 'valores', '_codigo_por_valor')
+
     def __init__(self):
+        self.codigos = array('I')                  # Um código por linha
+        self.valores: List[str] = []               # Código -> texto
+        self._codigo_por_valor: Dict[str, int] = {}  # Texto -> código
+
+    def codificar(self, valor: str) -> int:
+        """Retorna o código do texto, criando um novo se ainda não existir"""
+        codigo = self._codigo_por_valor.get(valor)
+        if codigo is None:
+            codigo = len(self.valores)
+            self.valores.append(valor)
+            self._codigo_por_valor[valor] = codigo
+        return codigo
+
+    def append(self, valor: str) -> str:
+        """Adiciona o texto e retorna a cópia única guardada na coluna"""
+        codigo = self.codificar(valor)
+        self.codigos.append(codigo)
+        return self.valores[codigo]
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def __getitem__(self, indice: int) -> str:
+        return self.valores[self.codigos[indice]]
+
+    def __setitem__(self, indice: int, valor: str):
+        self.codigos[indice] = self.codificar(valor)
+
+    def __delitem__(self, indice: int):
+        del self.codigos[indice]
+
+    def estender_valores(self, valores: List[str]) -> None:
         """
-        🏗️ CONSTRUTOR DA CLASSE
-        
-        Aqui inicializamos todas as estruturas de dados que vamos usar.
-        O __init__ é chamado automaticamente quando criamos um objeto.
+        Anexa vários textos de uma vez.
+
+        Os textos novos são cadastrados primeiro (dict.fromkeys elimina
+        repetições mantendo a ordem); depois todos os códigos são obtidos
+        com map() direto sobre o dicionário, sem chamada Python por linha.
         """
-        
-        # ====================================================================
-        # ESTRUTURAS PRINCIPAIS DE DADOS
-        # ====================================================================
-        
-        # 📝 LISTA DE VENDAS:
-        # - Por que lista? Porque precisamos manter a ordem das vendas
-        # - Por que List[Dict[str, Any]]? Cada venda é um dicionário com dados
-        # - Exemplo: [{'invoice_no': '001', 'total': 100.0}, {...}]
-        self.vendas: List[Dict[str, Any]] = []
-        
-        # 📦 DICIONÁRIO DE PRODUTOS:
-        # - Por que dicionário? Para buscar produtos rapidamente pelo código
-        # - Estrutura: {'PROD001': {'description': 'Produto 1', 'vendas': 10}}
-        # - Acesso rápido: O(1) vs O(n) em lista
-        self.produtos: Dict[str, Dict[str, Any]] = {}
-        
-        # 👥 DICIONÁRIO DE CLIENTES:
-        # - Similar aos produtos, mas indexado por ID do cliente
-        # - Permite encontrar cliente instantaneamente
-        self.clientes: Dict[str, Dict[str, Any]] = {}
-        
-        # 🌍 PAÍSES COM DEFAULTDICT:
-        # - defaultdict(list) cria uma lista vazia automaticamente
-        # - Evita erros de "key not found"
-        # - Exemplo: se acessarmos paises['Brasil'], cria [] automaticamente
-        self.paises: Dict[str, List[str]] = defaultdict(list)
-        
-        # ====================================================================
-        # TUPLAS PARA METADADOS (DADOS IMUTÁVEIS)
-        # ====================================================================
-        
-        # 📋 COLUNAS DO DATASET:
-        # - Por que tupla? Porque as colunas NUNCA mudam!
-        # - Tuplas são imutáveis, garantem que ninguém altere por engano
-        # - Mais eficiente em memória que listas
-        self.colunas_dataset: Tuple[str, ...] = (
-            'InvoiceNo',    # Número da fatura
-            'StockCode',    # Código do produto
-            'Description',  # Descrição do produto
-            'Quantity',     # Quantidade vendida
-            'InvoiceDate',  # Data da venda
-            'UnitPrice',    # Preço unitário
-            'CustomerID',   # ID do cliente
-            'Country'       # País da venda
-        )
-        
-        # ====================================================================
-        # CONTADORES PARA ESTATÍSTICAS AUTOMÁTICAS
-        # ====================================================================
-        
-        # 📊 CONTADOR DE VENDAS POR PAÍS:
-        # - Counter é um dicionário especial que conta automaticamente
-        # - Exemplo: counter['Brasil'] += 1 conta mais uma venda no Brasil
-        # - Método most_common() retorna os mais frequentes
-        self.contador_vendas_pais = Counter()
-        
-        # 📈 CONTADOR DE PRODUTOS:
-        # - Conta quantas vezes cada produto foi vendido
-        # - Útil para rankings e estatísticas
-        self.contador_produtos = Counter()
-        
-    def adicionar_venda(self, registro: Dict[str, Any]) -> bool:
+        codigo_por_valor = self._codigo_por_valor
+        for valor in dict.fromkeys(valores):
+            if valor not in codigo_por_valor:
+                codigo_por_valor[valor] = len(self.valores)
+                self.valores.append(valor)
+        self.codigos.extend(map(codigo_por_valor.__getitem__, valores))
+
+    def estender(self, outra: 'ColunaCodificada'):
+        """Anexa outra coluna, traduzindo os códigos dela para os desta"""
+        traducao = array('I', (self.codificar(valor) for valor in outra.valores))
+        self.codigos.extend(map(traducao.__getitem__, outra.codigos))
+
+
+class VendaLinha(Mapping):
+    """
+      Visão de Linha sobre o Armazenamento Colunar
+
+    Demonstra:
+    - Adaptador (Adapter Pattern): parece um dicionário de venda,
+      mas lê e escreve direto nas colunas
+    - Herdar de Mapping fornece get(), keys(), items() e comparação
+    - Permite que EcommerceCRUD e ExportadorCSV continuem iguais
+
+    ⚠️ A visão aponta para uma posição: se uma linha anterior for
+    removida fisicamente, a visão passa a apontar para a linha seguinte.
+    """
+
+    __slots__ = ('_armazenamento', '_indice')
+
+    def __init__(self, armazenamento: 'ArmazenamentoColunar', indice: int):
+        self._armazenamento = armazenamento
+        self._indice = indice
+
+    def __getitem__(self, campo: str) -> Any:
+        return self._armazenamento.valor(self._indice, campo)
+
+    def __setitem__(self, campo: str, valor: Any):
+        self._armazenamento.definir(self._indice, campo, valor)
+
+    def __iter__(self):
+        return iter(CAMPOS_VENDA)
+
+    def __len__(self) -> int:
+        return len(CAMPOS_VENDA)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ArmazenamentoColunar:
+    """
+      Armazenamento Colunar (Column Store) para Vendas
+
+    Em vez de uma lista com um dicionário por venda, guardamos uma
+    estrutura por COLUNA:
+    - quantity, unit_price e total em arrays tipados (8 bytes por valor)
+    - textos em colunas codificadas por dicionário (4 bytes por valor)
+
+    💡 POR QUE?
+    - Um dicionário por linha custa centenas de bytes; aqui são ~44 bytes
+    - Somas e filtros percorrem arrays contíguos, sem seguir ponteiros
+
+    Comporta-se como uma lista de vendas: len(), índices, fatias,
+    iteração, append() e del retornam/aceitam visões VendaLinha.
+    """
+
+    def __init__(self):
+        self._colunas: Dict[str, Any] = {}
+        for campo in CAMPOS_VENDA:
+            if campo in TIPOS_NUMERICOS:
+                self._colunas[campo] = array(TIPOS_NUMERICOS[campo])
+            else:
+                self._colunas[campo] = ColunaCodificada()
+
+    def coluna(self, campo: str) -> Any:
+        """Retorna a coluna bruta (array tipado ou ColunaCodificada)"""
+        return self._colunas[campo]
+
+    def valor(self, indice: int, campo: str) -> Any:
+        return self._colunas[campo][indice]
+
+    def definir(self, indice: int, campo: str, valor: Any):
+        # 🔄 Conversão para o tipo da coluna (arrays não aceitam qualquer tipo)
+        if campo == 'quantity':
+            valor = int(valor)
+        elif campo in TIPOS_NUMERICOS:
+            valor = float(valor)
+        else:
+            valor = str(valor)
+        self._colunas[campo][indice] = valor
+
+    def append(self, venda: Dict[str, Any]):
         """
-          Método para Adicionar Vendas
-        
-        Este método demonstra:
-        - Validação de dados de entrada
-        - Conversão segura de tipos
-        - Tratamento de exceções
-        - Atualização de múltiplas estruturas
-        
-        Args:
-            registro: Dicionário com dados da venda do CSV
-            
-        Returns:
-            bool: True se sucesso, False se erro
+        Adiciona uma venda (dicionário) ao final de cada coluna
+
+        💡 Os textos do dicionário passam a apontar para a cópia única
+        da coluna, assim produtos/países não retêm cópias duplicadas.
         """
-        try:
-            # ================================================================
-            # ETAPA 1: VALIDAÇÃO DOS DADOS OBRIGATÓRIOS
-            # ================================================================
-            
-            # 🔍 Por que validar?
-            # - Evita dados corrompidos no sistema
-            # - Falha rápida se dados essenciais estão ausentes
-            # - .get() retorna None se chave não existir (seguro)
-            
-            if not registro.get('InvoiceNo') or not registro.get('StockCode'):
-                # raise ValueError interrompe a execução e lança uma exceção
-                # Será capturada pelo except abaixo
-                raise ValueError("InvoiceNo e StockCode são obrigatórios")
-            
-            # ================================================================
-            # ETAPA 2: CONVERSÃO SEGURA DE TIPOS
-            # ================================================================
-            
-            # 🔄 Por que converter tipos?
-            # - Dados do CSV vêm como string
-            # - Precisamos de números para cálculos
-            # - .get(chave, valor_padrão) evita erros se chave não existir
-            
-            venda = {
-                # Strings: mantemos como texto
-                'invoice_no': str(registro['InvoiceNo']),
-                'stock_code': str(registro['StockCode']),
-                'description': str(registro.get('Description', '')),  # '' se vazio
-                
-                # Números inteiros: int(float()) para lidar com "1.0"
-                'quantity': int(float(registro.get('Quantity', 0))),
-                
-                # Datas: mantemos como string por simplicidade
-                'invoice_date': str(registro.get('InvoiceDate', '')),
-                
-                # Números decimais: float() para preços
-                'unit_price': float(registro.get('UnitPrice', 0)),
-                
-                # IDs: podem estar vazios, mantemos como string
-                'customer_id': str(registro.get('CustomerID', '')),
-                'country': str(registro.get('Country', '')),
-                
-                # Cálculo do total: quantidade × preço unitário
-                'total': int(float(registro.get('Quantity', 0))) * float(registro.get('UnitPrice', 0))
-            }
-            
-            # ================================================================
-            # ETAPA 3: ADICIONAR À ESTRUTURA PRINCIPAL
-            # ================================================================
-            
-            # 📝 Adicionar à lista de vendas
-            # - append() adiciona ao final da lista
-            # - Mantém ordem cronológica das vendas
-            self.vendas.append(venda)
-            
-            # ================================================================
-            # ETAPA 4: ATUALIZAR ESTRUTURAS AUXILIARES
-            # ================================================================
-            
-            # 🔄 Por que atualizar outras estruturas?
-            # - Mantém consistência dos dados
-            # - Permite buscas rápidas por produto, cliente, país
-            # - Atualiza estatísticas automaticamente
-            
-            self._atualizar_produto(venda)   # Atualiza dicionário de produtos
-            self._atualizar_cliente(venda)   # Atualiza dicionário de clientes  
-            self._atualizar_pais(venda)      # Atualiza dicionário de países
-            
-            return True  # ✅ Sucesso!
-            
-        except (ValueError, TypeError) as e:
-            # ================================================================
-            # TRATAMENTO DE EXCEÇÕES
-            # ================================================================
-            
-            # 🚑 Por que capturar exceções?
-            # - ValueError: dados inválidos (ex: string em campo numérico)
-            # - TypeError: tipos incompatíveis
-            # - Evita que o programa pare completamente
-            
-            print(f"Erro ao adicionar venda: {e}")
-            return False  # ❌ Falhou!
-    
-    def _atualizar_produto(self, venda: Dict[str, Any]):
+        for campo, coluna in self._colunas.items():
+            if campo in TIPOS_NUMERICOS:
+                coluna.append(venda[campo])
+            else:
+                venda[campo] = coluna.append(venda[campo])
+
+    def _normalizar_indice(self, indice: int) -> int:
+        tamanho = len(self)
+        if indice < 0:
+            indice += tamanho
+        if not 0 <= indice < tamanho:
+            raise IndexError("índice de venda fora do intervalo")
+        return indice
+
+    def __len__(self) -> int:
+        return len(self._colunas['total'])
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield VendaLinha(self, indice)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [VendaLinha(self, i) for i in range(*indice.indices(len(self)))]
+        return VendaLinha(self, self._normalizar_indice(indice))
+
+    def __delitem__(self, indice: int):
+        indice = self._normalizar_indice(indice)
+        for coluna in self._colunas.values():
+            del coluna[indice]
+
+    def anexar_colunas(self, colunas: Dict[str, List[Any]]):
+        """Anexa várias linhas de uma vez, recebendo uma lista por campo"""
+        for campo, coluna in self._colunas.items():
+            if campo in TIPOS_NUMERICOS:
+                coluna.extend(colunas[campo])
+            else:
+                coluna.estender_valores(colunas[campo])
+
+    def estender(self, outro: 'ArmazenamentoColunar'):
+        """Anexa todas as linhas de outro armazenamento colunar (em bloco)"""
+        for campo, coluna in self._colunas.items():
+            if campo in TIPOS_NUMERICOS:
+                coluna.extend(outro._colunas[campo])
+            else:
+                coluna.estender(outro._colunas[campo])
+
+    def selecionar(self, indices) -> 'SelecaoColunar':
+        """Cria uma seleção preguiçosa com as linhas indicadas"""
+        return SelecaoColunar(self, indices)
+
+    def manter_linhas(self, mascara):
         """
-          Método Privado para Atualizar Produtos
-        
-        O underscore (_) indica que é um método privado:
-        - Só deve ser chamado internamente pela classe
-        - Não faz parte da interface pública
-        - Convenção Python para organização
+        Mantém só as linhas com máscara verdadeira (uma passada por coluna).
+
+        compress() copia os valores em C; nas colunas de texto basta
+        filtrar os códigos, o dicionário de valores continua o mesmo.
         """
+        for campo, coluna in self._colunas.items():
+            if campo in TIPOS_NUMERICOS:
+                self._colunas[campo] = array(coluna.typecode, compress(coluna, mascara))
+            else:
+                coluna.codigos = array('I', compress(coluna.codigos, mascara))
+
+
+class SelecaoColunar:
+    """
+      Resultado de Filtro sobre o Armazenamento Colunar
+
+    Guarda apenas os índices das linhas selecionadas (array de inteiros)
+    e cria as visões VendaLinha sob demanda.
+
+    💡 Criar centenas de milhares de objetos de uma vez custa mais que
+    o próprio filtro; a tela normalmente mostra só as primeiras linhas.
+    """
+
+    __slots__ = ('_armazenamento', 'indices')
+
+    def __init__(self, armazenamento: ArmazenamentoColunar, indices):
+        self._armazenamento = armazenamento
+        self.indices = array('I', indices)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __iter__(self):
+        armazenamento = self._armazenamento
+        for indice in self.indices:
+            yield VendaLinha(armazenamento, indice)
+
+    def __getitem__(self, posicao):
+        if isinstance(posicao, slice):
+            return [VendaLinha(self._armazenamento, i) for i in self.indices[posicao]]
+        return VendaLinha(self._armazenamento, self.indices[posicao])
+
+
+# ============================================================================
+# ÍNDICE ORDENADO - Consultas por faixa de valor com busca binária
+# ============================================================================
+
+class IndiceOrdenado:
+    """
+      Índice Ordenado por Valor (chave numérica -> posição)
+
+    Demonstra:
+    - Dois arrays paralelos: chaves em ordem crescente e a posição de cada uma
+    - bisect encontra o início e o fim de uma faixa em O(log n)
+    - Contagem de uma faixa sem tocar nas linhas: fim - início
+
+    Uma consulta por faixa custa O(log n + k), onde k é o tamanho do
+    resultado, em vez de O(n) de uma varredura completa.
+
+    💡 Lotes grandes (carga do CSV) ficam pendentes e são intercalados
+    de uma só vez na primeira consulta, em vez de a cada bloco lido.
+
+    🔗 Chaves iguais ficam em ordem crescente de posição: cada entrada
+    tem uma ordem total (valor, posição), o que permite retomar uma
+    paginação exatamente de onde parou.
+    """
+
+    __slots__ = ('_chaves', '_posicoes', '_pendentes')
+
+    # 📏 Até este tamanho, um lote é inserido item a item; acima dele
+    # é mais barato intercalar tudo de uma vez com sort()
+    LIMIAR_INSERCAO = 32
+
+    def __init__(self):
+        self._chaves = array('d')     # Valores em ordem crescente
+        self._posicoes = array('I')   # Posição da linha de cada valor
+        self._pendentes: List[Tuple[List[float], int]] = []  # (valores, início)
+
+    @property
+    def chaves(self) -> array:
+        self._consolidar()
+        return self._chaves
+
+    @property
+    def posicoes(self) -> array:
+        self._consolidar()
+        return self._posicoes
+
+    def __len__(self) -> int:
+        return len(self._chaves) + sum(len(valores) for valores, _ in self._pendentes)
+
+    def __getstate__(self):
+        # 💾 No snapshot vão só os arrays já intercalados
+        self._consolidar()
+        return self._chaves, self._posicoes
+
+    def __setstate__(self, estado):
+        self._chaves, self._posicoes = estado
+        self._pendentes = []
+
+    def _consolidar(self):
+        """
+        Intercala os lotes pendentes com as chaves já ordenadas.
+
+        As chaves antigas já formam uma sequência ordenada, e o Timsort
+        aproveita isso: intercala as partes em vez de reordenar tudo.
+        """
+        if not self._pendentes:
+            return
+        chaves = self._chaves.tolist()
+        posicoes = self._posicoes.tolist()
+        for valores, inicio in self._pendentes:
+            chaves.extend(valores)
+            posicoes.extend(range(inicio, inicio + len(valores)))
+        self._pendentes = []
+        ordem = sorted(range(len(chaves)), key=chaves.__getitem__)
+        self._chaves = array('d', map(chaves.__getitem__, ordem))
+        self._posicoes = array('I', map(posicoes.__getitem__, ordem))
+
+    def inserir(self, chave: float, posicao: int):
+        """Insere mantendo a ordem (busca O(log n) + deslocamento em C)"""
+        chaves = self.chaves
+        i = self.localizar(chave, posicao)
+        chaves.insert(i, chave)
+        self._posicoes.insert(i, posicao)
+
+    def remover(self, chave: float, posicao: int) -> bool:
+        """Remove a entrada (chave, posição); False se não existir"""
+        chaves, posicoes = self.chaves, self._posicoes
+        j = self.localizar(chave, posicao)
+        if j < len(chaves) and chaves[j] == chave and posicoes[j] == posicao:
+            del chaves[j]
+            del posicoes[j]
+            return True
+        return False
+
+    def localizar(self, chave: float, posicao: int) -> int:
+        """Índice da entrada (chave, posição), ou onde ela entraria"""
+        chaves = self.chaves
+        inicio = bisect_left(chaves, chave)
+        fim = bisect_right(chaves, chave, inicio)
+        # Entre chaves iguais, as posições estão em ordem crescente
+        return bisect_left(self._posicoes, posicao, inicio, fim)
+
+    def estender(self, valores, inicio: int):
+        """Indexa as linhas novas (posições `inicio`, `inicio + 1`, ...)"""
+        novos = list(valores)
+        if len(novos) > self.LIMIAR_INSERCAO:
+            self._pendentes.append((novos, inicio))
+            return
+        for posicao, chave in enumerate(novos, start=inicio):
+            self.inserir(chave, posicao)
+
+    def intervalo(self, minimo: float, maximo: float) -> Tuple[int, int]:
+        """Faixa [início, fim) dos arrays com minimo <= chave <= maximo"""
+        chaves = self.chaves
+        inicio = bisect_left(chaves, minimo)
+        fim = bisect_right(chaves, maximo, inicio)
+        return inicio, fim
+
+    def posicoes_no_intervalo(self, minimo: float, maximo: float) -> array:
+        """Posições das linhas da faixa, em ordem crescente de valor"""
+        inicio, fim = self.intervalo(minimo, maximo)
+        return self._posicoes[inicio:fim]
+
+    def contar(self, minimo: float, maximo: float) -> int:
+        """Quantidade de linhas na faixa, em O(log n)"""
+        inicio, fim = self.intervalo(minimo, maximo)
+        return fim - inicio
+
+    def somar(self, minimo: float, maximo: float) -> float:
+        """Soma dos valores da faixa (lê só o array de chaves)"""
+        inicio, fim = self.intervalo(minimo, maximo)
+        return sum(self._chaves[inicio:fim])
+
+
+# ============================================================================
+# RANKINGS INCREMENTAIS - Top-K sempre pronto, sem ordenar na consulta
+# ============================================================================
+
+# 🏆 Critérios com ranking mantido (campos de produtos e de clientes)
+CRITERIOS_RANKING_PRODUTOS: Tuple[str, ...] = ('quantidade_total', 'receita_total', 'vendas_total')
+CRITERIOS_RANKING_CLIENTES: Tuple[str, ...] = ('gasto_total', 'quantidade_total', 'compras_total')
+
+
+class RankingIncremental:
+    """
+      Ranking Mantido a Cada Alteração (chave -> valor, do maior ao menor)
+
+    Demonstra:
+    - Lista ordenada de pares (-valor, chave): os K maiores são sempre
+      os K primeiros, então um top-K é só uma fatia, O(K)
+    - Dicionário chave -> valor para achar a entrada antiga em O(log n)
+    - Empates ficam em ordem crescente de chave (ordem total e estável)
+
+    Diferente de um heap limitado a K itens, aqui os valores podem
+    diminuir (alterações e remoções) sem perder quem deveria subir no
+    ranking: todas as chaves continuam na lista.
+    """
+
+    __slots__ = ('_entradas', '_valores')
+
+    # 📏 Até este tamanho, um lote é aplicado item a item; acima dele é
+    # mais barato reordenar tudo de uma vez com sorted()
+    LIMIAR_INSERCAO = 32
+
+    def __init__(self):
+        self._entradas: List[Tuple[float, str]] = []  # (-valor, chave) em ordem crescente
+        self._valores: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._valores)
+
+    def __getstate__(self):
+        return self._entradas, self._valores
+
+    def __setstate__(self, estado):
+        self._entradas, self._valores = estado
+
+    def definir(self, chave: str, valor: Optional[float]):
+        """Grava o valor atual da chave (None retira a chave do ranking)"""
+        anterior = self._valores.get(chave)
+        if anterior == valor:
+            return
+        entradas = self._entradas
+        if anterior is not None:
+            del entradas[bisect_left(entradas, (-anterior, chave))]
+            del self._valores[chave]
+        if valor is not None:
+            insort(entradas, (-valor, chave))
+            self._valores[chave] = valor
+
+    def definir_varios(self, pares):
+        """Aplica vários definir(); lotes grandes reordenam uma única vez"""
+        pares = list(pares)
+        if len(pares) <= self.LIMIAR_INSERCAO:
+            for chave, valor in pares:
+                self.definir(chave, valor)
+            return
+        valores = self._valores
+        for chave, valor in pares:
+            if valor is None:
+                valores.pop(chave, None)
+            else:
+                valores[chave] = valor
+        self._entradas = sorted((-valor, chave) for chave, valor in valores.items())
+
+    def maiores(self, quantidade: int) -> List[Tuple[str, float]]:
+        """Os `quantidade` maiores pares (chave, valor), em O(K)"""
+        return [(chave, -valor) for valor, chave in self._entradas[:max(quantidade, 0)]]
+
+
+# ============================================================================
+# HYPERLOGLOG - Contagem aproximada de distintos em memória fixa
+# ============================================================================
+
+# 🎯 Precisão padrão: 2^11 registradores (2 KB), erro padrão de ~2,3%
+PRECISAO_HLL_PADRAO = 11
+
+# 🗂️ Sketches mantidos: (escopo, campo contado)
+# - escopo 'pais' (casefold), 'mes' ('2010-12') ou 'produto' (stock_code)
+ESCOPOS_SKETCH: Tuple[Tuple[str, str], ...] = (
+    ('pais', 'produtos'), ('pais', 'clientes'),
+    ('mes', 'produtos'), ('mes', 'clientes'),
+    ('produto', 'clientes')
+)
+
+# ⚡ 2^-r para cada valor possível de registrador (evita potências no laço)
+_POTENCIAS_NEGATIVAS = tuple(2.0 ** -rank for rank in range(65))
+
+
+@lru_cache(maxsize=1 << 17)
+def _hash_64(texto: str) -> int:
+    """
+    Hash de 64 bits estável entre processos e execuções.
+
+    hash() do Python muda a cada processo (PYTHONHASHSEED): sketches
+    gravados no snapshot ou vindos dos processos trabalhadores não
+    poderiam ser combinados.
+    """
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+      HyperLogLog: Quantos Valores Distintos, sem Guardar os Valores
+
+    Demonstra:
+    - O hash de cada valor escolhe um registrador (primeiros p bits) e
+      o número de zeros à esquerda do restante é uma "pista" de quantos
+      valores distintos já passaram por ele
+    - Memória fixa: 2^p bytes, com 10 ou 10 milhões de valores
+    - Erro padrão ≈ 1,04 / √(2^p)
+    - Mesclar dois sketches = máximo registrador a registrador (o
+      resultado é o sketch da união, como se todos os valores tivessem
+      sido adicionados em um só)
+    - Representação esparsa (registrador -> valor, só os preenchidos)
+      enquanto poucos registradores foram tocados: a maioria dos
+      sketches por produto vê poucos clientes, e mesclar ou serializar
+      alguns pares custa bem menos que 2^p bytes
+
+    ⚠️ Só aceita inserções: valores removidos continuam contados até o
+    sketch ser refeito.
+    """
+
+    __slots__ = ('precisao', 'registradores', 'esparsos')
+
+    def __init__(self, precisao: int = PRECISAO_HLL_PADRAO):
+        if not 4 <= precisao <= 18:
+            raise ValueError("precisão do HyperLogLog deve estar entre 4 e 18")
+        self.precisao = precisao
+        self.registradores: Optional[bytearray] = None     # Forma densa
+        self.esparsos: Optional[Dict[int, int]] = {}       # Forma esparsa
+
+    @staticmethod
+    def precisao_para_erro(erro: float) -> int:
+        """Menor precisão cujo erro padrão não passa de `erro` (ex.: 0.01)"""
+        return min(max(math.ceil(2 * math.log2(1.04 / erro)), 4), 18)
+
+    @property
+    def erro_padrao(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precisao)
+
+    @property
+    def _limite_esparso(self) -> int:
+        """Acima de 1/16 dos registradores preenchidos, a forma densa compensa"""
+        return (1 << self.precisao) >> 4
+
+    def _adensar(self):
+        registradores = bytearray(1 << self.precisao)
+        for indice, posicao in self.esparsos.items():
+            registradores[indice] = posicao
+        self.registradores, self.esparsos = registradores, None
+
+    def adicionar(self, valor: str):
+        """Registra um valor (repetições não mudam nada)"""
+        self.adicionar_varios((valor,))
+
+    def adicionar_varios(self, valores):
+        """Registra vários valores com as variáveis do laço em locais"""
+        registradores = self.esparsos if self.registradores is None else self.registradores
+        bits_restantes = 64 - self.precisao
+        mascara = (1 << bits_restantes) - 1
+        if self.registradores is None:
+            for codigo in map(_hash_64, valores):
+                indice = codigo >> bits_restantes
+                posicao = bits_restantes - (codigo & mascara).bit_length() + 1
+                if posicao > registradores.get(indice, 0):
+                    registradores[indice] = posicao
+            if len(registradores) > self._limite_esparso:
+                self._adensar()
+            return
+        for codigo in map(_hash_64, valores):
+            indice = codigo >> bits_restantes
+            posicao = bits_restantes - (codigo & mascara).bit_length() + 1  # 1º bit ligado
+            if posicao > registradores[indice]:
+                registradores[indice] = posicao
+
+    def mesclar(self, outro: 'HyperLogLog'):
+        """Passa a representar a união dos dois conjuntos"""
+        if outro.precisao != self.precisao:
+            raise ValueError("sketches com precisões diferentes não podem ser mesclados")
+        if outro.registradores is not None:
+            if self.registradores is None:
+                self._adensar()
+            self.registradores = bytearray(map(max, self.registradores, outro.registradores))
+            return
+        
+        # 🔹 Outro esparso: só os registradores preenchidos dele
+        destino = self.esparsos if self.registradores is None else self.registradores
+        for indice, posicao in outro.esparsos.items():
+            if posicao > (destino.get(indice, 0) if self.registradores is None else destino[indice]):
+                destino[indice] = posicao
+        if self.registradores is None and len(destino) > self._limite_esparso:
+            self._adensar()
+
+    def estimar(self) -> int:
+        """Quantidade estimada de valores distintos, em O(2^p)"""
+        m = 1 << self.precisao
+        if self.registradores is None:
+            preenchidos = self.esparsos.values()
+            vazios = m - len(self.esparsos)
+            soma = vazios + sum(map(_POTENCIAS_NEGATIVAS.__getitem__, preenchidos))
+        else:
+            registradores = self.registradores
+            vazios = registradores.count(0)
+            soma = sum(map(_POTENCIAS_NEGATIVAS.__getitem__, registradores))
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimativa = alfa * m * m / soma
+        
+        # 🔬 Poucos valores: contagem linear pelos registradores vazios
+        if estimativa <= 2.5 * m and vazios:
+            estimativa = m * math.log(m / vazios)
+        return round(estimativa)
+
+
+# ============================================================================
+# QUANTIS - Sketch KLL para mediana e percentis sem ordenar tudo
+# ============================================================================
+
+# 🎯 Capacidade padrão do nível mais alto do KLL (erro de rank ~1%)
+CAPACIDADE_KLL_PADRAO = 200
+
+# 📐 Campos com sketch de quantis (global e por país)
+CAMPOS_QUANTIS: Tuple[str, ...] = ('total', 'unit_price', 'quantity')
+
+
+class SketchQuantis:
+    """
+      Sketch KLL: Percentis Aproximados em Memória Limitada
+
+    Demonstra:
+    - Níveis de compactação: cada item do nível h representa 2^h valores
+    - Quando um nível enche, ele é ordenado e metade dos itens (posições
+      pares ou ímpares, sorteadas) sobe para o nível seguinte
+    - Níveis mais baixos têm capacidade menor (fator 2/3): a memória
+      fica em O(k), com milhões de valores
+    - Mesclar = juntar os níveis e compactar o que passar do limite
+
+    Mínimo e máximo são guardados exatos. O erro de rank fica em torno
+    de 1,7 / k (k = capacidade do nível mais alto).
+
+    ⚠️ Só aceita inserções, como o HyperLogLog: valores alterados ou
+    removidos continuam no sketch até ele ser refeito.
+    """
+
+    __slots__ = ('k', 'niveis', 'quantidade', 'minimo', 'maximo')
+
+    def __init__(self, k: int = CAPACIDADE_KLL_PADRAO):
+        self.k = k
+        self.niveis: List[List[float]] = [[]]
+        self.quantidade = 0      # Valores vistos (soma dos pesos)
+        self.minimo: Optional[float] = None
+        self.maximo: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self.quantidade
+
+    def _capacidade(self, nivel: int) -> int:
+        profundidade = len(self.niveis) - nivel - 1
+        return max(int(self.k * (2 / 3) ** profundidade), 2)
+
+    def adicionar_varios(self, valores):
+        """Acrescenta os valores ao nível 0 e compacta o que passar do limite"""
+        novos = list(valores)
+        if not novos:
+            return
+        self.niveis[0].extend(novos)
+        self.quantidade += len(novos)
+        menor, maior = min(novos), max(novos)
+        self.minimo = menor if self.minimo is None else min(self.minimo, menor)
+        self.maximo = maior if self.maximo is None else max(self.maximo, maior)
+        self._compactar()
+
+    def mesclar(self, outro: 'SketchQuantis'):
+        """Passa a resumir os valores dos dois sketches"""
+        for nivel, itens in enumerate(outro.niveis):
+            if nivel == len(self.niveis):
+                self.niveis.append([])
+            self.niveis[nivel].extend(itens)
+        self.quantidade += outro.quantidade
+        for extremo, escolher in (('minimo', min), ('maximo', max)):
+            valores = [valor for valor in (getattr(self, extremo), getattr(outro, extremo)) if valor is not None]
+            setattr(self, extremo, escolher(valores) if valores else None)
+        self._compactar()
+
+    def _compactar(self):
+        """
+        Compacta, de baixo para cima, todo nível acima da capacidade.
+
+        Um nível com número ímpar de itens deixa o último para trás: o
+        restante tem tamanho par e a metade sorteada sobe com peso dobrado.
+        """
+        nivel = 0
+        while nivel < len(self.niveis):
+            itens = self.niveis[nivel]
+            if len(itens) < self._capacidade(nivel):
+                nivel += 1
+                continue
+            if nivel + 1 == len(self.niveis):
+                self.niveis.append([])  # As capacidades abaixo encolhem
+            itens.sort()
+            sobra = [itens.pop()] if len(itens) % 2 else []
+            self.niveis[nivel + 1].extend(itens[random.getrandbits(1)::2])
+            self.niveis[nivel] = sobra
+            nivel = 0  # Nova altura: reavaliar os níveis de baixo
+
+    def quantis(self, fracoes) -> List[Optional[float]]:
+        """
+        Valores nas frações pedidas (0.5 = mediana, 0.99 = p99).
+
+        Ordena só os itens guardados (O(k)), cada um com o seu peso.
+        """
+        if not self.quantidade:
+            return [None for _ in fracoes]
+        pesados = sorted((valor, 1 << nivel) for nivel, itens in enumerate(self.niveis) for valor in itens)
+        total = sum(peso for _, peso in pesados)
+        acumulados = list(accumulate(peso for _, peso in pesados))
+        resultado = []
+        for fracao in fracoes:
+            if fracao <= 0:
+                resultado.append(self.minimo)
+            elif fracao >= 1:
+                resultado.append(self.maximo)
+            else:
+                indice = bisect_left(acumulados, fracao * total)
+                resultado.append(pesados[min(indice, len(pesados) - 1)][0])
+        return resultado
+
+
+# ============================================================================
+# HEAVY HITTERS - Count-Min e Space-Saving em memória fixa
+# ============================================================================
+
+# 📏 Count-Min padrão: 2048 colunas x 4 linhas (64 KB por dimensão)
+# - Erro ε = e / largura ≈ 0,13% do peso total, com confiança 1 - e^-4 ≈ 98%
+LARGURA_CMS_PADRAO = 2048
+PROFUNDIDADE_CMS_PADRAO = 4
+
+# 🏆 Space-Saving padrão: 1024 chaves monitoradas por dimensão
+# - Erro de cada contagem ≤ peso total / 1024 (~0,1%)
+CAPACIDADE_SPACE_SAVING_PADRAO = 1024
+
+# 🔑 Dimensões monitoradas: campo da chave -> campo do peso
+# - None = peso 1 por linha (mesma contagem de contador_vendas_pais)
+# - Mesmos critérios padrão das telas de ranking: produtos por
+#   quantidade, clientes por gasto e países por número de vendas
+DIMENSOES_HEAVY_HITTERS: Dict[str, Optional[str]] = {
+    'stock_code': 'quantity',
+    'customer_id': 'total',
+    'country': None
+}
+
+# 📋 Colunas lidas para alimentar o monitor (chaves e pesos)
+CAMPOS_HEAVY_HITTERS: Tuple[str, ...] = tuple(dict.fromkeys(
+    [*DIMENSOES_HEAVY_HITTERS, *filter(None, DIMENSOES_HEAVY_HITTERS.values())]))
+
+
+class CountMinSketch:
+    """
+      Count-Min: Frequência Aproximada de Qualquer Chave
+
+    Demonstra:
+    - Tabela fixa de profundidade x largura contadores: cada chave soma
+      seu peso em uma coluna de cada linha (hashes independentes)
+    - Estimativa = menor dos contadores da chave: colisões só somam,
+      então a estimativa nunca fica abaixo da contagem real
+    - Garantia: estimativa ≤ real + ε·N com probabilidade 1 - δ, onde
+      N = peso total, ε = e / largura e δ = e^-profundidade
+    - Mesclar = somar as tabelas (mesmas dimensões e hashes)
+
+    Pesos negativos (cancelamentos) são aceitos; a garantia continua
+    valendo enquanto a contagem real de cada chave não ficar negativa.
+    """
+
+    __slots__ = ('largura', 'profundidade', 'tabela', 'total')
+
+    def __init__(self, largura: int = LARGURA_CMS_PADRAO, profundidade: int = PROFUNDIDADE_CMS_PADRAO):
+        if largura < 1 or profundidade < 1:
+            raise ValueError("largura e profundidade do Count-Min devem ser positivas")
+        self.largura = largura
+        self.profundidade = profundidade
+        self.tabela = array('d', bytes(8 * largura * profundidade))
+        self.total = 0.0  # Soma dos pesos absolutos (N da garantia)
+
+    @staticmethod
+    def dimensoes_para_erro(erro: float, falha: float) -> Tuple[int, int]:
+        """(largura, profundidade) para erro ε e probabilidade de falha δ"""
+        return math.ceil(math.e / erro), math.ceil(math.log(1 / falha))
+
+    @property
+    def erro(self) -> float:
+        """ε: erro máximo como fração do peso total"""
+        return math.e / self.largura
+
+    @property
+    def confianca(self) -> float:
+        """1 - δ: probabilidade de o erro ficar dentro de ε·N"""
+        return 1 - math.exp(-self.profundidade)
+
+    def _celulas(self, chave: str) -> List[int]:
+        """Uma célula por linha: h1 + i·h2 (duas metades de um hash de 64 bits)"""
+        codigo = _hash_64(chave)
+        h1, h2 = codigo >> 32, (codigo & 0xFFFFFFFF) | 1
+        largura = self.largura
+        return [linha * largura + (h1 + linha * h2) % largura for linha in range(self.profundidade)]
+
+    def adicionar(self, chave: str, peso: float = 1):
+        self.adicionar_varios(((chave, peso),))
+
+    def adicionar_varios(self, pares):
+        """Soma os pesos de vários pares (chave, peso)"""
+        tabela = self.tabela
+        for chave, peso in pares:
+            for celula in self._celulas(chave):
+                tabela[celula] += peso
+            self.total += abs(peso)
+
+    def estimar(self, chave: str) -> float:
+        """Contagem estimada (nunca abaixo da real)"""
+        tabela = self.tabela
+        return min(tabela[celula] for celula in self._celulas(chave))
+
+    def mesclar(self, outro: 'CountMinSketch'):
+        """Passa a resumir os dois fluxos"""
+        if (outro.largura, outro.profundidade) != (self.largura, self.profundidade):
+            raise ValueError("sketches Count-Min com dimensões diferentes não podem ser mesclados")
+        self.tabela = array('d', map(float.__add__, self.tabela, outro.tabela))
+        self.total += outro.total
+
+
+class SpaceSaving:
+    """
+      Space-Saving: Top-K de um Fluxo com K Contadores
+
+    Demonstra:
+    - Só `capacidade` chaves são guardadas; uma chave nova toma o lugar
+      da menor contagem e herda esse valor como erro
+    - Garantia: contagem guardada - erro ≤ real ≤ contagem guardada, e o
+      erro nunca passa de N / capacidade; toda chave com mais do que
+      N / capacidade do peso total está entre as monitoradas
+    - Heap com entradas vencidas (descartadas ao sair): achar a menor
+      contagem custa O(log capacidade) amortizado
+
+    Pesos negativos só descontam chaves já monitoradas (uma chave fora
+    da lista não tem contagem para descontar).
+    """
+
+    __slots__ = ('capacidade', 'contagens', 'erros', 'total', '_heap')
+
+    def __init__(self, capacidade: int = CAPACIDADE_SPACE_SAVING_PADRAO):
+        if capacidade < 1:
+            raise ValueError("capacidade do Space-Saving deve ser positiva")
+        self.capacidade = capacidade
+        self.contagens: Dict[str, float] = {}
+        self.erros: Dict[str, float] = {}
+        self.total = 0.0
+        self._heap: List[Tuple[float, str]] = []  # (contagem, chave), com vencidas
+
+    def __len__(self) -> int:
+        return len(self.contagens)
+
+    @property
+    def erro_maximo(self) -> float:
+        """Maior erro possível de uma contagem (N / capacidade)"""
+        return self.total / self.capacidade
+
+    def adicionar(self, chave: str, peso: float = 1):
+        self.adicionar_varios(((chave, peso),))
+
+    def adicionar_varios(self, pares):
+        """Aplica vários pares (chave, peso) na ordem dada"""
+        contagens, erros, heap = self.contagens, self.erros, self._heap
+        for chave, peso in pares:
+            self.total += abs(peso)
+            if chave in contagens:
+                contagens[chave] += peso
+            elif peso <= 0:
+                continue
+            elif len(contagens) < self.capacidade:
+                contagens[chave] = peso
+                erros[chave] = 0
+            else:
+                # 🔻 Menor contagem viva: descarta entradas vencidas do topo
+                while True:
+                    minimo, vitima = heapq.heappop(heap)
+                    if contagens.get(vitima) == minimo:
+                        break
+                del contagens[vitima], erros[vitima]
+                contagens[chave] = minimo + peso
+                erros[chave] = minimo
+            heapq.heappush(heap, (contagens[chave], chave))
+        
+        # 🧹 Muitas entradas vencidas: refaz o heap só com as vivas
+        if len(heap) > 4 * self.capacidade:
+            self._refazer_heap()
+
+    def _refazer_heap(self):
+        self._heap = [(contagem, chave) for chave, contagem in self.contagens.items()]
+        heapq.heapify(self._heap)
+
+    def mesclar(self, outro: 'SpaceSaving'):
+        """
+        Passa a resumir os dois fluxos.
+
+        Chave ausente em um dos lados pode ter até a menor contagem dele
+        (se estava cheio): esse valor entra na contagem e no erro, o que
+        mantém a contagem como limite superior. Ficam as `capacidade`
+        maiores.
+        """
+        pisos = [min(lado.contagens.values()) if len(lado) >= lado.capacidade else 0
+                 for lado in (self, outro)]
+        somadas: Dict[str, Tuple[float, float]] = {}
+        for chave in self.contagens.keys() | outro.contagens.keys():
+            contagem = erro = 0
+            for lado, piso in zip((self, outro), pisos):
+                if chave in lado.contagens:
+                    contagem += lado.contagens[chave]
+                    erro += lado.erros[chave]
+                else:
+                    contagem += piso
+                    erro += piso
+            somadas[chave] = (contagem, erro)
+        mantidas = heapq.nlargest(self.capacidade, somadas.items(), key=lambda item: item[1][0])
+        self.contagens = {chave: contagem for chave, (contagem, _) in mantidas}
+        self.erros = {chave: erro for chave, (_, erro) in mantidas}
+        self.total += outro.total
+        self._refazer_heap()
+
+    def maiores(self, quantidade: int) -> List[Tuple[str, float, float]]:
+        """As `quantidade` maiores chaves: (chave, contagem, erro)"""
+        return [(chave, contagem, self.erros[chave]) for chave, contagem in
+                heapq.nlargest(quantidade, self.contagens.items(), key=lambda item: (item[1], item[0]))]
+
+
+class MonitorHeavyHitters:
+    """
+      Monitor de Heavy Hitters: Rankings de um Fluxo em Memória Fixa
+
+    Um Count-Min e um Space-Saving por dimensão (produto, cliente e
+    país). A memória não cresce com o número de chaves distintas, então
+    o monitor pode acompanhar um fluxo de pedidos sem fim, sozinho
+    (observar()) ou dentro de uma DataStructure, onde substitui os
+    contadores e rankings exatos.
+
+    Remoções e alterações entram como pesos negativos. Uma chave que
+    já saiu da lista do Space-Saving não tem o que descontar, então o
+    erro dela continua limitado por N / capacidade, com N = soma dos
+    pesos absolutos vistos (inserções e remoções).
+
+    Demonstra:
+    - Lote agregado por chave antes de ir para os sketches: cada chave
+      distinta do lote custa uma atualização, e não uma por linha
+    - Duas estimativas que nunca ficam abaixo da real: a menor das duas
+      é a mais justa
+    """
+
+    __slots__ = ('frequencias', 'maiores_chaves')
+
+    def __init__(self, largura: int = LARGURA_CMS_PADRAO, profundidade: int = PROFUNDIDADE_CMS_PADRAO,
+                 capacidade: int = CAPACIDADE_SPACE_SAVING_PADRAO):
+        self.frequencias: Dict[str, CountMinSketch] = {
+            dimensao: CountMinSketch(largura, profundidade) for dimensao in DIMENSOES_HEAVY_HITTERS
+        }
+        self.maiores_chaves: Dict[str, SpaceSaving] = {
+            dimensao: SpaceSaving(capacidade) for dimensao in DIMENSOES_HEAVY_HITTERS
+        }
+
+    def observar(self, vendas):
+        """Registra um lote de vendas (dicionários como os de adicionar_venda)"""
+        vendas = list(vendas)
+        self.observar_colunas({
+            campo: [venda[campo] for venda in vendas]
+            for campo in CAMPOS_HEAVY_HITTERS
+        })
+
+    def observar_colunas(self, colunas: Dict[str, List[Any]], sinal: int = 1):
+        """
+        Registra um lote já separado em colunas (campo -> valores).
+
+        sinal=-1 desconta o lote (linhas removidas ou deltas de uma
+        alteração): o Count-Min subtrai o peso e o Space-Saving o
+        desconta das chaves monitoradas.
+        """
+        for dimensao, campo_peso in DIMENSOES_HEAVY_HITTERS.items():
+            chaves = colunas[dimensao]
+            if campo_peso is None:
+                somas = Counter(chaves)
+            else:
+                somas = {}
+                for chave, peso in zip(chaves, colunas[campo_peso]):
+                    somas[chave] = somas.get(chave, 0) + peso
+            if sinal != 1:
+                somas = {chave: peso * sinal for chave, peso in somas.items()}
+            somas.pop('', None)  # Sem cliente ou sem país
+            pares = list(somas.items())
+            self.frequencias[dimensao].adicionar_varios(pares)
+            self.maiores_chaves[dimensao].adicionar_varios(pares)
+
+    def mesclar(self, outro: 'MonitorHeavyHitters'):
+        for dimensao in DIMENSOES_HEAVY_HITTERS:
+            self.frequencias[dimensao].mesclar(outro.frequencias[dimensao])
+            self.maiores_chaves[dimensao].mesclar(outro.maiores_chaves[dimensao])
+
+    def estimar(self, dimensao: str, chave: str) -> float:
+        """Peso estimado de uma chave qualquer (monitorada ou não)"""
+        estimativa = self.frequencias[dimensao].estimar(chave)
+        contagem = self.maiores_chaves[dimensao].contagens.get(chave)
+        return estimativa if contagem is None else min(estimativa, contagem)
+
+    def maiores(self, dimensao: str, quantidade: int) -> List[Tuple[str, float]]:
+        """Top-K aproximado (chave, peso estimado), do maior ao menor"""
+        frequencias = self.frequencias[dimensao]
+        estimados = [(chave, min(contagem, frequencias.estimar(chave)))
+                     for chave, contagem in self.maiores_chaves[dimensao].contagens.items()]
+        return heapq.nsmallest(max(quantidade, 0), estimados, key=lambda item: (-item[1], item[0]))
+
+    def limites_de_erro(self, dimensao: str) -> Dict[str, float]:
+        """Erros máximos (em unidades de peso) das estimativas da dimensão"""
+        frequencias = self.frequencias[dimensao]
+        maiores_chaves = self.maiores_chaves[dimensao]
+        return {
+            'peso_total': frequencias.total,
+            'erro_count_min': frequencias.erro * frequencias.total,
+            'confianca_count_min': frequencias.confianca,
+            'erro_space_saving': maiores_chaves.erro_maximo
+        }
+
+
+# ============================================================================
+# ÍNDICES BITMAP - Um bit por linha para colunas com poucos valores
+# ============================================================================
+
+# 🔁 Tradução byte -> dígito binário ('\x00' -> '0', '\x01' -> '1')
+_BYTES_PARA_DIGITOS = bytes.maketrans(b'\x00\x01', b'01')
+_DIGITOS_PARA_BYTES = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def bitmap_de_mascara(mascara: bytes) -> int:
+    """
+    Converte uma máscara (um byte 0/1 por linha) em um inteiro de bits.
+
+    O bit i do resultado corresponde à linha i. A conversão inteira
+    roda em C: translate() gera os dígitos e int(..., 2) os interpreta.
+    """
+    if not mascara:
+        return 0
+    return int(mascara.translate(_BYTES_PARA_DIGITOS)[::-1], 2)
+
+
+def bitmap_de_posicoes(posicoes, tamanho: int) -> int:
+    """Inteiro de bits com as posições indicadas ligadas"""
+    mascara = bytearray(tamanho)
+    for posicao in posicoes:
+        mascara[posicao] = 1
+    return bitmap_de_mascara(mascara)
+
+
+def posicoes_do_bitmap(bits: int) -> array:
+    """Posições (em ordem crescente) dos bits ligados"""
+    if not bits:
+        return array('I')
+    mascara = bin(bits)[:1:-1].encode().translate(_DIGITOS_PARA_BYTES)
+    return array('I', compress(range(len(mascara)), mascara))
+
+
+class IndiceBitmap:
+    """
+      Índice Bitmap (valor -> inteiro com um bit por linha)
+
+    Demonstra:
+    - int do Python como conjunto de bits de tamanho arbitrário
+    - Filtros compostos com operadores bit a bit: & (E), | (OU), ~ (NÃO)
+    - Cada operação processa 30 linhas por "dígito" interno, em C
+
+    💡 Ideal para colunas com POUCOS valores distintos (país, sim/não):
+    são poucos bitmaps, e combinar filtros vira aritmética de inteiros.
+    """
+
+    __slots__ = ('bitmaps',)
+
+    def __init__(self):
+        self.bitmaps: Dict[Any, int] = {}
+
+    def estender(self, valores, inicio: int):
+        """Liga os bits das linhas novas (posições `inicio`, `inicio + 1`, ...)"""
+        valores = list(valores)
+        
+        # 🎭 Uma máscara (um byte por linha nova) para cada valor distinto
+        mascaras: Dict[Any, bytearray] = {}
+        for deslocamento, valor in enumerate(valores):
+            mascara = mascaras.get(valor)
+            if mascara is None:
+                mascara = mascaras[valor] = bytearray(len(valores))
+            mascara[deslocamento] = 1
+        
+        for valor, mascara in mascaras.items():
+            bits = bitmap_de_mascara(mascara) << inicio
+            self.bitmaps[valor] = self.bitmaps.get(valor, 0) | bits
+
+    def bitmap(self, valor: Any) -> int:
+        """Linhas com o valor (0 se o valor nunca apareceu)"""
+        return self.bitmaps.get(valor, 0)
+
+    def qualquer(self, valores) -> int:
+        """Linhas com QUALQUER um dos valores (OU bit a bit)"""
+        bits = 0
+        for valor in valores:
+            bits |= self.bitmaps.get(valor, 0)
+        return bits
+
+
+# ============================================================================
+# BUSCA TEXTUAL - Palavras das descrições de produtos
+# ============================================================================
+
+# 🔤 Uma palavra = sequência de letras/dígitos ("T-LIGHT" -> "t", "light")
+PADRAO_PALAVRA = re.compile(r'\w+')
+
+# 🔗 Operadores aceitos entre termos de uma consulta
+OPERADORES_OU = {'OR', 'OU'}
+OPERADORES_E = {'AND'}
+
+
+def tokenizar(texto: str) -> List[str]:
+    """
+    Separa um texto em palavras normalizadas (casefold).
+
+    Exemplo: "RED  Heart T-LIGHT" -> ['red', 'heart', 't', 'light']
+    """
+    return PADRAO_PALAVRA.findall(texto.casefold())
+
+
+def trigramas(texto: str) -> frozenset:
+    """
+    Conjunto de trigramas (sequências de 3 caracteres) de um texto.
+
+    As palavras recebem espaços nas bordas para que o início e o fim
+    também contem: "uk" -> {'  u', ' uk', 'uk '}.
+    """
+    resultado = set()
+    for palavra in tokenizar(texto):
+        palavra = f"  {palavra} "
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return frozenset(resultado)
+
+
+class IndiceTrigramas:
+    """
+      Busca Aproximada por Trigramas
+
+    Demonstra:
+    - Índice invertido de trigrama -> textos que o contêm
+    - Similaridade de Jaccard: trigramas em comum / trigramas no total
+    - Tolerância a erros de digitação: "Untied Kingdom" ainda
+      compartilha a maioria dos trigramas com "United Kingdom"
+
+    Cada texto aponta para um conjunto de chaves (ex.: os códigos de
+    produto que usam aquela descrição).
+    """
+
+    __slots__ = ('_textos', '_por_trigrama')
+
+    def __init__(self):
+        self._textos: Dict[str, Tuple[frozenset, set]] = {}  # texto -> (trigramas, chaves)
+        self._por_trigrama: Dict[str, set] = {}              # trigrama -> textos
+
+    def __len__(self) -> int:
+        return len(self._textos)
+
+    def adicionar(self, texto: str, chave: str):
+        """Associa a chave ao texto (o texto só é decomposto na primeira vez)"""
+        registro = self._textos.get(texto)
+        if registro is None:
+            registro = self._textos[texto] = (trigramas(texto), set())
+            for trigrama in registro[0]:
+                textos = self._por_trigrama.get(trigrama)
+                if textos is None:
+                    textos = self._por_trigrama[trigrama] = set()
+                textos.add(texto)
+        registro[1].add(chave)
+
+    def buscar(self, consulta: str, limite: int = 5, similaridade_minima: float = 0.3,
+               parcial: bool = False) -> List[Tuple[str, float, set]]:
+        """
+        Textos mais parecidos com a consulta, do mais para o menos similar.
+
+        Só os textos que compartilham algum trigrama com a consulta são
+        avaliados; os demais nem são visitados.
+
+        Args:
+            parcial: Se True, mede quanto da CONSULTA aparece no texto
+                (bom para trechos de descrições longas); senão, usa a
+                similaridade de Jaccard entre os dois conjuntos
+
+        Returns:
+            List[Tuple[str, float, set]]: (texto, similaridade, chaves)
+        """
+        alvo = trigramas(consulta)
+        if not alvo:
+            return []
+
+        # 🧮 Trigramas em comum com cada candidato (contagem em C)
+        por_trigrama = self._por_trigrama
+        em_comum = Counter(chain.from_iterable(por_trigrama.get(t, ()) for t in alvo))
+
+        resultado = []
+        for texto, comuns in em_comum.items():
+            trigramas_texto, chaves = self._textos[texto]
+            jaccard = comuns / (len(alvo) + len(trigramas_texto) - comuns)
+            similaridade = comuns / len(alvo) if parcial else jaccard
+            if similaridade >= similaridade_minima:
+                resultado.append((texto, similaridade, jaccard, chaves))
+
+        # Empates na similaridade: o texto mais próximo como um todo vem antes
+        resultado.sort(key=itemgetter(1, 2), reverse=True)
+        return [(texto, similaridade, chaves)
+                for texto, similaridade, _, chaves in resultado[:limite]]
+
+
+# ============================================================================
+# ESTATÍSTICAS DE COLUNA - Base das estimativas do planejador de consultas
+# ============================================================================
+
+# 📊 Faixas do histograma (cada uma com a mesma quantidade de linhas)
+FAIXAS_HISTOGRAMA = 100
+
+# 🏆 Valores mais comuns guardados com a contagem exata
+QUANTIDADE_MAIS_COMUNS = 20
+
+# 🤷 Seletividade presumida quando não há como estimar (ex.: < em texto)
+SELETIVIDADE_PADRAO = 1 / 3
+
+
+class EstatisticasColuna:
+    """
+      Estatísticas de uma Coluna (cardinalidade, mais comuns, histograma)
+
+    Demonstra:
+    - Cardinalidade: quantidade de valores distintos
+    - Valores mais comuns (MCV): frequência exata dos valores que
+      dominam a coluna (ex.: quantidade 1, país United Kingdom)
+    - Histograma equi-profundo: fronteiras que dividem os valores
+      ordenados em faixas com o mesmo número de linhas; dentro de uma
+      faixa, a fração é interpolada linearmente
+    - Seletividade: fração estimada das linhas que atendem a um filtro
+
+    Coletadas uma vez e reaproveitadas: são estimativas, não precisam
+    acompanhar cada inserção.
+    """
+
+    __slots__ = ('linhas', 'cardinalidade', 'mais_comuns', 'fronteiras')
+
+    def __init__(self, valores: List[Any], numerica: bool):
+        contagem = Counter(valores)
+        self.linhas = len(valores)
+        self.cardinalidade = len(contagem)
+        self.mais_comuns: Dict[Any, int] = dict(contagem.most_common(QUANTIDADE_MAIS_COMUNS))
+        self.fronteiras: List[float] = []
+        if numerica and valores:
+            ordenados = sorted(valores)
+            ultimo = len(ordenados) - 1
+            self.fronteiras = [ordenados[ultimo * faixa // FAIXAS_HISTOGRAMA]
+                               for faixa in range(FAIXAS_HISTOGRAMA + 1)]
+
+    def seletividade(self, operador: str, valor: Any) -> float:
+        """Fração estimada (0 a 1) das linhas que atendem a `campo operador valor`"""
+        if not self.linhas:
+            return 0.0
+        if operador == '==':
+            return self._igual(valor)
+        if operador == '!=':
+            return 1.0 - self._igual(valor)
+        if operador == 'in':
+            return min(1.0, sum(self._igual(item) for item in set(valor)))
+        if not self.fronteiras:
+            return SELETIVIDADE_PADRAO
+        if operador == '<':
+            return self._fracao_ate(valor, inclusivo=False)
+        if operador == '<=':
+            return self._fracao_ate(valor, inclusivo=True)
+        if operador == '>':
+            return 1.0 - self._fracao_ate(valor, inclusivo=True)
+        if operador == '>=':
+            return 1.0 - self._fracao_ate(valor, inclusivo=False)
+        if operador == 'entre':
+            return max(0.0, self._fracao_ate(valor[1], inclusivo=True)
+                       - self._fracao_ate(valor[0], inclusivo=False))
+        return SELETIVIDADE_PADRAO
+
+    def _igual(self, valor: Any) -> float:
+        if valor in self.mais_comuns:
+            return self.mais_comuns[valor] / self.linhas
+        # Fora dos mais comuns: o restante dividido igualmente entre os demais valores
+        demais = self.cardinalidade - len(self.mais_comuns)
+        if demais <= 0:
+            return 0.0
+        return (self.linhas - sum(self.mais_comuns.values())) / demais / self.linhas
+
+    def _fracao_ate(self, valor: float, inclusivo: bool) -> float:
+        """Fração das linhas com valor abaixo (ou até) `valor`, pelo histograma"""
+        fronteiras = self.fronteiras
+        if valor < fronteiras[0]:
+            return 0.0
+        if valor > fronteiras[-1] or (inclusivo and valor == fronteiras[-1]):
+            return 1.0
+        # Várias fronteiras iguais (valor muito repetido): bisect pula todas
+        # (inclusivo) ou nenhuma, e a interpolação não se aplica
+        if inclusivo:
+            faixa = bisect_right(fronteiras, valor) - 1
+        else:
+            faixa = bisect_left(fronteiras, valor) - 1
+            if faixa < 0:
+                return 0.0
+        inicio, fim = fronteiras[faixa], fronteiras[faixa + 1]
+        dentro = (valor - inicio) / (fim - inicio) if fim > inicio else 0.0
+        return (faixa + dentro) / FAIXAS_HISTOGRAMA
+
+
+# ============================================================================
+# DATAS - InvoiceDate convertida uma vez em timestamp e períodos
+# ============================================================================
+
+# 📅 Formatos aceitos em InvoiceDate (o primeiro é o do dataset Online Retail)
+FORMATOS_DATA: Tuple[str, ...] = ('%m/%d/%Y %H:%M', '%m/%d/%Y %H:%M:%S',
+                                  '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M')
+
+# 🚫 Timestamp das datas vazias ou em formato desconhecido
+DATA_INVALIDA = -1
+
+# 🗓️ Granularidades das séries temporais (ordem dos períodos em converter_data)
+GRANULARIDADES: Tuple[str, ...] = ('dia', 'semana', 'mes')
+
+# 🧠 Quantas datas distintas ficam em cache (o dataset tem ~23 mil)
+TAMANHO_CACHE_DATAS = 1 << 16
+
+# 🕛 Origem dos timestamps (datas do CSV não têm fuso: tratadas como UTC)
+_EPOCA = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_DATAS)
+def converter_data(texto: str) -> Tuple[int, Optional[Tuple[str, str, str]]]:
+    """
+      Conversão de InvoiceDate com Cache
+
+    Muitas linhas compartilham a mesma data (todas as linhas de uma
+    fatura, por exemplo): com lru_cache cada texto distinto passa pelo
+    strptime() uma única vez.
+
+    Returns:
+        Tuple: (timestamp em segundos, (dia, semana ISO, mês)), com
+        períodos como '2010-12-01', '2010-W48' e '2010-12' (texto que
+        ordena cronologicamente); (DATA_INVALIDA, None) se não converter
+    """
+    for formato in FORMATOS_DATA:
+        try:
+            momento = datetime.strptime(str(texto).strip(), formato)
+            break
+        except ValueError:
+            continue
+    else:
+        return DATA_INVALIDA, None
+    ano_iso, semana_iso, _ = momento.isocalendar()
+    return (int((momento - _EPOCA).total_seconds()),
+            (f'{momento:%Y-%m-%d}', f'{ano_iso}-W{semana_iso:02d}', f'{momento:%Y-%m}'))
+
+
+# ============================================================================
+# SNAPSHOT BINÁRIO - Cache em disco para não reprocessar o CSV
+# ============================================================================
+
+# 🏷️ Versão do formato: mudar quando as estruturas de DataStructure mudarem
+VERSAO_SNAPSHOT = 4
+
+# 💾 O que vai para o snapshot: linhas, agregados, sketches e os índices
+# por posição. Estes são arrays (timestamps, índice ordenado, listas de
+# posições por chave) e inteiros (bitmaps): o pickle os grava como blocos
+# de bytes, e lê-los custa bem menos que refazê-los linha a linha.
+# Ficam de fora só os índices do vocabulário (palavras e trigramas dos
+# países), refeitos a partir das chaves distintas, e o cache de estatísticas
+CAMPOS_SNAPSHOT = (
+    'vendas', 'ids_linhas', 'proximo_id', 'removidas', 'versao_dados', 'colunas_dataset',
+    'produtos', 'clientes', 'paises', 'agregados_paises', 'rollups', 'somas',
+    'contador_vendas_pais', 'contador_produtos',
+    'rankings_produtos', 'rankings_clientes', 'ranking_paises',
+    'sketches', 'quantis', 'quantis_paises', 'heavy_hitters',
+    'timestamps', 'indice_faturas', 'indice_produtos', 'codigos_produtos', 'indice_paises',
+    'indice_totais', 'indice_descricoes', 'trigramas_descricoes',
+    'bitmap_paises', 'bitmap_canceladas', 'bitmap_com_cliente'
+)
+
+# 📁 Pasta onde os snapshots ficam guardados (ao lado do app.py)
+DIRETORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# 📄 Arquivo do snapshot mais recente
+CAMINHO_SNAPSHOT = os.path.join(DIRETORIO_CACHE, 'vendas.snapshot')
+
+
+def chave_arquivo(caminho: str) -> Tuple[int, int, str]:
+    """
+      Identidade de um Arquivo de Origem
+
+    Demonstra:
+    - os.stat() para tamanho e data de modificação
+    - hashlib para resumir o conteúdo em poucos bytes
+    - Leitura em blocos (não carrega o arquivo inteiro na memória)
+
+    Returns:
+        Tuple[int, int, str]: (tamanho, mtime em ns, hash do conteúdo)
+    """
+    info = os.stat(caminho)
+    resumo = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            resumo.update(bloco)
+    return info.st_size, info.st_mtime_ns, resumo.hexdigest()
+
+
+def ler_cabecalho_snapshot(caminho_snapshot: str = CAMINHO_SNAPSHOT) -> Optional[Dict[str, Any]]:
+    """Lê só o cabeçalho do snapshot (origem, chave, versão) sem o corpo"""
+    try:
+        with open(caminho_snapshot, 'rb') as arquivo:
+            cabecalho = pickle.load(arquivo)
+        if cabecalho.get('versao') != VERSAO_SNAPSHOT:
+            return None
+        return cabecalho
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
+# ============================================================================
+# CLASSE DATASTRUCTURE - Organização das Estruturas de Dados
+# ============================================================================
+
+class DataStructure:
+    """
+      Estruturas de Dados Organizadas
+    
+    Esta classe demonstra como organizar dados usando as estruturas corretas:
+    - LISTAS: Para dados ordenados e pesquisáveis
+    - DICIONÁRIOS: Para acesso rápido por chave
+    - TUPLAS: Para dados imutáveis (que não mudam)
+    - CONTADORES: Para estatísticas automáticas
+    
+    💡 CONCEITO: Cada estrutura tem seu propósito específico!
+    """
+    
+    def __init__(self, armazenamento_colunar: bool = False, remocao_logica: bool = True,
+                 limiar_compactacao: float = 0.25, precisao_hll: int = PRECISAO_HLL_PADRAO,
+                 heavy_hitters: bool = False):
+        """
+        🏗️ CONSTRUTOR DA CLASSE
+
+        Aqui inicializamos todas as estruturas de dados que vamos usar.
+        O __init__ é chamado automaticamente quando criamos um objeto.
+
+        Args:
+            armazenamento_colunar: Se True, guarda as vendas em colunas
+                (ArmazenamentoColunar) em vez de uma lista de dicionários
+            remocao_logica: Se True (padrão), remoções só marcam a linha
+                (lápide) e o espaço é recuperado depois, em uma compactação.
+                False compacta a cada remoção, refazendo todos os índices
+                (só para quem precisa das posições físicas na hora)
+            limiar_compactacao: Fração de linhas removidas a partir da qual
+                compactar_se_necessario() compacta (0.25 = um quarto)
+            precisao_hll: Precisão dos sketches HyperLogLog (erro padrão
+                ≈ 1,04 / √(2^precisão); ver HyperLogLog.precisao_para_erro)
+            heavy_hitters: Se True, contadores e rankings exatos dão lugar
+                a um MonitorHeavyHitters (Count-Min + Space-Saving): os
+                rankings passam a ser aproximados, em memória fixa
+        """
+
+        # ====================================================================
+        # ESTRUTURAS PRINCIPAIS DE DADOS
+        # ====================================================================
+
+        # 📝 LISTA DE VENDAS:
+        # - Por que lista? Porque precisamos manter a ordem das vendas
+        # - Por que List[Dict[str, Any]]? Cada venda é um dicionário com dados
+        # - Exemplo: [{'invoice_no': '001', 'total': 100.0}, {...}]
+        # - Opção colunar: mesma interface de lista, muito menos memória
+        self.vendas: List[Dict[str, Any]] = ArmazenamentoColunar() if armazenamento_colunar else []
+        
+        # 📦 DICIONÁRIO DE PRODUTOS:
+        # - Por que dicionário? Para buscar produtos rapidamente pelo código
+        # - Estrutura: {'PROD001': {'description': 'Produto 1', 'vendas': 10}}
+        # - Acesso rápido: O(1) vs O(n) em lista
+        self.produtos: Dict[str, Dict[str, Any]] = {}
+        
+        # 👥 DICIONÁRIO DE CLIENTES:
+        # - Similar aos produtos, mas indexado por ID do cliente
+        # - Permite encontrar cliente instantaneamente
+        self.clientes: Dict[str, Dict[str, Any]] = {}
+        
+        # 🌍 PAÍSES COM DEFAULTDICT:
+        # - defaultdict(Counter) cria um contador vazio automaticamente
+        # - Evita erros de "key not found"
+        # - Exemplo: se acessarmos paises['Brasil'], cria Counter() automaticamente
+        # - Fatura -> quantidade de linhas: remover uma linha é O(1)
+        #   (em uma lista seria preciso procurar a fatura)
+        self.paises: Dict[str, Counter] = defaultdict(Counter)
+        
+        # 🗺️ AGREGADOS POR PAÍS (país em casefold, como no índice por país):
+        # - Receita, quantidade e número de linhas somados incrementalmente
+        # - Produtos e clientes em Counter (chave -> linhas): remover a
+        #   última linha de um produto o tira da contagem de distintos
+        # - Relatório de um país = leitura de um dicionário
+        self.agregados_paises: Dict[str, Dict[str, Any]] = {}
+        
+        # 📅 SÉRIES TEMPORAIS MATERIALIZADAS (rollups por dia, semana e mês):
+        # - granularidade -> período ('2010-12', '2010-W48'...) -> agregado
+        # - Receita, quantidade e linhas somadas; faturas e clientes em
+        #   Counter (chave -> linhas), como nos agregados por país
+        # - Atualizadas a cada inserção, alteração e remoção
+        self.rollups: Dict[str, Dict[str, Dict[str, Any]]] = {
+            granularidade: {} for granularidade in GRANULARIDADES
+        }
+        
+        # 🎲 SKETCHES HYPERLOGLOG (distintos aproximados em memória fixa):
+        # - (escopo, campo) -> chave do escopo -> sketch
+        # - Ex.: sketches[('pais', 'clientes')]['united kingdom']
+        # - Só recebem inserções; a compactação os refaz sem as lápides
+        self.precisao_hll = precisao_hll
+        self.sketches: Dict[Tuple[str, str], Dict[str, HyperLogLog]] = {
+            escopo: {} for escopo in ESCOPOS_SKETCH
+        }
+        
+        # 📐 SKETCHES DE QUANTIS (KLL) de total, preço e quantidade:
+        # - quantis: campo -> sketch de todas as vendas
+        # - quantis_paises: país (casefold) -> campo -> sketch
+        # - Alimentados e refeitos junto com os sketches HyperLogLog
+        self.quantis: Dict[str, SketchQuantis] = {campo: SketchQuantis() for campo in CAMPOS_QUANTIS}
+        self.quantis_paises: Dict[str, Dict[str, SketchQuantis]] = {}
+        
+        # 🔥 HEAVY HITTERS (opcional): Count-Min + Space-Saving por produto,
+        # cliente e país, em memória fixa
+        # - SUBSTITUI os contadores e rankings exatos abaixo (ficam None/vazios)
+        # - Alimentado com as inserções e descontado nas alterações e
+        #   remoções; refeito junto com os demais sketches na compactação
+        self.heavy_hitters: Optional[MonitorHeavyHitters] = MonitorHeavyHitters() if heavy_hitters else None
+        
+        # ====================================================================
+        # TUPLAS PARA METADADOS (DADOS IMUTÁVEIS)
+        # ====================================================================
+        
+        # 📋 COLUNAS DO DATASET:
+        # - Por que tupla? Porque as colunas NUNCA mudam!
+        # - Tuplas são imutáveis, garantem que ninguém altere por engano
+        # - Mais eficiente em memória que listas
+        self.colunas_dataset: Tuple[str, ...] = (
+            'InvoiceNo',    # Número da fatura
+            'StockCode',    # Código do produto
+            'Description',  # Descrição do produto
+            'Quantity',     # Quantidade vendida
+            'InvoiceDate',  # Data da venda
+            'UnitPrice',    # Preço unitário
+            'CustomerID',   # ID do cliente
+            'Country'       # País da venda
+        )
+        
+        # ====================================================================
+        # CONTADORES PARA ESTATÍSTICAS AUTOMÁTICAS
+        # ====================================================================
+        
+        # 📊 CONTADOR DE VENDAS POR PAÍS:
+        # - Counter é um dicionário especial que conta automaticamente
+        # - Exemplo: counter['Brasil'] += 1 conta mais uma venda no Brasil
+        # - Método most_common() retorna os mais frequentes
+        # - None com heavy_hitters (um por chave distinta: sem limite)
+        exatos = not heavy_hitters
+        self.contador_vendas_pais: Optional[Counter] = Counter() if exatos else None
+        
+        # 📈 CONTADOR DE PRODUTOS:
+        # - Conta quantas vezes cada produto foi vendido
+        # - Útil para rankings e estatísticas
+        self.contador_produtos: Optional[Counter] = Counter() if exatos else None
+        
+        # ➕ SOMAS CORRENTES dos campos numéricos (só linhas ativas):
+        # - Atualizadas em cada inserção, alteração e remoção (O(1) por linha)
+        # - Médias e totais gerais saem daqui sem percorrer as vendas
+        self.somas: Dict[str, float] = dict.fromkeys(TIPOS_NUMERICOS, 0)
+        
+        # 🏆 RANKINGS INCREMENTAIS (um por critério):
+        # - Atualizados a cada inserção, alteração e remoção
+        # - Telas de ranking leem os K primeiros, sem ordenar nada
+        # - Vazios/None com heavy_hitters (o monitor responde os rankings)
+        self.rankings_produtos: Dict[str, RankingIncremental] = {
+            criterio: RankingIncremental() for criterio in CRITERIOS_RANKING_PRODUTOS
+        } if exatos else {}
+        self.rankings_clientes: Dict[str, RankingIncremental] = {
+            criterio: RankingIncremental() for criterio in CRITERIOS_RANKING_CLIENTES
+        } if exatos else {}
+        self.ranking_paises: Optional[RankingIncremental] = RankingIncremental() if exatos else None
+        
+        # ====================================================================
+        # ÍNDICES (ACESSO DIRETO ÀS POSIÇÕES EM self.vendas)
+        # ====================================================================
+        
+        # 🔑 ÍNDICE HASH POR FATURA:
+        # - invoice_no -> posições de TODAS as linhas da fatura
+        # - Busca O(1) em vez de percorrer a lista inteira
+        # - array('I') guarda as posições com 4 bytes cada
+        self.indice_faturas: Dict[str, array] = {}
+        
+        # 📦 ÍNDICE SECUNDÁRIO POR PRODUTO: stock_code -> posições
+        self.indice_produtos: Dict[str, array] = {}
+        
+        # 🔤 CÓDIGOS DE PRODUTO EM ORDEM: paginação por cursor (bisect)
+        self.codigos_produtos: List[str] = []
+        
+        # 🌍 ÍNDICE SECUNDÁRIO POR PAÍS: país em casefold() -> posições
+        # - "brasil", "Brasil" e "BRASIL" caem na mesma chave
+        self.indice_paises: Dict[str, array] = {}
+        
+        # 💰 ÍNDICE ORDENADO POR TOTAL: consultas por faixa de valor
+        self.indice_totais = IndiceOrdenado()
+        
+        # 📝 ÍNDICE POR DESCRIÇÃO: descrição -> posições
+        self.indice_descricoes: Dict[str, array] = {}
+        
+        # 🔎 ÍNDICE INVERTIDO: palavra -> descrições que a contêm
+        # - Cada descrição distinta é quebrada em palavras uma única vez
+        # - Consulta por palavra: descrições -> posições (índice acima)
+        self.indice_palavras: Dict[str, set] = {}
+        
+        # 🔤 TRIGRAMAS: busca tolerante a erros de digitação
+        # - Descrições -> códigos de produto; países -> o próprio nome
+        self.trigramas_descricoes = IndiceTrigramas()
+        self.trigramas_paises = IndiceTrigramas()
+        
+        # 🧮 BITMAPS (colunas com poucos valores distintos):
+        # - país (casefold), fatura cancelada (começa com 'C'), tem cliente
+        # - Filtros compostos viram &, | e ~ entre inteiros
+        self.bitmap_paises = IndiceBitmap()
+        self.bitmap_canceladas = IndiceBitmap()
+        self.bitmap_com_cliente = IndiceBitmap()
+
+        # 📊 ESTATÍSTICAS POR COLUNA (planejador de consultas):
+        # - Coletadas sob demanda, só para as colunas consultadas
+        # - Refeitas quando a quantidade de linhas muda mais de 10%
+        self.estatisticas: Dict[str, EstatisticasColuna] = {}
+
+        # ====================================================================
+        # REMOÇÃO LÓGICA (LÁPIDES)
+        # ====================================================================
+        
+        # 🪦 POSIÇÕES REMOVIDAS:
+        # - Remover uma linha só a marca aqui (O(1)), nada é deslocado
+        # - As posições das demais linhas não mudam até a compactação,
+        #   então os índices continuam válidos
+        # - Buscas e varreduras ignoram as posições deste conjunto
+        # - A compactação nunca roda dentro de uma remoção: quem chama
+        #   compactar_se_necessario() escolhe a hora (ex.: volta ao menu)
+        self.removidas: set = set()
+        self.remocao_logica = remocao_logica
+        self.limiar_compactacao = limiar_compactacao
+        
+        # 🆔 IDENTIFICADOR ESTÁVEL DE CADA LINHA:
+        # - Crescente e nunca reaproveitado; a compactação descarta os ids
+        #   junto com as linhas, então ids_linhas continua ordenado
+        # - Posição atual de um id: bisect em ids_linhas (O(log n)), o que
+        #   mantém cursores de paginação válidos depois da compactação
+        self.ids_linhas = array('Q')
+        self.proximo_id = 0
+        
+        # 🕒 TIMESTAMP DE CADA LINHA (paralelo a vendas):
+        # - InvoiceDate convertida uma única vez, na inserção
+        # - DATA_INVALIDA para datas vazias ou em formato desconhecido
+        self.timestamps = array('q')
+        
+        # 🔖 VERSÃO DOS DADOS: +1 a cada inserção, alteração e remoção
+        # - Resultados derivados (ex.: cubo de agregações) guardam a versão
+        #   em que foram calculados e são refeitos quando ela muda
+        self.versao_dados = 0
+        
+    def adicionar_venda(self, registro: Dict[str, Any]) -> bool:
+        """
+          Método para Adicionar Vendas
+        
+        Este método demonstra:
+        - Validação de dados de entrada
+        - Conversão segura de tipos
+        - Tratamento de exceções
+        - Atualização de múltiplas estruturas
+        
+        Args:
+            registro: Dicionário com dados da venda do CSV
+            
+        Returns:
+            bool: True se sucesso, False se erro
+        """
+        try:
+            # ================================================================
+            # ETAPA 1: VALIDAÇÃO DOS DADOS OBRIGATÓRIOS
+            # ================================================================
+            
+            # 🔍 Por que validar?
+            # - Evita dados corrompidos no sistema
+            # - Falha rápida se dados essenciais estão ausentes
+            # - .get() retorna None se chave não existir (seguro)
+            
+            if not registro.get('InvoiceNo') or not registro.get('StockCode'):
+                # raise ValueError interrompe a execução e lança uma exceção
+                # Será capturada pelo except abaixo
+                raise ValueError("InvoiceNo e StockCode são obrigatórios")
+            
+            # ================================================================
+            # ETAPA 2: CONVERSÃO SEGURA DE TIPOS
+            # ================================================================
+            
+            # 🔄 Por que converter tipos?
+            # - Dados do CSV vêm como string
+            # - Precisamos de números para cálculos
+            # - .get(chave, valor_padrão) evita erros se chave não existir
+            
+            venda = {
+                # Strings: mantemos como texto
+                'invoice_no': str(registro['InvoiceNo']),
+                'stock_code': str(registro['StockCode']),
+                'description': str(registro.get('Description', '')),  # '' se vazio
+                
+                # Números inteiros: int(float()) para lidar com "1.0"
+                'quantity': int(float(registro.get('Quantity', 0))),
+                
+                # Datas: mantemos como string por simplicidade
+                'invoice_date': str(registro.get('InvoiceDate', '')),
+                
+                # Números decimais: float() para preços
+                'unit_price': float(registro.get('UnitPrice', 0)),
+                
+                # IDs: podem estar vazios, mantemos como string
+                'customer_id': str(registro.get('CustomerID', '')),
+                'country': str(registro.get('Country', '')),
+                
+                # Cálculo do total: quantidade × preço unitário
+                'total': int(float(registro.get('Quantity', 0))) * float(registro.get('UnitPrice', 0))
+            }
+            
+            # ================================================================
+            # ETAPA 3: ADICIONAR À ESTRUTURA PRINCIPAL
+            # ================================================================
+            
+            # 📝 Adicionar à lista de vendas
+            # - append() adiciona ao final da lista
+            # - Mantém ordem cronológica das vendas
+            self.vendas.append(venda)
+            
+            # ================================================================
+            # ETAPA 4: ATUALIZAR ESTRUTURAS AUXILIARES
+            # ================================================================
+            
+            # 🔄 Por que atualizar outras estruturas?
+            # - Mantém consistência dos dados
+            # - Permite buscas rápidas por produto, cliente, país
+            # - Atualiza estatísticas automaticamente
+            
+            self._atualizar_produto(venda)   # Atualiza dicionário de produtos
+            self._atualizar_cliente(venda)   # Atualiza dicionário de clientes  
+            self._atualizar_pais(venda)      # Atualiza dicionário de países
+            self._atualizar_rankings([venda['stock_code']], [venda['customer_id']], [venda['country']])
+            self._acumular_rollups([venda['invoice_date']], [venda['invoice_no']],
+                                   [venda['customer_id']], [venda['quantity']], [venda['total']])
+            self._indexar_linhas(len(self.vendas) - 1)  # Atualiza os índices
+            self.versao_dados += 1
+            
+            return True  # ✅ Sucesso!
+            
+        except (ValueError, TypeError) as e:
+            # ================================================================
+            # TRATAMENTO DE EXCEÇÕES
+            # ================================================================
+            
+            # 🚑 Por que capturar exceções?
+            # - ValueError: dados inválidos (ex: string em campo numérico)
+            # - TypeError: tipos incompatíveis
+            # - Evita que o programa pare completamente
+            
+            print(f"Erro ao adicionar venda: {e}")
+            return False  # ❌ Falhou!
+    
+    def adicionar_vendas(self, linhas, colunas: Optional[List[str]] = None,
+                         numero_inicial: int = 1, somente_texto: bool = False,
+                         indexar: bool = True) -> Dict[str, Any]:
+        """
+          Inserção em Lote (Bulk Insert) Coluna a Coluna
+
+        Mesmas regras de adicionar_venda, mas pensada para milhares de
+        linhas de uma vez:
+        - As linhas são transpostas em colunas e CADA COLUNA é convertida
+          uma única vez com map() (o laço roda em C, não em Python)
+        - Quantity e UnitPrice não são lidos nem convertidos duas vezes
+        - Só uma coluna com valor inválido cai no conversor item a item,
+          que descobre exatamente quais linhas rejeitar e por quê
+        - Agregados atualizados em laços curtos com variáveis locais, sem
+          chamar _atualizar_produto/_cliente/_pais por registro
+        - As vendas aceitas são anexadas ao armazenamento em bloco
+
+        Args:
+            linhas: Iterável de dicionários (como os do csv.DictReader) ou
+                de tuplas/listas (como as do csv.reader)
+            colunas: Ordem das colunas nas tuplas (padrão: colunas_dataset)
+            numero_inicial: Número atribuído à primeira linha (ex.: 2 para
+                numerar como no arquivo, em que a linha 1 é o cabeçalho)
+            somente_texto: True quando todos os campos já são str (ex.: linhas
+                do csv.reader); dispensa a conversão str() das colunas de texto
+            indexar: False adia índices e rankings (processos trabalhadores:
+                só linhas, agregados e sketches); indexar_pendentes() os monta
+
+        Returns:
+            Dict: {'aceitas': [números das linhas aceitas],
+                   'rejeitadas': [(número da linha, motivo)]}
+        """
+
+        # ================================================================
+        # ETAPA 1: LINHAS -> COLUNAS
+        # ================================================================
+
+        necessarias = ('InvoiceNo', 'StockCode', 'Description', 'Quantity',
+                       'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country')
+        # Padrões iguais aos .get() de adicionar_venda (coluna ausente)
+        padroes = ('', '', '', 0, '', 0, '', '')
+
+        linhas = list(linhas)
+        quantidade_linhas = len(linhas)
+        if not linhas:
+            return {'aceitas': [], 'rejeitadas': []}
+
+        if isinstance(linhas[0], Mapping):
+            # 📖 Dicionários: um .get() por coluna, aplicado com map()
+            brutas = [list(map(methodcaller('get', campo, padrao), linhas))
+                      for campo, padrao in zip(necessarias, padroes)]
+        else:
+            # 📋 Tuplas/listas: posição de cada coluna resolvida uma vez
+            colunas = list(colunas or self.colunas_dataset)
+            largura = len(colunas)
+            if min(map(len, linhas)) < largura:
+                # Linha curta: faltantes = None (como no csv.DictReader)
+                linhas = [linha if len(linha) >= largura else tuple(linha) + (None,) * (largura - len(linha))
+                          for linha in linhas]
+            brutas = [list(map(itemgetter(colunas.index(campo)), linhas)) if campo in colunas
+                      else [padrao] * quantidade_linhas
+                      for campo, padrao in zip(necessarias, padroes)]
+
+        (faturas, codigos, descricoes, quantidades, datas,
+         precos, ids_clientes, nomes_paises) = brutas
+
+        # ================================================================
+        # ETAPA 2: VALIDAÇÃO E CONVERSÃO POR COLUNA
+        # ================================================================
+
+        motivos: Dict[int, str] = {}  # posição da linha -> motivo da rejeição
+
+        # 🔍 Obrigatórios (verificados antes do str(), como em adicionar_venda)
+        if not (all(faturas) and all(codigos)):
+            for posicao, (fatura, codigo) in enumerate(zip(faturas, codigos)):
+                if not fatura or not codigo:
+                    motivos[posicao] = "InvoiceNo e StockCode são obrigatórios"
+
+        # 🔤 Textos
+        if not somente_texto:
+            faturas, codigos, descricoes, datas, ids_clientes, nomes_paises = (
+                list(map(str, coluna))
+                for coluna in (faturas, codigos, descricoes, datas, ids_clientes, nomes_paises)
+            )
+
+        # 🔢 Números: int(float()) para lidar com "1.0"; float() para preços
+        quantidades = self._converter_coluna(
+            quantidades, lambda valores: list(map(int, map(float, valores))),
+            lambda valor: int(float(valor)), motivos
+        )
+        precos = self._converter_coluna(
+            precos, lambda valores: list(map(float, valores)), float, motivos
+        )
+
+        # 🚫 Retirar as linhas rejeitadas de todas as colunas
+        if motivos:
+            mascara = [posicao not in motivos for posicao in range(quantidade_linhas)]
+            faturas, codigos, descricoes, quantidades, datas, precos, ids_clientes, nomes_paises = (
+                list(compress(coluna, mascara))
+                for coluna in (faturas, codigos, descricoes, quantidades, datas,
+                               precos, ids_clientes, nomes_paises)
+            )
+            aceitas = list(compress(range(numero_inicial, numero_inicial + quantidade_linhas), mascara))
+            rejeitadas = [(numero_inicial + posicao, motivos[posicao]) for posicao in sorted(motivos)]
+        else:
+            aceitas = list(range(numero_inicial, numero_inicial + quantidade_linhas))
+            rejeitadas = []
+
+        # 💰 Total = quantidade × preço, também coluna a coluna
+        totais = list(map(mul, quantidades, precos))
+
+        # 🧵 Uma única cópia de cada número de fatura (reaproveitada em paises)
+        faturas_unicas: Dict[str, str] = {}
+        faturas = list(map(faturas_unicas.setdefault, faturas, faturas))
+
+        # ================================================================
+        # ETAPA 3: GRAVAÇÃO EM BLOCO
+        # ================================================================
+
+        novas = dict(zip(CAMPOS_VENDA, (faturas, codigos, descricoes, quantidades, datas,
+                                        precos, ids_clientes, nomes_paises, totais)))
+        if isinstance(self.vendas, ArmazenamentoColunar):
+            self.vendas.anexar_colunas(novas)
+        else:
+            # Dicionário literal: bem mais rápido que dict(zip(...)) por linha
+            self.vendas.extend(
+                {'invoice_no': fatura, 'stock_code': codigo, 'description': descricao,
+                 'quantity': quantidade, 'invoice_date': data, 'unit_price': preco,
+                 'customer_id': customer_id, 'country': pais, 'total': total}
+                for fatura, codigo, descricao, quantidade, data, preco, customer_id, pais, total
+                in zip(*novas.values())
+            )
+
+        # ================================================================
+        # ETAPA 4: AGREGADOS EM LAÇOS CURTOS
+        # ================================================================
+
+        produtos = self.produtos
+        clientes = self.clientes
+        paises = self.paises
+        agregados: Dict[str, Dict[str, Any]] = {}  # país -> agregado (casefold resolvido uma vez)
+
+        # 📦 O Counter de produtos recebe a diferença de quantidade no final
+        quantidade_antes = {
+            codigo: produtos[codigo]['quantidade_total'] if codigo in produtos else 0
+            for codigo in dict.fromkeys(codigos)
+        }
+
+        # 🔄 UM laço para produtos, clientes e países
+        for codigo, descricao, quantidade, total, customer_id, pais, fatura in zip(
+                codigos, descricoes, quantidades, totais, ids_clientes, nomes_paises, faturas):
+
+            produto = produtos.get(codigo)
+            if produto is None:
+                produto = produtos[codigo] = {
+                    'description': descricao,
+                    'vendas_total': 0,
+                    'quantidade_total': 0,
+                    'receita_total': 0.0
+                }
+            produto['vendas_total'] += 1
+            produto['quantidade_total'] += quantidade
+            produto['receita_total'] += total
+
+            if customer_id:  # 👥 Só clientes identificados
+                cliente = clientes.get(customer_id)
+                if cliente is None:
+                    cliente = clientes[customer_id] = {
+                        'pais': pais,
+                        'compras_total': 0,
+                        'quantidade_total': 0,
+                        'gasto_total': 0.0
+                    }
+                cliente['compras_total'] += 1
+                cliente['quantidade_total'] += quantidade
+                cliente['gasto_total'] += total
+
+            if pais:  # 🌍 Só países preenchidos
+                paises[pais][fatura] += 1
+                agregado = agregados.get(pais)
+                if agregado is None:
+                    agregado = agregados[pais] = self._agregado_do_pais(pais)
+                agregado['vendas_total'] += 1
+                agregado['quantidade_total'] += quantidade
+                agregado['receita_total'] += total
+                agregado['produtos'][codigo] += 1
+                if customer_id:
+                    agregado['clientes'][customer_id] += 1
+
+        contador_produtos = self.contador_produtos
+        if contador_produtos is not None:
+            for codigo, antes in quantidade_antes.items():
+                contador_produtos[codigo] += produtos[codigo]['quantidade_total'] - antes
+
+            # 📈 Counter conta a coluna de países inteira em C
+            self.contador_vendas_pais.update(filter(None, nomes_paises))
+
+        # 📅 Séries temporais: agrupadas por texto de data antes de somar
+        self._acumular_rollups(datas, faturas, ids_clientes, quantidades, totais)
+
+        # 🏆 Rankings: uma entrada por chave tocada no lote
+        if indexar:
+            self._atualizar_rankings(quantidade_antes, dict.fromkeys(ids_clientes),
+                                     dict.fromkeys(nomes_paises))
+
+        # 🔑 Índices das linhas recém-gravadas (ou só os sketches, que
+        # são mesclados prontos em vez de refeitos)
+        if indexar:
+            self._indexar_linhas(len(self.vendas) - len(aceitas))
+        else:
+            self._alimentar_sketches(len(self.vendas) - len(aceitas))
+        self.versao_dados += 1
+
+        return {'aceitas': aceitas, 'rejeitadas': rejeitadas}
+
+    @staticmethod
+    def _converter_coluna(valores: List[Any], converter_tudo, converter_um,
+                          motivos: Dict[int, str], bloco: int = 4096) -> List[Any]:
+        """
+        Converte uma coluna de uma vez. Se algum valor for inválido, a
+        coluna é refeita em blocos: só o bloco com problema é convertido
+        item a item, registrando o motivo de cada falha (o primeiro
+        motivo de uma linha prevalece).
+        """
+        try:
+            return converter_tudo(valores)
+        except (ValueError, TypeError, OverflowError):
+            pass
+
+        convertidos = []
+        for inicio in range(0, len(valores), bloco):
+            trecho = valores[inicio:inicio + bloco]
+            try:
+                convertidos.extend(converter_tudo(trecho))
+                continue
+            except (ValueError, TypeError, OverflowError):
+                pass
+            for posicao, valor in enumerate(trecho, start=inicio):
+                try:
+                    convertidos.append(converter_um(valor))
+                except (ValueError, TypeError, OverflowError) as e:
+                    convertidos.append(None)
+                    motivos.setdefault(posicao, str(e))
+        return convertidos
+
+    def _atualizar_produto(self, venda: Dict[str, Any]):
+        """
+          Método Privado para Atualizar Produtos
+        
+        O underscore (_) indica que é um método privado:
+        - Só deve ser chamado internamente pela classe
+        - Não faz parte da interface pública
+        - Convenção Python para organização
+        """
+        
+        # ================================================================
+        # ETAPA 1: IDENTIFICAR O PRODUTO
+        # ================================================================
+        
+        # Extrair o código do produto da venda atual
+        stock_code = venda['stock_code']
+        
+        # ================================================================
+        # ETAPA 2: VERIFICAR SE PRODUTO JÁ EXISTE
+        # ================================================================
+        
+        # 🔍 Por que verificar?
+        # - Primeira venda de um produto: criar entrada nova
+        # - Vendas subsequentes: apenas atualizar totais
+        
+        if stock_code not in self.produtos:
+            # 🆕 PRODUTO NOVO: criar entrada inicial
+            self.produtos[stock_code] = {
+                'description': venda['description'],  # Nome do produto
+                'vendas_total': 0,                   # Contador de vendas
+                'quantidade_total': 0,               # Soma das quantidades
+                'receita_total': 0.0                 # Soma dos valores
+            }
+        
+        # ================================================================
+        # ETAPA 3: ATUALIZAR ESTATÍSTICAS DO PRODUTO
+        # ================================================================
+        
+        # Referência ao produto no dicionário (para facilitar acesso)
+        produto = self.produtos[stock_code]
+        
+        # 📊 Incrementar contadores:
+        produto['vendas_total'] += 1                    # +1 venda
+        produto['quantidade_total'] += venda['quantity'] # +quantidade vendida
+        produto['receita_total'] += venda['total']      # +valor da venda
+        
+        # ================================================================
+        # ETAPA 4: ATUALIZAR CONTADOR ESPECIAL
+        # ================================================================
+        
+        # 🏆 Counter para rankings automáticos
+        # - Usado para encontrar produtos mais vendidos rapidamente
+        # - Counter.most_common() já ordena por quantidade
+        if self.contador_produtos is not None:
+            self.contador_produtos[stock_code] += venda['quantity']
+    
+    def _atualizar_cliente(self, venda: Dict[str, Any]):
+        """
+          Atualizando Dados de Clientes
+        
+        Demonstra:
+        - Validação de dados antes de processar
+        - Criação condicional de registros
+        - Acumulação de estatísticas por cliente
+        """
+        
+        # ================================================================
+        # ETAPA 1: EXTRAIR E VALIDAR ID DO CLIENTE
+        # ================================================================
+        
+        customer_id = venda['customer_id']
+        
+        # 🔍 Por que validar customer_id?
+        # - Nem todas as vendas têm cliente identificado
+        # - Vendas anônimas ou à vista podem ter ID vazio
+        # - Evita criar entradas desnecessárias no dicionário
+        
+        if customer_id and customer_id != '':
+            # ============================================================
+            # ETAPA 2: VERIFICAR SE CLIENTE JÁ EXISTE
+            # ============================================================
+            
+            if customer_id not in self.clientes:
+                # 🆕 CLIENTE NOVO: criar perfil inicial
+                self.clientes[customer_id] = {
+                    'pais': venda['country'],          # País do cliente
+                    'compras_total': 0,                # Número de compras
+                    'quantidade_total': 0,             # Total de itens comprados
+                    'gasto_total': 0.0                 # Total gasto pelo cliente
+                }
+            
+            # ============================================================
+            # ETAPA 3: ATUALIZAR PERFIL DO CLIENTE
+            # ============================================================
+            
+            # Referência ao cliente (mais fácil que repetir self.clientes[customer_id])
+            cliente = self.clientes[customer_id]
+            
+            # 📊 Acumular estatísticas:
+            cliente['compras_total'] += 1                    # +1 compra
+            cliente['quantidade_total'] += venda['quantity'] # +itens comprados
+            cliente['gasto_total'] += venda['total']         # +valor gasto
+    
+    def _atualizar_pais(self, venda: Dict[str, Any]):
+        """
+          Atualizando Dados por País
+        
+        Demonstra:
+        - Uso do defaultdict para evitar erros
+        - Múltiplas estruturas para diferentes propósitos
+        - Eficiência de contadores automáticos
+        """
+        
+        # ================================================================
+        # ETAPA 1: EXTRAIR E VALIDAR PAÍS
+        # ================================================================
+        
+        pais = venda['country']
+        
+        # 🌍 Por que validar país?
+        # - Alguns registros podem ter país vazio
+        # - Evita processamento desnecessário
+        
+        if pais:
+            # ============================================================
+            # ETAPA 2: ADICIONAR VENDA À LISTA DO PAÍS
+            # ============================================================
+            
+            # 📝 Por que usar defaultdict(Counter)?
+            # - Se país não existe, cria um contador vazio automaticamente
+            # - Sem defaultdict, precisaríamos: if pais not in self.paises: self.paises[pais] = Counter()
+            # - += 1 conta mais uma linha da fatura no país
+            self.paises[pais][venda['invoice_no']] += 1
+            
+            # ============================================================
+            # ETAPA 3: INCREMENTAR CONTADOR DO PAÍS
+            # ============================================================
+            
+            # 📈 Por que usar Counter?
+            # - Conta automaticamente vendas por país
+            # - Counter[pais] += 1 incrementa o contador
+            # - Método .most_common() já ordena por quantidade
+            if self.contador_vendas_pais is not None:
+                self.contador_vendas_pais[pais] += 1
+            
+            # ============================================================
+            # ETAPA 4: ACUMULAR O AGREGADO DO PAÍS
+            # ============================================================
+            
+            agregado = self._agregado_do_pais(pais)
+            agregado['vendas_total'] += 1
+            agregado['quantidade_total'] += venda['quantity']
+            agregado['receita_total'] += venda['total']
+            agregado['produtos'][venda['stock_code']] += 1
+            if venda['customer_id']:
+                agregado['clientes'][venda['customer_id']] += 1
+
+    def _agregado_do_pais(self, pais: str) -> Dict[str, Any]:
+        """Agregado do país (chave em casefold), criado vazio se preciso"""
+        chave = pais.casefold()
+        agregado = self.agregados_paises.get(chave)
+        if agregado is None:
+            agregado = self.agregados_paises[chave] = {
+                'pais': pais,               # Primeira grafia vista (rótulo)
+                'vendas_total': 0,
+                'quantidade_total': 0,
+                'receita_total': 0.0,
+                'produtos': Counter(),      # stock_code -> linhas
+                'clientes': Counter()       # customer_id -> linhas
+            }
+        return agregado
+
+    def _retirar_venda(self, venda: Dict[str, Any]):
+        """
+          Desfazendo a Contribuição de uma Venda (Delta Negativo)
+
+        Faz o caminho inverso de _atualizar_produto, _atualizar_cliente e
+        _atualizar_pais em O(1): subtrai os valores da venda e remove as
+        entradas que ficaram sem nenhuma linha (como se nunca tivessem
+        sido vistas).
+        """
+        stock_code = venda['stock_code']
+        quantidade = venda['quantity']
+        total = venda['total']
+
+        # ➕ SOMAS CORRENTES
+        self.somas['quantity'] -= quantidade
+        self.somas['unit_price'] -= venda['unit_price']
+        self.somas['total'] -= total
+
+        # 📦 PRODUTO
+        produto = self.produtos[stock_code]
+        produto['vendas_total'] -= 1
+        produto['quantidade_total'] -= quantidade
+        produto['receita_total'] -= total
+        if self.contador_produtos is not None:
+            self.contador_produtos[stock_code] -= quantidade
+        if not produto['vendas_total']:
+            del self.produtos[stock_code]
+            if self.contador_produtos is not None:
+                del self.contador_produtos[stock_code]
+
+        # 👥 CLIENTE
+        customer_id = venda['customer_id']
+        if customer_id:
+            cliente = self.clientes[customer_id]
+            cliente['compras_total'] -= 1
+            cliente['quantidade_total'] -= quantidade
+            cliente['gasto_total'] -= total
+            if not cliente['compras_total']:
+                del self.clientes[customer_id]
+
+        # 🌍 PAÍS
+        pais = venda['country']
+        if pais:
+            faturas = self.paises[pais]
+            faturas[venda['invoice_no']] -= 1
+            if not faturas[venda['invoice_no']]:
+                del faturas[venda['invoice_no']]
+            if self.contador_vendas_pais is not None:
+                self.contador_vendas_pais[pais] -= 1
+                if not self.contador_vendas_pais[pais]:
+                    del self.contador_vendas_pais[pais]
+            if not faturas:
+                del self.paises[pais]
+
+            agregado = self.agregados_paises[pais.casefold()]
+            agregado['vendas_total'] -= 1
+            agregado['quantidade_total'] -= quantidade
+            agregado['receita_total'] -= total
+            for campo, chave in (('produtos', stock_code), ('clientes', customer_id)):
+                contagem = agregado[campo]
+                if chave:
+                    contagem[chave] -= 1
+                    if not contagem[chave]:
+                        del contagem[chave]
+            if not agregado['vendas_total']:
+                del self.agregados_paises[pais.casefold()]
+
+    def _atualizar_rankings(self, codigos=(), clientes=(), paises=()):
+        """
+        Copia para os rankings os valores atuais das chaves alteradas.
+
+        Chaves que não existem mais (última linha removida) saem do
+        ranking. Lotes grandes (carga do CSV) reordenam cada ranking uma
+        única vez em vez de inserir chave a chave.
+        """
+        if self.ranking_paises is None:
+            return  # Modo heavy hitters: sem rankings exatos
+        for registros, rankings, chaves in ((self.produtos, self.rankings_produtos, codigos),
+                                            (self.clientes, self.rankings_clientes, clientes)):
+            chaves = list(chaves)
+            for criterio, ranking in rankings.items():
+                ranking.definir_varios(
+                    (chave, registros[chave][criterio] if chave in registros else None)
+                    for chave in chaves
+                )
+        contador = self.contador_vendas_pais
+        self.ranking_paises.definir_varios((pais, contador.get(pais)) for pais in paises)
+
+    def _agregado_do_periodo(self, granularidade: str, periodo: str) -> Dict[str, Any]:
+        """Agregado de um período da série temporal, criado vazio se preciso"""
+        periodos = self.rollups[granularidade]
+        agregado = periodos.get(periodo)
+        if agregado is None:
+            agregado = periodos[periodo] = {
+                'vendas_total': 0,
+                'quantidade_total': 0,
+                'receita_total': 0.0,
+                'faturas': Counter(),   # invoice_no -> linhas
+                'clientes': Counter()   # customer_id -> linhas
+            }
+        return agregado
+
+    def _acumular_rollups(self, datas, faturas, clientes, quantidades, totais, sinal: int = 1):
+        """
+          Séries Temporais: Somando (ou Retirando) Linhas dos Períodos
+
+        Demonstra:
+        - Agrupamento pelo texto da data antes de tudo: as linhas de uma
+          mesma data viram um único acúmulo por período
+        - Counter(zip(...)) conta pares (data, fatura) e (data, cliente)
+          em C, sem laço Python por linha
+        - sinal=-1 desfaz a contribuição de linhas removidas; períodos,
+          faturas e clientes que zeram saem das estruturas
+
+        Linhas com data inválida não entram nas séries.
+        """
+        datas = list(datas)
         
-        # ================================================================
-        # ETAPA 1: IDENTIFICAR O PRODUTO
-        # ================================================================
-        
-        # Extrair o código do produto da venda atual
-        stock_code = venda['stock_code']
-        
-        # ================================================================
-        # ETAPA 2: VERIFICAR SE PRODUTO JÁ EXISTE
-        # ================================================================
+        # 📊 Somas por texto de data (um laço curto por linha)
+        por_data: Dict[str, List[float]] = {}
+        for data, quantidade, total in zip(datas, quantidades, totais):
+            acumulado = por_data.get(data)
+            if acumulado is None:
+                acumulado = por_data[data] = [0, 0, 0.0]
+            acumulado[0] += 1
+            acumulado[1] += quantidade
+            acumulado[2] += total
         
-        # 🔍 Por que verificar?
-        # - Primeira venda de um produto: criar entrada nova
-        # - Vendas subsequentes: apenas atualizar totais
+        # 🧾 Pares (data, chave) contados em C
+        pares = {
+            'faturas': Counter(zip(datas, faturas)),
+            'clientes': Counter(par for par in zip(datas, clientes) if par[1])
+        }
         
-        if stock_code not in self.produtos:
-            # 🆕 PRODUTO NOVO: criar entrada inicial
-            self.produtos[stock_code] = {
-                'description': venda['description'],  # Nome do produto
-                'vendas_total': 0,                   # Contador de vendas
-                'quantidade_total': 0,               # Soma das quantidades
-                'receita_total': 0.0                 # Soma dos valores
-            }
+        # 📅 (dia, semana, mês) de cada data válida
+        periodos_da_data = {}
+        for data in por_data:
+            _, periodos = converter_data(data)
+            if periodos:
+                periodos_da_data[data] = periodos
         
-        # ================================================================
-        # ETAPA 3: ATUALIZAR ESTATÍSTICAS DO PRODUTO
-        # ================================================================
+        for nivel, granularidade in enumerate(GRANULARIDADES):
+            for data, (linhas, quantidade, total) in por_data.items():
+                if data in periodos_da_data:
+                    agregado = self._agregado_do_periodo(granularidade, periodos_da_data[data][nivel])
+                    agregado['vendas_total'] += sinal * linhas
+                    agregado['quantidade_total'] += sinal * quantidade
+                    agregado['receita_total'] += sinal * total
+            
+            agregados = self.rollups[granularidade]
+            for campo, contagem in pares.items():
+                for (data, chave), linhas in contagem.items():
+                    if data in periodos_da_data:
+                        contador = agregados[periodos_da_data[data][nivel]][campo]
+                        contador[chave] += sinal * linhas
+                        if not contador[chave]:
+                            del contador[chave]
+            
+            if sinal < 0:
+                for periodo in {periodos[nivel] for periodos in periodos_da_data.values()}:
+                    if not agregados[periodo]['vendas_total']:
+                        del agregados[periodo]
+
+    def mesclar(self, outra: 'DataStructure', indexar: bool = True):
+        """
+          Mesclando Estruturas Parciais
+
+        Usado pelo carregamento paralelo: cada processo monta uma
+        DataStructure com um pedaço do arquivo e aqui juntamos tudo.
+
+        Demonstra:
+        - Concatenação das vendas na ordem original do arquivo
+        - Soma de estatísticas de produtos e clientes já existentes
+        - Counter.update() soma contagens em vez de substituir
+
+        Args:
+            outra: Estrutura parcial com as linhas SEGUINTES às desta
+            indexar: False adia os índices e rankings das linhas anexadas:
+                várias mesclagens seguidas terminam com um único
+                indexar_pendentes(), em vez de uma indexação por parcial
+        """
+
+        # 🪦 Lápides da outra estrutura não devem virar linhas ativas aqui
+        outra.compactar()
+
+        # 📝 VENDAS: mesma ordem do arquivo (a parcial vem depois)
+        inicio = len(self.vendas)
+        if isinstance(self.vendas, ArmazenamentoColunar) and isinstance(outra.vendas, ArmazenamentoColunar):
+            self.vendas.estender(outra.vendas)
+        else:
+            for venda in outra.vendas:
+                self.vendas.append(dict(venda))
+
+        # 📦 PRODUTOS: a primeira descrição vista continua valendo
+        for stock_code, dados in outra.produtos.items():
+            produto = self.produtos.get(stock_code)
+            if produto is None:
+                self.produtos[stock_code] = dict(dados)
+            else:
+                produto['vendas_total'] += dados['vendas_total']
+                produto['quantidade_total'] += dados['quantidade_total']
+                produto['receita_total'] += dados['receita_total']
+
+        # 👥 CLIENTES: o primeiro país visto continua valendo
+        for customer_id, dados in outra.clientes.items():
+            cliente = self.clientes.get(customer_id)
+            if cliente is None:
+                self.clientes[customer_id] = dict(dados)
+            else:
+                cliente['compras_total'] += dados['compras_total']
+                cliente['quantidade_total'] += dados['quantidade_total']
+                cliente['gasto_total'] += dados['gasto_total']
+
+        # 🌍 PAÍSES E CONTADORES
+        for pais, faturas in outra.paises.items():
+            self.paises[pais].update(faturas)
+        for granularidade, periodos in outra.rollups.items():
+            for periodo, dados in periodos.items():
+                agregado = self._agregado_do_periodo(granularidade, periodo)
+                agregado['vendas_total'] += dados['vendas_total']
+                agregado['quantidade_total'] += dados['quantidade_total']
+                agregado['receita_total'] += dados['receita_total']
+                agregado['faturas'].update(dados['faturas'])
+                agregado['clientes'].update(dados['clientes'])
+        for dados in outra.agregados_paises.values():
+            agregado = self._agregado_do_pais(dados['pais'])
+            agregado['vendas_total'] += dados['vendas_total']
+            agregado['quantidade_total'] += dados['quantidade_total']
+            agregado['receita_total'] += dados['receita_total']
+            agregado['produtos'].update(dados['produtos'])
+            agregado['clientes'].update(dados['clientes'])
+        if self.contador_produtos is not None:
+            for codigo, dados in outra.produtos.items():
+                self.contador_produtos[codigo] += dados['quantidade_total']
+            for pais, faturas in outra.paises.items():
+                self.contador_vendas_pais[pais] += sum(faturas.values())
+        if indexar:
+            self._atualizar_rankings(outra.produtos, outra.clientes, outra.paises)
+
+        # 🎲 SKETCHES: HyperLogLog mescla registrador a registrador e o
+        # KLL junta os níveis (as linhas não são lidas de novo)
+        mesclar_sketches = outra.precisao_hll == self.precisao_hll
+        if mesclar_sketches:
+            for escopo, por_chave in outra.sketches.items():
+                destino = self.sketches[escopo]
+                for chave, sketch in por_chave.items():
+                    if chave not in destino:
+                        destino[chave] = HyperLogLog(self.precisao_hll)
+                    destino[chave].mesclar(sketch)
+            for campo, sketch in outra.quantis.items():
+                self.quantis[campo].mesclar(sketch)
+            for pais, sketches in outra.quantis_paises.items():
+                destino = self.quantis_paises.setdefault(
+                    pais, {campo: SketchQuantis() for campo in CAMPOS_QUANTIS})
+                for campo, sketch in sketches.items():
+                    destino[campo].mesclar(sketch)
+            if self.heavy_hitters is not None:
+                # Parcial sem monitor (processos trabalhadores): lê as linhas novas
+                if outra.heavy_hitters is not None:
+                    self.heavy_hitters.mesclar(outra.heavy_hitters)
+                else:
+                    self._alimentar_heavy_hitters(inicio)
+        else:
+            self._alimentar_sketches(inicio)
         
-        # Referência ao produto no dicionário (para facilitar acesso)
-        produto = self.produtos[stock_code]
+        # 🔑 Índices das linhas anexadas (posições deslocadas)
+        if indexar:
+            self._indexar_linhas(inicio, sketches=False)
+        self.versao_dados += 1
+
+    def indexar_pendentes(self) -> int:
+        """
+        Monta os índices e rankings das linhas anexadas com indexar=False.
+
+        Linhas indexadas são as que já têm id (ids_linhas), então as
+        pendentes são sempre as do fim de vendas. Os sketches já foram
+        alimentados (ou mesclados) na inserção.
+
+        Returns:
+            int: Quantidade de linhas indexadas agora
+        """
+        inicio = len(self.ids_linhas)
+        if inicio >= len(self.vendas):
+            return 0
+        self._atualizar_rankings(*(dict.fromkeys(self._valores_coluna(campo, inicio))
+                                   for campo in ('stock_code', 'customer_id', 'country')))
+        self._indexar_linhas(inicio, sketches=False)
+        return len(self.vendas) - inicio
+
+    # ========================================================================
+    # ÍNDICES - Manutenção das estruturas de busca por posição
+    # ========================================================================
+
+    def _valores_coluna(self, campo: str, inicio: int = 0):
+        """Iterador com os valores de um campo, da linha `inicio` em diante"""
+        if isinstance(self.vendas, ArmazenamentoColunar):
+            coluna = self.vendas.coluna(campo)
+            if campo in TIPOS_NUMERICOS:
+                return iter(coluna[inicio:])
+            return map(coluna.valores.__getitem__, coluna.codigos[inicio:])
+        vendas = self.vendas
+        return (vendas[posicao][campo] for posicao in range(inicio, len(vendas)))
+
+    def _indexar_linhas(self, inicio: int, sketches: bool = True):
+        """
+        Registra nos índices as linhas de `inicio` até o fim de vendas.
+
+        Chamado depois de qualquer inserção (uma venda, um lote ou uma
+        mesclagem): cada índice percorre só as linhas novas.
+
+        Args:
+            sketches: False quando os sketches já foram mesclados prontos
+                (carregamento paralelo)
+        """
+        # 🆔 Ids para as linhas que ainda não têm (a compactação mantém os antigos)
+        novos_ids = len(self.vendas) - len(self.ids_linhas)
+        if novos_ids > 0:
+            self.ids_linhas.extend(range(self.proximo_id, self.proximo_id + novos_ids))
+            self.proximo_id += novos_ids
         
-        # 📊 Incrementar contadores:
-        produto['vendas_total'] += 1                    # +1 venda
-        produto['quantidade_total'] += venda['quantity'] # +quantidade vendida
-        produto['receita_total'] += venda['total']      # +valor da venda
+        # ➕ Somas correntes: inicio == 0 é carga nova ou reconstrução depois
+        # da compactação (sem lápides), então as somas são refeitas do zero
+        # (fsum: soma de floats sem acumular erro de arredondamento)
+        for campo, tipo in TIPOS_NUMERICOS.items():
+            valores = self._valores_coluna(campo, inicio)
+            soma = sum(valores) if tipo == 'q' else math.fsum(valores)
+            self.somas[campo] = soma if inicio == 0 else self.somas[campo] + soma
         
-        # ================================================================
-        # ETAPA 4: ATUALIZAR CONTADOR ESPECIAL
-        # ================================================================
+        # 🕒 Timestamps: cada texto de data distinto é convertido uma vez
+        self.timestamps[inicio:] = array('q', map(itemgetter(0), map(
+            converter_data, self._valores_coluna('invoice_date', inicio))))
         
-        # 🏆 Counter para rankings automáticos
-        # - Usado para encontrar produtos mais vendidos rapidamente
-        # - Counter.most_common() já ordena por quantidade
-        self.contador_produtos[stock_code] += venda['quantity']
-    
-    def _atualizar_cliente(self, venda: Dict[str, Any]):
+        self._indexar_campo(self.indice_faturas, self._valores_coluna('invoice_no', inicio), inicio)
+        codigos = list(self._valores_coluna('stock_code', inicio))
+        novos_codigos = [codigo for codigo in dict.fromkeys(codigos) if codigo not in self.indice_produtos]
+        self._indexar_campo(self.indice_produtos, codigos, inicio)
+        if len(novos_codigos) > IndiceOrdenado.LIMIAR_INSERCAO:
+            self.codigos_produtos.extend(novos_codigos)
+            self.codigos_produtos.sort()
+        else:
+            for codigo in novos_codigos:
+                insort(self.codigos_produtos, codigo)
+        self._indexar_campo(self.indice_paises,
+                            map(str.casefold, self._valores_coluna('country', inicio)), inicio)
+        self.indice_totais.estender(self._valores_coluna('total', inicio), inicio)
+        
+        # 📝 Descrições: só as inéditas passam pelo tokenizador
+        descricoes = list(self._valores_coluna('description', inicio))
+        for descricao in dict.fromkeys(descricoes):
+            if descricao not in self.indice_descricoes:
+                self._indexar_palavras(descricao)
+        self._indexar_campo(self.indice_descricoes, descricoes, inicio)
+        
+        # 🔤 Trigramas: um registro por par (descrição, produto) e por país
+        for descricao, stock_code in dict.fromkeys(zip(descricoes, codigos)):
+            self.trigramas_descricoes.adicionar(descricao, stock_code)
+        for pais in dict.fromkeys(self._valores_coluna('country', inicio)):
+            if pais:
+                self.trigramas_paises.adicionar(pais, pais)
+        
+        # 🧮 Bitmaps das linhas novas
+        self.bitmap_paises.estender(map(str.casefold, self._valores_coluna('country', inicio)), inicio)
+        self.bitmap_canceladas.estender(
+            map(methodcaller('startswith', 'C'), self._valores_coluna('invoice_no', inicio)), inicio)
+        self.bitmap_com_cliente.estender(map(bool, self._valores_coluna('customer_id', inicio)), inicio)
+        
+        if sketches:
+            self._alimentar_sketches(inicio)
+
+    def _alimentar_sketches(self, inicio: int):
+        """
+        Adiciona aos sketches (HyperLogLog e quantis) as linhas de
+        `inicio` em diante.
+
+        inicio == 0 (carga nova ou reconstrução depois da compactação)
+        recomeça os sketches do zero. Como repetir um valor não muda um
+        HyperLogLog, cada par (chave do escopo, valor) é adicionado uma
+        única vez: set(zip(...)) elimina as repetições em C.
+        """
+        if inicio == 0:
+            self.sketches = {escopo: {} for escopo in ESCOPOS_SKETCH}
+            self.quantis = {campo: SketchQuantis() for campo in CAMPOS_QUANTIS}
+            self.quantis_paises = {}
+            if self.heavy_hitters is not None:
+                self.heavy_hitters = MonitorHeavyHitters()
+        
+        datas = list(self._valores_coluna('invoice_date', inicio))
+        meses = {data: converter_data(data)[1] for data in set(datas)}
+        codigos = list(self._valores_coluna('stock_code', inicio))
+        colunas = {
+            'pais': list(map(str.casefold, self._valores_coluna('country', inicio))),
+            'mes': [periodos[2] if periodos else '' for periodos in map(meses.__getitem__, datas)],
+            'produto': codigos,
+            'produtos': codigos,
+            'clientes': list(self._valores_coluna('customer_id', inicio))
+        }
+        
+        for (escopo, campo), por_chave in self.sketches.items():
+            valores_por_chave = defaultdict(list)
+            for chave, valor in set(zip(colunas[escopo], colunas[campo])):
+                valores_por_chave[chave].append(valor)
+            for chave, valores in valores_por_chave.items():
+                if not chave:
+                    continue  # Sem país ou data inválida
+                sketch = por_chave.get(chave)
+                if sketch is None:
+                    sketch = por_chave[chave] = HyperLogLog(self.precisao_hll)
+                sketch.adicionar_varios(filter(None, valores))  # Sem venda sem cliente
+        
+        # 📐 Quantis: valores separados por país em um laço, depois em lote
+        numericos = [list(self._valores_coluna(campo, inicio)) for campo in CAMPOS_QUANTIS]
+        por_pais: Dict[str, List[List[float]]] = {}
+        for pais, *valores in zip(colunas['pais'], *numericos):
+            listas = por_pais.get(pais)
+            if listas is None:
+                listas = por_pais[pais] = [[] for _ in CAMPOS_QUANTIS]
+            for lista, valor in zip(listas, valores):
+                lista.append(valor)
+        for campo, valores in zip(CAMPOS_QUANTIS, numericos):
+            self.quantis[campo].adicionar_varios(valores)
+        for pais, listas in por_pais.items():
+            if not pais:
+                continue
+            sketches = self.quantis_paises.get(pais)
+            if sketches is None:
+                sketches = self.quantis_paises[pais] = {campo: SketchQuantis() for campo in CAMPOS_QUANTIS}
+            for campo, valores in zip(CAMPOS_QUANTIS, listas):
+                sketches[campo].adicionar_varios(valores)
+        
+        if self.heavy_hitters is not None:
+            self._alimentar_heavy_hitters(inicio)
+
+    def _alimentar_heavy_hitters(self, inicio: int):
+        """Passa ao monitor de heavy hitters as linhas de `inicio` em diante"""
+        self.heavy_hitters.observar_colunas({
+            campo: list(self._valores_coluna(campo, inicio))
+            for campo in CAMPOS_HEAVY_HITTERS
+        })
+
+    def _indexar_palavras(self, descricao: str):
+        """Registra a descrição no índice invertido, uma vez por palavra"""
+        indice = self.indice_palavras
+        for palavra in tokenizar(descricao):
+            descricoes = indice.get(palavra)
+            if descricoes is None:
+                descricoes = indice[palavra] = set()
+            descricoes.add(descricao)
+
+    @staticmethod
+    def _indexar_campo(indice: Dict[str, array], chaves, inicio: int):
+        """Acrescenta cada posição (a partir de `inicio`) na lista da sua chave"""
+        for posicao, chave in enumerate(chaves, start=inicio):
+            posicoes = indice.get(chave)
+            if posicoes is None:
+                posicoes = indice[chave] = array('I')
+            posicoes.append(posicao)
+
+    def _reconstruir_indices(self):
+        """Refaz todos os índices a partir de vendas (posições mudaram)"""
+        self.indice_faturas = {}
+        self.indice_produtos = {}
+        self.codigos_produtos = []
+        self.indice_paises = {}
+        self.indice_totais = IndiceOrdenado()
+        self.indice_descricoes = {}
+        self.indice_palavras = {}
+        self.trigramas_descricoes = IndiceTrigramas()
+        self.trigramas_paises = IndiceTrigramas()
+        self.bitmap_paises = IndiceBitmap()
+        self.bitmap_canceladas = IndiceBitmap()
+        self.bitmap_com_cliente = IndiceBitmap()
+        self.estatisticas = {}
+        self._indexar_linhas(0)
+
+    def vendas_nas_posicoes(self, posicoes) -> List[Dict[str, Any]]:
+        """
+        Vendas das posições indicadas (custo proporcional ao resultado).
+
+        No armazenamento colunar retorna uma SelecaoColunar, que cria as
+        visões de linha só quando são usadas.
+        """
+        if isinstance(self.vendas, ArmazenamentoColunar):
+            return self.vendas.selecionar(posicoes)
+        vendas = self.vendas
+        return [vendas[posicao] for posicao in posicoes]
+
+    def valores_nas_posicoes(self, campo: str, posicoes):
+        """Iterador com os valores de um campo nas posições indicadas"""
+        if isinstance(self.vendas, ArmazenamentoColunar):
+            coluna = self.vendas.coluna(campo)
+            if campo in TIPOS_NUMERICOS:
+                return map(coluna.__getitem__, posicoes)
+            return map(coluna.valores.__getitem__, map(coluna.codigos.__getitem__, posicoes))
+        vendas = self.vendas
+        return (vendas[posicao][campo] for posicao in posicoes)
+
+    def posicoes_da_fatura(self, invoice_no: str) -> List[int]:
+        """
+          Busca O(1) no Índice Hash
+
+        Returns:
+            List[int]: Posições de todas as linhas da fatura (vazia se não existir)
+        """
+        return list(self._sem_removidas(self.indice_faturas.get(invoice_no, ())))
+
+    def posicoes_do_produto(self, stock_code: str) -> array:
+        """Posições das vendas de um produto (índice secundário)"""
+        return self._sem_removidas(self.indice_produtos.get(stock_code, array('I')))
+
+    def posicoes_do_pais(self, pais: str) -> array:
+        """Posições das vendas de um país, sem diferenciar maiúsculas"""
+        return self._sem_removidas(self.indice_paises.get(pais.casefold(), array('I')))
+
+    def posicoes_por_texto(self, consulta: str) -> array:
+        """
+          Busca por Palavras na Descrição (Índice Invertido)
+
+        Sintaxe da consulta:
+        - "RED HEART": as duas palavras (E implícito)
+        - "HEART OR STAR": qualquer um dos grupos (OU)
+        - "LANTERN*": palavras que começam com o prefixo
+
+        Returns:
+            array: Posições das vendas encontradas, em ordem crescente
+        """
+        return self._sem_removidas(self.posicoes_das_descricoes(self.descricoes_por_texto(consulta)))
+
+    def descricoes_por_texto(self, consulta: str) -> set:
+        """Descrições que atendem à consulta de posicoes_por_texto()"""
+        # 🧩 Grupos separados por OR; dentro de cada grupo, todos os termos
+        grupos: List[List[str]] = [[]]
+        for termo in consulta.split():
+            if termo.upper() in OPERADORES_OU:
+                grupos.append([])
+            elif termo.upper() not in OPERADORES_E:
+                grupos[-1].append(termo)
+        
+        descricoes = set()
+        for grupo in grupos:
+            if grupo:
+                descricoes |= self._descricoes_com_termos(grupo)
+        return descricoes
+
+    def posicoes_das_descricoes(self, descricoes) -> array:
+        """Posições (com lápides) das linhas com essas descrições, em ordem crescente"""
+        # 📍 Cada linha tem uma única descrição: não há repetidas
+        indice = self.indice_descricoes
+        return array('I', sorted(chain.from_iterable(indice[d] for d in descricoes)))
+
+    def _descricoes_com_termos(self, termos: List[str]) -> set:
+        """Interseção das descrições que contêm TODOS os termos"""
+        resultado: Optional[set] = None
+        for termo in termos:
+            prefixo = termo.endswith('*')
+            palavras = tokenizar(termo)
+            for i, palavra in enumerate(palavras):
+                if prefixo and i == len(palavras) - 1:
+                    # 🔍 PREFIXO: une as descrições de todas as palavras do vocabulário
+                    encontradas = set()
+                    for candidata, descricoes in self.indice_palavras.items():
+                        if candidata.startswith(palavra):
+                            encontradas |= descricoes
+                else:
+                    encontradas = self.indice_palavras.get(palavra, set())
+                resultado = set(encontradas) if resultado is None else resultado & encontradas
+                if not resultado:
+                    return set()
+        return resultado or set()
+
+    def filtrar_combinado(self, paises: Optional[List[str]] = None,
+                          canceladas: Optional[bool] = None,
+                          com_cliente: Optional[bool] = None,
+                          total_minimo: Optional[float] = None,
+                          total_maximo: Optional[float] = None) -> array:
+        """
+          Filtro Composto com Bitmaps
+
+        Exemplo: países {France, Germany}, não canceladas e total > 100
+        -> (França | Alemanha) & ~canceladas, e só então a faixa de total
+        é conferida nas linhas que sobraram.
+
+        Critérios None são ignorados.
+
+        Returns:
+            array: Posições que atendem a todos os critérios, em ordem
+        """
+        # 🧮 Começa com todas as linhas (n bits ligados)
+        bits = (1 << len(self.vendas)) - 1
+        
+        if paises is not None:
+            bits &= self.bitmap_paises.qualquer(pais.casefold() for pais in paises)
+        if canceladas is not None:
+            bits &= self.bitmap_canceladas.bitmap(canceladas)
+        if com_cliente is not None:
+            bits &= self.bitmap_com_cliente.bitmap(com_cliente)
+        if self.removidas:
+            bits &= ~bitmap_de_posicoes(self.removidas, len(self.vendas))
+        
+        posicoes = posicoes_do_bitmap(bits)
+        
+        # 💰 Faixa de total: conferida só nas linhas que sobraram
+        if total_minimo is not None:
+            posicoes = array('I', compress(posicoes, map(float(total_minimo).__le__,
+                                                          self.valores_nas_posicoes('total', posicoes))))
+        if total_maximo is not None:
+            posicoes = array('I', compress(posicoes, map(float(total_maximo).__ge__,
+                                                          self.valores_nas_posicoes('total', posicoes))))
+        return posicoes
+
+    def acesso_ao_campo(self, campo: str) -> Callable[[int], Any]:
+        """Função posição -> valor do campo (escolhida uma vez por consulta)"""
+        if isinstance(self.vendas, ArmazenamentoColunar):
+            return self.vendas.coluna(campo).__getitem__
+        vendas = self.vendas
+        return lambda posicao: vendas[posicao][campo]
+
+    def consultar(self) -> 'Consulta':
+        """Nova consulta (where, order_by, limit, offset, projeção) sobre as vendas"""
+        return Consulta(self)
+
+    def contar_distintos(self, escopo: str, chaves, campo: str, exato: bool = False) -> int:
+        """
+          Distintos por País, Mês ou Produto (Aproximado ou Exato)
+
+        Demonstra:
+        - Modo aproximado: mescla os sketches das chaves pedidas (união)
+          e estima, sem tocar nas vendas e em memória fixa
+        - Modo exato: Counters mantidos (país; clientes por mês) ou, sem
+          eles, as linhas das chaves pedidas
+
+        Args:
+            escopo: 'pais', 'mes' ou 'produto' (ver ESCOPOS_SKETCH)
+            chaves: Uma chave ou várias (ex.: ['2011-01', '2011-02'])
+            campo: 'produtos' ou 'clientes'
+            exato: True para a contagem exata
+
+        Returns:
+            int: Quantidade de produtos ou clientes distintos
+        """
+        if (escopo, campo) not in self.sketches:
+            raise ValueError(f"Sem contagem de {campo} por {escopo}")
+        chaves = [chaves] if isinstance(chaves, str) else list(chaves)
+        if escopo == 'pais':
+            chaves = [chave.casefold() for chave in chaves]
+        
+        if not exato:
+            por_chave = self.sketches[(escopo, campo)]
+            uniao = HyperLogLog(self.precisao_hll)
+            for chave in chaves:
+                if chave in por_chave:
+                    uniao.mesclar(por_chave[chave])
+            return uniao.estimar()
+        
+        # 📌 EXATO com estruturas mantidas: união das chaves dos Counters
+        if escopo == 'pais':
+            contagens = [self.agregados_paises[chave][campo] for chave in chaves
+                         if chave in self.agregados_paises]
+        elif escopo == 'mes' and campo == 'clientes':
+            contagens = [self.rollups['mes'][chave]['clientes'] for chave in chaves
+                         if chave in self.rollups['mes']]
+        else:
+            contagens = None
+        if contagens is not None:
+            return len(set().union(*contagens))
+        
+        # 🔎 EXATO sem estrutura mantida: só as linhas das chaves pedidas
+        campo_venda = 'stock_code' if campo == 'produtos' else 'customer_id'
+        if escopo == 'produto':
+            posicoes = chain.from_iterable(map(self.posicoes_do_produto, chaves))
+        else:
+            meses = set(chaves)
+            ativas = list(self._sem_removidas(range(len(self.vendas))))
+            posicoes = [posicao for posicao, data in zip(ativas, self.valores_nas_posicoes('invoice_date', ativas))
+                        if _mes_da_data(data) in meses]
+        return len(set(filter(None, self.valores_nas_posicoes(campo_venda, posicoes))))
+
+    def agrupar(self, dimensoes, medidas) -> Dict[Tuple[Any, ...], Tuple[Any, ...]]:
+        """GROUP BY em uma varredura (ver Agrupamento)"""
+        return Agrupamento(self, dimensoes, medidas).calcular()
+
+    def metricas_rfm(self) -> Dict[str, List[Any]]:
+        """
+        Recência, frequência e valor de cada cliente em uma varredura.
+
+        Faturas canceladas ('C...') entram no valor (devoluções descontam
+        o gasto), mas não contam como compra nem como data da última
+        compra. Clientes sem nenhuma compra ficam de fora.
+
+        Returns:
+            Dict: customer_id -> [timestamp da última compra,
+                  faturas distintas, gasto líquido]
+        """
+        if self.removidas:
+            posicoes = self._sem_removidas(range(len(self.vendas)))
+            colunas = [self.valores_nas_posicoes(campo, posicoes)
+                       for campo in ('customer_id', 'invoice_no', 'total')]
+            timestamps = map(self.timestamps.__getitem__, posicoes)
+        else:
+            colunas = [self._valores_coluna(campo) for campo in ('customer_id', 'invoice_no', 'total')]
+            timestamps = self.timestamps
+        
+        # 📋 Uma passada: gasto somado, faturas de compra em um conjunto
+        # de pares (cliente, fatura) e última data de compra por cliente
+        gastos: Dict[str, float] = {}
+        ultimas: Dict[str, int] = {}
+        compras = set()
+        for cliente, fatura, total, momento in zip(*colunas, timestamps):
+            if not cliente:
+                continue
+            gastos[cliente] = gastos.get(cliente, 0) + total
+            if fatura.startswith('C'):
+                continue
+            compras.add((cliente, fatura))
+            if momento > ultimas.get(cliente, DATA_INVALIDA):
+                ultimas[cliente] = momento
+        
+        frequencias = Counter(map(itemgetter(0), compras))
+        return {cliente: [ultimas.get(cliente, DATA_INVALIDA), frequencia, gastos[cliente]]
+                for cliente, frequencia in frequencias.items()}
+
+    def cestas_de_compras(self) -> Tuple[List[str], List[array]]:
+        """
+        Cestas das faturas de compra, com itens codificados em inteiros.
+
+        Faturas canceladas e códigos que não são produtos (frete, taxas)
+        ficam de fora; o mesmo produto repetido na fatura conta uma vez.
+
+        Returns:
+            Tuple: (stock_code de cada id, cestas como array('I') de ids
+            em ordem crescente)
+        """
+        if self.removidas:
+            posicoes = self._sem_removidas(range(len(self.vendas)))
+            faturas = self.valores_nas_posicoes('invoice_no', posicoes)
+            codigos = self.valores_nas_posicoes('stock_code', posicoes)
+        else:
+            faturas = self._valores_coluna('invoice_no')
+            codigos = self._valores_coluna('stock_code')
+        
+        ids: Dict[str, int] = {}
+        cestas: Dict[str, set] = {}
+        for fatura, codigo in zip(faturas, codigos):
+            if fatura.startswith('C') or codigo in CODIGOS_SEM_PRODUTO:
+                continue
+            item = ids.get(codigo)
+            if item is None:
+                item = ids[codigo] = len(ids)
+            cesta = cestas.get(fatura)
+            if cesta is None:
+                cesta = cestas[fatura] = set()
+            cesta.add(item)
+        return list(ids), [array('I', sorted(cesta)) for cesta in cestas.values()]
+
+    def estatisticas_da_coluna(self, campo: str) -> EstatisticasColuna:
+        """
+        Estatísticas do campo para o planejador (coletadas se faltarem
+        ou se a quantidade de linhas mudou mais de 10% desde a coleta).
+
+        País é medido em casefold, como é comparado nas consultas.
+        """
+        estatisticas = self.estatisticas.get(campo)
+        if estatisticas is None or abs(len(self.vendas) - estatisticas.linhas) > estatisticas.linhas * 0.1:
+            valores = self._valores_coluna(campo)
+            if campo == 'country':
+                valores = map(str.casefold, valores)
+            estatisticas = EstatisticasColuna(list(valores), numerica=campo in TIPOS_NUMERICOS)
+            self.estatisticas[campo] = estatisticas
+        return estatisticas
+
+    def sugerir_paises(self, texto: str, limite: int = 5) -> List[Tuple[str, float]]:
+        """
+        Países com nome parecido (busca aproximada por trigramas).
+
+        Returns:
+            List[Tuple[str, float]]: (país, similaridade), mais parecido primeiro
+        """
+        # Países sem vendas restantes ficam de fora
+        return [(pais, similaridade)
+                for pais, similaridade, _ in self.trigramas_paises.buscar(texto, limite + 5)
+                if pais in self.paises][:limite]
+
+    def sugerir_produtos(self, texto: str, limite: int = 5) -> List[Tuple[str, str, float]]:
+        """
+        Produtos com descrição parecida (busca aproximada por trigramas).
+
+        Returns:
+            List[Tuple[str, str, float]]: (stock_code, descrição, similaridade)
+        """
+        sugestoes = []
+        # Parcial: o usuário costuma digitar só um trecho da descrição
+        for descricao, similaridade, codigos in self.trigramas_descricoes.buscar(
+                texto, limite + 5, similaridade_minima=0.5, parcial=True):
+            for stock_code in sorted(codigos):
+                if stock_code in self.produtos:
+                    sugestoes.append((stock_code, descricao, similaridade))
+        return sugestoes[:limite]
+
+    def produtos_das_posicoes(self, posicoes) -> List[str]:
+        """Códigos de produto distintos das posições, na ordem em que aparecem"""
+        return list(dict.fromkeys(self.valores_nas_posicoes('stock_code', posicoes)))
+
+    def posicoes_por_total(self, minimo: float, maximo: float) -> array:
+        """Posições com minimo <= total <= maximo, em ordem crescente de total"""
+        return self._sem_removidas(self.indice_totais.posicoes_no_intervalo(minimo, maximo))
+
+    def contar_por_total(self, minimo: float, maximo: float) -> int:
+        """Quantidade de vendas na faixa de total (O(log n) sem lápides)"""
+        return self.indice_totais.contar(minimo, maximo) - len(self._removidas_na_faixa(minimo, maximo))
+
+    def somar_por_total(self, minimo: float, maximo: float) -> float:
+        """Soma dos totais da faixa, sem montar as linhas"""
+        return self.indice_totais.somar(minimo, maximo) - sum(self._removidas_na_faixa(minimo, maximo))
+
+    def _removidas_na_faixa(self, minimo: float, maximo: float) -> List[float]:
+        """Totais das linhas removidas que ainda estão no índice ordenado"""
+        if not self.removidas:
+            return []
+        return [total for total in self.valores_nas_posicoes('total', self.removidas)
+                if minimo <= total <= maximo]
+
+    def _sem_removidas(self, posicoes):
+        """Descarta as posições marcadas como removidas"""
+        if not self.removidas:
+            return posicoes
+        return array('I', filterfalse(self.removidas.__contains__, posicoes))
+
+    def quantidade_vendas(self) -> int:
+        """Quantidade de vendas ativas (sem contar as lápides)"""
+        return len(self.vendas) - len(self.removidas)
+
+    def vendas_ativas(self) -> List[Dict[str, Any]]:
+        """
+        Sequência com as vendas não removidas, na ordem original.
+
+        Sem lápides é a própria estrutura de vendas (sem cópia).
+        """
+        if not self.removidas:
+            return self.vendas
+        return self.vendas_nas_posicoes(self._sem_removidas(range(len(self.vendas))))
+
+    def pagina_de_vendas(self, quantidade: int, ordenar_por: Optional[str] = None,
+                         decrescente: bool = False,
+                         apos: Optional[Tuple] = None) -> Tuple[array, Optional[Tuple]]:
+        """
+        Uma página de posições a partir da chave da última linha vista.
+
+        A chave identifica a linha pela ordem escolhida, e não pelo
+        número da página: (id,) na ordem original e (total, id) na ordem
+        de total. A retomada é uma busca binária (O(log n)) e a página
+        lê só as próprias linhas, por mais longe que esteja do início.
+        Inserções e remoções entre uma página e outra não causam linhas
+        puladas ou repetidas, mesmo que haja compactação.
+
+        Args:
+            ordenar_por: None (ordem original) ou 'total' (índice ordenado)
+            apos: Chave devolvida pela página anterior (None = início)
+
+        Returns:
+            (posições da página, chave da última linha ou None se acabou)
+        """
+        ids = self.ids_linhas
+        if ordenar_por is None:
+            if decrescente:
+                fim = len(ids) if apos is None else bisect_left(ids, apos[0])
+                candidatas = range(fim - 1, -1, -1)
+            else:
+                inicio = 0 if apos is None else bisect_right(ids, apos[0])
+                candidatas = range(inicio, len(ids))
+        elif ordenar_por == 'total':
+            # Entre totais iguais o índice segue a ordem das posições,
+            # que é a ordem dos ids: (total, id) localiza o ponto exato
+            indice = self.indice_totais
+            posicoes = indice.posicoes
+            if decrescente:
+                fim = len(posicoes) if apos is None else indice.localizar(apos[0], bisect_left(ids, apos[1]))
+                candidatas = map(posicoes.__getitem__, range(fim - 1, -1, -1))
+            else:
+                inicio = 0 if apos is None else indice.localizar(apos[0], bisect_right(ids, apos[1]))
+                candidatas = map(posicoes.__getitem__, range(inicio, len(posicoes)))
+        else:
+            raise ValueError(f"Ordenação sem índice para paginação: {ordenar_por}")
+
+        if self.removidas:
+            candidatas = filterfalse(self.removidas.__contains__, candidatas)
+        # Uma linha a mais só para saber se existe próxima página
+        pagina = array('I', islice(candidatas, quantidade + 1))
+        if len(pagina) <= quantidade:
+            return pagina, None
+        del pagina[quantidade:]
+        ultima = pagina[-1]
+        if ordenar_por is None:
+            return pagina, (ids[ultima],)
+        return pagina, (self.vendas[ultima]['total'], ids[ultima])
+
+    def pagina_de_produtos(self, quantidade: int, decrescente: bool = False,
+                           apos: Optional[str] = None) -> Tuple[List[str], bool]:
+        """
+        Uma página de códigos de produto (ordem de stock_code) depois de `apos`.
+
+        Returns:
+            (códigos da página, se existe próxima página)
+        """
+        codigos = self.codigos_produtos
+        if decrescente:
+            fim = len(codigos) if apos is None else bisect_left(codigos, apos)
+            candidatos = map(codigos.__getitem__, range(fim - 1, -1, -1))
+        else:
+            inicio = 0 if apos is None else bisect_right(codigos, apos)
+            candidatos = map(codigos.__getitem__, range(inicio, len(codigos)))
+        # Produtos sem vendas restantes continuam na lista até a compactação
+        pagina = list(islice(filter(self.produtos.__contains__, candidatos), quantidade + 1))
+        return pagina[:quantidade], len(pagina) > quantidade
+
+    def atualizar_linha(self, posicao: int, alteracoes: Dict[str, Any]):
+        """
+        Altera campos de uma linha, recalcula o total e mantém os índices
+        e os agregados.
+
+        Só o índice ordenado por total depende dos campos alteráveis
+        (quantidade e preço): a entrada antiga sai e a nova entra, cada
+        uma com busca binária. Produto, cliente e contador de produtos
+        recebem apenas a diferença (delta) de quantidade e de total.
+
+        Raises:
+            ValueError/TypeError: campo não alterável, valor inválido ou
+                linha removida; nesse caso nada foi alterado
+        """
+        # 🔒 Converte e valida TUDO antes de tocar na linha: um valor
+        # inválido não deixa a linha alterada com índices e agregados velhos
+        if posicao in self.removidas:
+            raise ValueError(f"Linha {posicao} foi removida")
+        convertidas = {}
+        for campo, valor in alteracoes.items():
+            conversor = CONVERSORES_ALTERACAO.get(campo)
+            if conversor is None:
+                raise ValueError(f"Campo não pode ser alterado: {campo}")
+            convertidas[campo] = conversor(valor)
+        
+        venda = self.vendas[posicao]
+        quantidade_anterior = venda['quantity']
+        preco_anterior = venda['unit_price']
+        total_anterior = venda['total']
+        descricao_anterior = venda['description']
+        
+        for campo, valor in convertidas.items():
+            venda[campo] = valor
+        venda['total'] = venda['quantity'] * venda['unit_price']
+        
+        # Relê os valores gravados (no armazenamento colunar já convertidos)
+        delta_quantidade = venda['quantity'] - quantidade_anterior
+        total = venda['total']
+        delta_total = total - total_anterior
+        
+        self.somas['quantity'] += delta_quantidade
+        self.somas['unit_price'] += venda['unit_price'] - preco_anterior
+        self.somas['total'] += delta_total
+        
+        if total != total_anterior:
+            self.indice_totais.remover(total_anterior, posicao)
+            self.indice_totais.inserir(total, posicao)
+        
+        # 📝 Nova descrição: a posição muda de chave no índice de descrições
+        descricao = venda['description']
+        if descricao != descricao_anterior:
+            self.indice_descricoes[descricao_anterior].remove(posicao)
+            if descricao not in self.indice_descricoes:
+                self._indexar_palavras(descricao)
+                self.indice_descricoes[descricao] = array('I')
+            insort(self.indice_descricoes[descricao], posicao)
+            self.trigramas_descricoes.adicionar(descricao, venda['stock_code'])
+        
+        # 📊 DELTAS NOS AGREGADOS (O(1))
+        produto = self.produtos[venda['stock_code']]
+        produto['quantidade_total'] += delta_quantidade
+        produto['receita_total'] += delta_total
+        if self.contador_produtos is not None:
+            self.contador_produtos[venda['stock_code']] += delta_quantidade
+        if produto['description'] == descricao_anterior:
+            produto['description'] = venda['description']
+        
+        if venda['customer_id']:
+            cliente = self.clientes[venda['customer_id']]
+            cliente['quantidade_total'] += delta_quantidade
+            cliente['gasto_total'] += delta_total
+        
+        if venda['country']:
+            agregado = self.agregados_paises[venda['country'].casefold()]
+            agregado['quantidade_total'] += delta_quantidade
+            agregado['receita_total'] += delta_total
+        
+        _, periodos = converter_data(venda['invoice_date'])
+        for granularidade, periodo in zip(GRANULARIDADES, periodos or ()):
+            agregado = self.rollups[granularidade][periodo]
+            agregado['quantidade_total'] += delta_quantidade
+            agregado['receita_total'] += delta_total
+        
+        self._atualizar_rankings([venda['stock_code']], [venda['customer_id']])
+        if self.heavy_hitters is not None:
+            self.heavy_hitters.observar_colunas({
+                'stock_code': [venda['stock_code']], 'quantity': [delta_quantidade],
+                'customer_id': [venda['customer_id']], 'total': [delta_total], 'country': ['']
+            })
+        self.versao_dados += 1
+
+    def remover_vendas(self, posicoes) -> int:
+        """
+        Remove as linhas indicadas e mantém os índices válidos.
+
+        🪦 Com remocao_logica, as linhas só recebem uma lápide (O(1) cada)
+        e a compactação fica para compactar_se_necessario(), fora do
+        caminho da remoção. Sem ela, a compactação é imediata.
+
+        ⚠️ Apagar linha a linha de uma lista desloca todas as seguintes
+        (O(n) por remoção): a compactação refaz cada coluna uma única vez.
+
+        Returns:
+            int: Quantidade de linhas removidas
+        """
+        total_linhas = len(self.vendas)
+        novas = {posicao for posicao in posicoes
+                 if 0 <= posicao < total_linhas and posicao not in self.removidas}
+        self.removidas |= novas
+        
+        # 📊 Agregados recebem o delta negativo de cada linha removida
+        codigos, clientes, paises = {}, {}, {}
+        for posicao in novas:
+            venda = self.vendas[posicao]
+            self._retirar_venda(venda)
+            codigos[venda['stock_code']] = None
+            clientes[venda['customer_id']] = None
+            paises[venda['country']] = None
+        self._atualizar_rankings(codigos, clientes, paises)
+        removidas_agora = list(novas)
+        self._acumular_rollups(*(self.valores_nas_posicoes(campo, removidas_agora) for campo in
+                                 ('invoice_date', 'invoice_no', 'customer_id', 'quantity', 'total')),
+                               sinal=-1)
+        if self.heavy_hitters is not None:
+            self.heavy_hitters.observar_colunas({
+                campo: list(self.valores_nas_posicoes(campo, removidas_agora))
+                for campo in CAMPOS_HEAVY_HITTERS
+            }, sinal=-1)
+        self.versao_dados += 1
+        
+        if self.removidas and not self.remocao_logica:
+            self.compactar()
+        return len(novas)
+
+    @property
+    def precisa_compactar(self) -> bool:
+        """True quando a fração de lápides passou de limiar_compactacao"""
+        return len(self.removidas) > self.limiar_compactacao * len(self.vendas)
+
+    def compactar_se_necessario(self) -> int:
+        """
+        Compacta só se as lápides passaram do limiar.
+
+        Chamado nos momentos ociosos (volta ao menu principal, antes do
+        snapshot), e não a cada remoção: nenhuma remoção paga a
+        reconstrução dos índices.
+
+        Returns:
+            int: Quantidade de linhas descartadas (0 se nada foi feito)
+        """
+        return self.compactar() if self.precisa_compactar else 0
+
+    def compactar(self) -> int:
+        """
+        Recupera o espaço das lápides em uma única passada.
+
+        As posições mudam, então os índices são refeitos ao final.
+
+        Returns:
+            int: Quantidade de linhas descartadas
+        """
+        if not self.removidas:
+            return 0
+        
+        # 🎭 Máscara: 1 = manter, 0 = descartar
+        mascara = bytearray(b'\x01') * len(self.vendas)
+        for posicao in self.removidas:
+            mascara[posicao] = 0
+        
+        if isinstance(self.vendas, ArmazenamentoColunar):
+            self.vendas.manter_linhas(mascara)
+        else:
+            self.vendas[:] = compress(self.vendas, mascara)
+        self.ids_linhas = array('Q', compress(self.ids_linhas, mascara))
+        
+        descartadas = len(self.removidas)
+        self.removidas = set()
+        self._reconstruir_indices()
+        return descartadas
+
+    def verificar_consistencia(self) -> Dict[str, Any]:
+        """
+          Auditoria: Recalcula Tudo do Zero
+
+        Refaz produtos, clientes, países, contadores e índices a partir
+        das vendas e compara com o estado mantido incrementalmente.
+
+        💡 Floats são comparados com tolerância de meio centavo: somar e
+        subtrair em outra ordem muda o arredondamento. Rótulos (descrição
+        do produto, país do cliente) vêm da primeira linha vista e não
+        são comparados.
+
+        Returns:
+            Dict: {'consistente': bool, 'divergencias': List[str]}
+        """
+        divergencias: List[str] = []
+
+        # 📊 AGREGADOS: mesmas rotinas da carga, linha a linha
+        referencia = DataStructure()
+        for venda in self.vendas_ativas():
+            venda = dict(venda)
+            referencia._atualizar_produto(venda)
+            referencia._atualizar_cliente(venda)
+            referencia._atualizar_pais(venda)
+
+        self._comparar_registros('produtos', self.produtos, referencia.produtos, divergencias)
+        self._comparar_registros('clientes', self.clientes, referencia.clientes, divergencias)
+        self._comparar_registros('agregados_paises', self.agregados_paises,
+                                 referencia.agregados_paises, divergencias)
+        ativas = list(self._sem_removidas(range(len(self.vendas))))
+        referencia._acumular_rollups(*(self.valores_nas_posicoes(campo, ativas) for campo in
+                                       ('invoice_date', 'invoice_no', 'customer_id', 'quantity', 'total')))
+        for granularidade in GRANULARIDADES:
+            self._comparar_registros(f'rollups[{granularidade}]', self.rollups[granularidade],
+                                     referencia.rollups[granularidade], divergencias)
+        if dict(self.paises) != dict(referencia.paises):
+            divergencias.append("paises: faturas por país diferem")
+        if self.contador_produtos is not None:
+            if self.contador_vendas_pais != referencia.contador_vendas_pais:
+                divergencias.append("contador_vendas_pais: contagens diferem")
+            if self.contador_produtos != referencia.contador_produtos:
+                divergencias.append("contador_produtos: quantidades diferem")
+        for campo in TIPOS_NUMERICOS:
+            soma = math.fsum(self.valores_nas_posicoes(campo, ativas))
+            if not math.isclose(self.somas[campo], soma, abs_tol=0.005):
+                divergencias.append(f"somas: {campo} = {self.somas[campo]} (esperado {soma})")
+
+        # 🏆 RANKINGS: mesma ordem de uma ordenação completa dos registros
+        for nome, registros, rankings in (('rankings_produtos', self.produtos, self.rankings_produtos),
+                                          ('rankings_clientes', self.clientes, self.rankings_clientes)):
+            for criterio, ranking in rankings.items():
+                esperado_ranking = sorted(registros.items(), key=lambda item: (-item[1][criterio], item[0]))
+                if ranking.maiores(len(registros) + 1) != [(chave, dados[criterio]) for chave, dados in esperado_ranking]:
+                    divergencias.append(f"{nome}: {criterio} fora de ordem ou incompleto")
+        if self.ranking_paises is not None and self.ranking_paises.maiores(
+                len(self.contador_vendas_pais) + 1) != sorted(
+                self.contador_vendas_pais.items(), key=lambda item: (-item[1], item[0])):
+            divergencias.append("ranking_paises: fora de ordem ou incompleto")
+
+        # 🔑 ÍNDICES: refeitos sobre as mesmas posições (lápides incluídas)
+        for nome, campo, normalizar in (('indice_faturas', 'invoice_no', None),
+                                        ('indice_produtos', 'stock_code', None),
+                                        ('indice_paises', 'country', str.casefold),
+                                        ('indice_descricoes', 'description', None)):
+            esperado: Dict[str, array] = {}
+            valores = self._valores_coluna(campo)
+            self._indexar_campo(esperado, map(normalizar, valores) if normalizar else valores, 0)
+            # Chaves que ficaram sem posições (após atualizações) não contam
+            atual = {chave: posicoes for chave, posicoes in getattr(self, nome).items() if posicoes}
+            if atual != esperado:
+                divergencias.append(f"{nome}: posições diferem")
+        
+        for descricao in self.indice_descricoes:
+            if any(descricao not in self.indice_palavras.get(palavra, ())
+                   for palavra in tokenizar(descricao)):
+                divergencias.append(f"indice_palavras: '{descricao}' sem todas as palavras")
+
+        for nome, campo, extrair in (('bitmap_paises', 'country', str.casefold),
+                                     ('bitmap_canceladas', 'invoice_no', methodcaller('startswith', 'C')),
+                                     ('bitmap_com_cliente', 'customer_id', bool)):
+            esperado_bitmap = IndiceBitmap()
+            esperado_bitmap.estender(map(extrair, self._valores_coluna(campo)), 0)
+            if getattr(self, nome).bitmaps != esperado_bitmap.bitmaps:
+                divergencias.append(f"{nome}: bits diferem")
+
+        # Mesma sequência (valor, posição): empates também em ordem de posição
+        esperado_totais = IndiceOrdenado()
+        esperado_totais.estender(self._valores_coluna('total'), 0)
+        if (list(zip(self.indice_totais.chaves, self.indice_totais.posicoes)) !=
+                list(zip(esperado_totais.chaves, esperado_totais.posicoes))):
+            divergencias.append("indice_totais: entradas diferem")
+
+        if self.codigos_produtos != sorted(self.indice_produtos):
+            divergencias.append("codigos_produtos: fora de ordem ou incompletos")
+        if len(self.ids_linhas) != len(self.vendas) or any(map(ge, self.ids_linhas, self.ids_linhas[1:])):
+            divergencias.append("ids_linhas: ids ausentes ou fora de ordem")
+        if self.timestamps != array('q', (converter_data(data)[0] for data in self._valores_coluna('invoice_date'))):
+            divergencias.append("timestamps: diferem das datas das vendas")
+
+        return {'consistente': not divergencias, 'divergencias': divergencias}
+
+    @staticmethod
+    def _comparar_registros(nome: str, atual: Dict[str, Dict[str, Any]],
+                            esperado: Dict[str, Dict[str, Any]], divergencias: List[str]):
+        """Compara dois dicionários de agregados (chaves, campos numéricos e Counters)"""
+        for chave in atual.keys() ^ esperado.keys():
+            divergencias.append(f"{nome}: '{chave}' existe só de um dos lados")
+        for chave in atual.keys() & esperado.keys():
+            for campo, valor in esperado[chave].items():
+                if isinstance(valor, str):
+                    continue  # Rótulo da primeira linha vista
+                if isinstance(valor, Counter):
+                    if atual[chave][campo] != valor:
+                        divergencias.append(f"{nome}: '{chave}' {campo} diferem")
+                    continue
+                if not math.isclose(atual[chave][campo], valor, abs_tol=0.005):
+                    divergencias.append(
+                        f"{nome}: '{chave}' {campo} = {atual[chave][campo]} (esperado {valor})")
+
+    def salvar_snapshot(self, caminho_origem: str, caminho_snapshot: str = CAMINHO_SNAPSHOT) -> bool:
+        """
+          Salvando um Snapshot Binário
+
+        Grava as linhas, os agregados, os sketches e os índices por
+        posição (CAMPOS_SNAPSHOT) com pickle, junto com a identidade do
+        CSV de origem. Na próxima execução o snapshot é lido em bloco em
+        vez de reprocessar o CSV linha por linha; nenhuma linha é
+        percorrida de novo.
+
+        Formato: dois objetos pickle em sequência
+        - cabeçalho: {'versao', 'origem', 'chave', 'configuracao'} (leitura rápida)
+        - corpo: {campo: valor} para cada campo de CAMPOS_SNAPSHOT
+
+        Args:
+            caminho_origem: CSV do qual os dados foram carregados
+            caminho_snapshot: Arquivo de destino
+
+        Returns:
+            bool: True se salvou
         """
-          Atualizando Dados de Clientes
-        
-        Demonstra:
-        - Validação de dados antes de processar
-        - Criação condicional de registros
-        - Acumulação de estatísticas por cliente
+        try:
+            cabecalho = {
+                'versao': VERSAO_SNAPSHOT,
+                'origem': os.path.abspath(caminho_origem),
+                'chave': chave_arquivo(caminho_origem),
+                'configuracao': self._configuracao_snapshot()
+            }
+            os.makedirs(os.path.dirname(caminho_snapshot), exist_ok=True)
+
+            # 🔒 Escreve num temporário e troca no final: um snapshot
+            # pela metade nunca substitui um snapshot válido
+            temporario = caminho_snapshot + '.tmp'
+            with open(temporario, 'wb') as arquivo:
+                pickle.dump(cabecalho, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump({campo: getattr(self, campo) for campo in CAMPOS_SNAPSHOT},
+                            arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, caminho_snapshot)
+            return True
+
+        except (OSError, pickle.PicklingError) as e:
+            print(f"Erro ao salvar snapshot: {e}")
+            return False
+
+    def restaurar_snapshot(self, caminho_origem: str, caminho_snapshot: str = CAMINHO_SNAPSHOT) -> bool:
         """
-        
-        # ================================================================
-        # ETAPA 1: EXTRAIR E VALIDAR ID DO CLIENTE
-        # ================================================================
-        
-        customer_id = venda['customer_id']
-        
-        # 🔍 Por que validar customer_id?
-        # - Nem todas as vendas têm cliente identificado
-        # - Vendas anônimas ou à vista podem ter ID vazio
-        # - Evita criar entradas desnecessárias no dicionário
-        
-        if customer_id and customer_id != '':
-            # ============================================================
-            # ETAPA 2: VERIFICAR SE CLIENTE JÁ EXISTE
-            # ============================================================
-            
-            if customer_id not in self.clientes:
-                # 🆕 CLIENTE NOVO: criar perfil inicial
-                self.clientes[customer_id] = {
-                    'pais': venda['country'],          # País do cliente
-                    'compras_total': 0,                # Número de compras
-                    'quantidade_total': 0,             # Total de itens comprados
-                    'gasto_total': 0.0                 # Total gasto pelo cliente
-                }
-            
-            # ============================================================
-            # ETAPA 3: ATUALIZAR PERFIL DO CLIENTE
-            # ============================================================
-            
-            # Referência ao cliente (mais fácil que repetir self.clientes[customer_id])
-            cliente = self.clientes[customer_id]
-            
-            # 📊 Acumular estatísticas:
-            cliente['compras_total'] += 1                    # +1 compra
-            cliente['quantidade_total'] += venda['quantity'] # +itens comprados
-            cliente['gasto_total'] += venda['total']         # +valor gasto
-    
-    def _atualizar_pais(self, venda: Dict[str, Any]):
+          Restaurando um Snapshot Binário
+
+        Só restaura se o snapshot foi gerado a partir do MESMO arquivo:
+        mesmo caminho, tamanho, data de modificação e hash do conteúdo.
+        Qualquer mudança no CSV invalida o cache automaticamente.
+
+        A configuração desta instância prevalece: um snapshot gravado com
+        outra forma de armazenamento, outra precisão de HyperLogLog ou
+        com/sem heavy hitters é recusado (o CSV é recarregado), e
+        remocao_logica/limiar_compactacao nunca vêm do snapshot.
+
+        ⚠️ pickle só deve ler arquivos confiáveis; o snapshot é gerado
+        pelo próprio sistema na pasta de cache local.
+
+        Returns:
+            bool: True se restaurou, False se não há snapshot válido
         """
-          Atualizando Dados por País
+        cabecalho = ler_cabecalho_snapshot(caminho_snapshot)
+        if not cabecalho or cabecalho['origem'] != os.path.abspath(caminho_origem):
+            return False
+        if cabecalho.get('configuracao') != self._configuracao_snapshot():
+            return False  # ⚙️ Estruturas montadas com outra configuração
+
+        try:
+            if cabecalho['chave'] != chave_arquivo(caminho_origem):
+                return False  # 🔄 CSV mudou: snapshot obsoleto
+
+            with open(caminho_snapshot, 'rb') as arquivo:
+                pickle.load(arquivo)          # Cabeçalho (já validado)
+                estado = pickle.load(arquivo)  # Corpo
+
+            # 🔍 Snapshot precisa ter todas as estruturas gravadas hoje
+            if not set(CAMPOS_SNAPSHOT) <= set(estado):
+                return False
+
+            # 🔄 Substitui o estado NESTE objeto: CRUD, relatórios e
+            # exportador continuam apontando para a mesma instância, e
+            # os atributos de configuração ficam como estão
+            for campo in CAMPOS_SNAPSHOT:
+                setattr(self, campo, estado[campo])
+            
+            # 🔤 Vocabulário: custo proporcional às descrições e países
+            # distintos (milhares), e não às linhas
+            self.indice_palavras = {}
+            for descricao in self.indice_descricoes:
+                self._indexar_palavras(descricao)
+            self.trigramas_paises = IndiceTrigramas()
+            for pais in self.paises:
+                self.trigramas_paises.adicionar(pais, pais)
+            self.estatisticas = {}
+            
+            if self.removidas and not self.remocao_logica:
+                self.compactar()
+            return True
+
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            print(f"Erro ao restaurar snapshot: {e}")
+            return False
+
+    def _configuracao_snapshot(self) -> Dict[str, Any]:
+        """Opções que mudam as estruturas gravadas (precisam coincidir na restauração)"""
+        return {
+            'armazenamento_colunar': isinstance(self.vendas, ArmazenamentoColunar),
+            'precisao_hll': self.precisao_hll,
+            'heavy_hitters': self.heavy_hitters is not None
+        }
+
+
+# ============================================================================
+# CONSULTAS - Filtros, ordenação e paginação sobre os índices
+# ============================================================================
+
+def _pertence(valor: Any, valores: Any) -> bool:
+    return valor in valores
+
+
+def _entre(valor: Any, faixa: Tuple[Any, Any]) -> bool:
+    return faixa[0] <= valor <= faixa[1]
+
+
+# 🔣 Operadores aceitos em Consulta.onde() -> função (valor da linha, alvo)
+# 'palavras' não tem função: é resolvido pelo índice invertido
+OPERADORES_CONSULTA: Dict[str, Optional[Callable[[Any, Any], bool]]] = {
+    '==': eq, '!=': ne, '<': lt, '<=': le, '>': gt, '>=': ge,
+    'in': _pertence, 'entre': _entre, 'palavras': None
+}
+
+# 🔑 Campos com índice hash (igualdade e 'in')
+CAMPOS_INDICE_HASH = {
+    'invoice_no': 'indice_faturas',
+    'stock_code': 'indice_produtos',
+    'country': 'indice_paises'
+}
+
+# 💰 Modelo de custo do planejador (unidade: ler uma posição da fonte)
+CUSTO_LINHA = 1.0        # Ler uma posição da fonte
+CUSTO_FILTRO = 1.0       # Conferir um filtro residual em uma linha
+CUSTO_COMPARACAO = 1.0   # Uma comparação de ordenação/heap
+
+
+class Consulta:
+    """
+      Construtor de Consultas (Query Builder)
+
+    Demonstra:
+    - Interface fluente: cada método devolve a própria consulta
+    - Avaliação preguiçosa: nada é executado até a iteração
+    - Planejamento por custo: cada caminho de acesso (índice hash,
+      índice invertido, índice ordenado ou varredura) tem seu custo
+      estimado pela seletividade dos filtros; o mais barato gera as
+      posições e os demais filtros só conferem essas posições
+    - Parada antecipada: com limite(), a leitura termina assim que
+      há linhas suficientes
+
+    Exemplo:
+        consulta = (data.consultar()
+                    .onde('country', '==', 'France')
+                    .onde('total', '>=', 100)
+                    .ordenar_por('total', decrescente=True)
+                    .limite(10)
+                    .selecionar('invoice_no', 'total'))
+        for linha in consulta: ...
+        consulta.explicar()   # plano escolhido, linhas estimadas x reais
+
+    💡 Comparações de país ignoram maiúsculas/minúsculas, como a busca
+    por país do CRUD. Sem ordenar_por(), a ordem é a da fonte usada
+    (ordem original das linhas, ou crescente de total quando a faixa
+    de total é que seleciona as linhas).
+    """
+
+    def __init__(self, data: 'DataStructure'):
+        self.data = data
+        self._filtros: List[Tuple[str, str, Any]] = []
+        self._ordem: Optional[Tuple[str, bool]] = None
+        self._limite: Optional[int] = None
+        self._pular = 0
+        self._campos: Optional[Tuple[str, ...]] = None
+        self._descricoes_em_cache: Dict[str, set] = {}
+
+    # ========================================================================
+    # CONSTRUÇÃO (interface fluente)
+    # ========================================================================
+
+    def onde(self, campo: str, operador: str, valor: Any) -> 'Consulta':
+        """Adiciona um filtro; vários filtros são combinados com E"""
+        if campo not in CAMPOS_VENDA:
+            raise ValueError(f"Campo desconhecido: {campo}")
+        if operador not in OPERADORES_CONSULTA:
+            raise ValueError(f"Operador desconhecido: {operador}")
+        if operador == 'palavras' and campo != 'description':
+            raise ValueError("O operador 'palavras' só vale para description")
+        if operador in ('in', 'entre'):
+            valor = tuple(valor)
+        if campo == 'country' and operador != 'palavras':
+            valor = (tuple(pais.casefold() for pais in valor)
+                     if isinstance(valor, tuple) else valor.casefold())
+        self._filtros.append((campo, operador, valor))
+        return self
+
+    def ordenar_por(self, campo: str, decrescente: bool = False) -> 'Consulta':
+        if campo not in CAMPOS_VENDA:
+            raise ValueError(f"Campo desconhecido: {campo}")
+        self._ordem = (campo, decrescente)
+        return self
+
+    def limite(self, quantidade: int) -> 'Consulta':
+        self._limite = quantidade
+        return self
+
+    def pular(self, quantidade: int) -> 'Consulta':
+        self._pular = quantidade
+        return self
+
+    def selecionar(self, *campos: str) -> 'Consulta':
+        """Projeção: as linhas retornadas terão só estes campos"""
+        for campo in campos:
+            if campo not in CAMPOS_VENDA:
+                raise ValueError(f"Campo desconhecido: {campo}")
+        self._campos = campos or None
+        return self
+
+    # ========================================================================
+    # EXECUÇÃO
+    # ========================================================================
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        posicoes = self._posicoes()
+        if self._pular or self._limite is not None:
+            fim = None if self._limite is None else self._pular + self._limite
+            posicoes = islice(posicoes, self._pular, fim)
+
+        if self._campos is None:
+            vendas = self.data.vendas
+            for posicao in posicoes:
+                yield vendas[posicao]
+        else:
+            acessos = [(campo, self.data.acesso_ao_campo(campo)) for campo in self._campos]
+            for posicao in posicoes:
+                yield {campo: ler(posicao) for campo, ler in acessos}
+
+    def listar(self) -> List[Dict[str, Any]]:
+        """Executa e devolve as linhas em uma lista"""
+        return list(self)
+
+    def primeiro(self) -> Optional[Dict[str, Any]]:
+        """Primeira linha do resultado (ou None), lendo o mínimo possível"""
+        return next(iter(self), None)
+
+    def contar(self) -> int:
+        """Quantidade de linhas que atendem aos filtros (ignora limite/pular)"""
+        if not self._filtros:
+            return self.data.quantidade_vendas()
+        return sum(1 for _ in self._posicoes())
+
+    def explicar(self) -> Dict[str, Any]:
+        """
+          Plano da Consulta (EXPLAIN)
+
+        Mostra o caminho de acesso escolhido, os filtros residuais, como
+        a ordenação é atendida, os caminhos considerados com seus custos
+        e as linhas estimadas versus as reais (a consulta é executada
+        para contá-las).
+        """
+        plano, candidatos = self._planejar()
+        seletividade = math.prod(map(self._seletividade, self._filtros))
+
+        if self._ordem is None:
+            ordenacao = 'nenhuma'
+        elif self._ordem == plano['ordem']:
+            ordenacao = 'fornecida pelo caminho de acesso'
+        elif self._limite is not None:
+            ordenacao = f'heap dos {self._pular + self._limite} primeiros'
+        else:
+            ordenacao = 'ordenação completa'
+
+        return {
+            'caminho': plano['caminho'],
+            'filtros_residuais': [f'{campo} {operador} {valor!r}'
+                                  for campo, operador, valor in plano['residuais']],
+            'ordenacao': ordenacao,
+            'custo_estimado': round(plano['custo'], 1),
+            'linhas_lidas_estimadas': plano['linhas'],
+            'linhas_estimadas': round(self.data.quantidade_vendas() * seletividade),
+            'linhas_reais': self.contar(),
+            'candidatos': [(candidato['caminho'], candidato['linhas'], round(candidato['custo'], 1))
+                           for candidato in candidatos]
+        }
+
+    def _posicoes(self) -> Iterator[int]:
+        """Posições filtradas (e ordenadas, se pedido), geradas sob demanda"""
+        plano, _ = self._planejar()
+        ordenada_por, residuais = plano['ordem'], plano['residuais']
+
+        posicoes = plano['fonte']()
+        if self.data.removidas:
+            posicoes = filterfalse(self.data.removidas.__contains__, posicoes)
+        if residuais:
+            testes = [self._teste(filtro) for filtro in residuais]
+            posicoes = (posicao for posicao in posicoes
+                        if all(teste(ler(posicao), valor) for ler, teste, valor in testes))
+
+        if self._ordem is None or self._ordem == ordenada_por:
+            return iter(posicoes)
+
+        # 🔃 Ordenação que o índice não fornece: com limite, só os K primeiros
+        campo, decrescente = self._ordem
+        chave = self.data.acesso_ao_campo(campo)
+        if self._limite is not None:
+            k = self._pular + self._limite
+            escolher = heapq.nlargest if decrescente else heapq.nsmallest
+            return iter(escolher(k, posicoes, key=chave))
+        return iter(sorted(posicoes, key=chave, reverse=decrescente))
+
+    def _teste(self, filtro: Tuple[str, str, Any]) -> Tuple[Callable, Callable, Any]:
+        """(leitura do campo, comparação, alvo) de um filtro residual"""
+        campo, operador, valor = filtro
+        if operador == 'palavras':
+            # Residual de palavras: a descrição tem que estar entre as encontradas
+            return self._acesso(campo), _pertence, self._descricoes(valor)
+        return self._acesso(campo), OPERADORES_CONSULTA[operador], valor
+
+    def _acesso(self, campo: str) -> Callable[[int], Any]:
+        ler = self.data.acesso_ao_campo(campo)
+        if campo == 'country':
+            return lambda posicao: ler(posicao).casefold()
+        return ler
+
+    # ========================================================================
+    # PLANEJAMENTO (escolha do caminho de acesso pelo custo)
+    # ========================================================================
+
+    def _planejar(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Monta os caminhos de acesso possíveis, estima o custo de cada um
+        e escolhe o mais barato.
+
+        Returns:
+            (caminho escolhido, todos os caminhos considerados)
+        """
+        self._descricoes_em_cache = {}
+        candidatos = self._caminhos()
+        for candidato in candidatos:
+            candidato['custo'] = self._custo(candidato)
+        # Empate: vale a ordem de _caminhos() (índices antes da varredura)
+        return min(candidatos, key=itemgetter('custo')), candidatos
+
+    def _caminhos(self) -> List[Dict[str, Any]]:
+        """
+        Caminhos de acesso aplicáveis aos filtros.
+
+        Cada caminho informa quantas linhas lê da fonte, a fonte (criada
+        só se for escolhido), a ordem em que entrega as posições, os
+        filtros que garante e os que sobram como residuais.
+        """
+        data = self.data
+        filtros = self._filtros
+        caminhos = []
+
+        # 1️⃣ Igualdade / 'in' em campo com índice hash
+        for filtro in filtros:
+            campo, operador, valor = filtro
+            if campo in CAMPOS_INDICE_HASH and operador in ('==', 'in'):
+                indice = getattr(data, CAMPOS_INDICE_HASH[campo])
+                chaves = valor if operador == 'in' else (valor,)
+                listas = [indice.get(chave, ()) for chave in dict.fromkeys(chaves)]
+                linhas = sum(map(len, listas))
+                caminhos.append(self._caminho(
+                    f'índice hash de {campo}', linhas,
+                    partial(iter, listas[0]) if len(listas) == 1 else partial(heapq.merge, *listas),
+                    None, (filtro,),
+                    # Várias chaves: intercalação das listas (heap de len(listas))
+                    preparo=linhas * math.log2(len(listas)) * CUSTO_COMPARACAO))
+
+        # 2️⃣ Palavras da descrição (índice invertido)
+        for filtro in filtros:
+            if filtro[1] == 'palavras':
+                descricoes = self._descricoes(filtro[2])
+                linhas = sum(len(data.indice_descricoes[descricao]) for descricao in descricoes)
+                caminhos.append(self._caminho(
+                    'índice invertido de description', linhas,
+                    partial(data.posicoes_das_descricoes, descricoes), None, (filtro,),
+                    # As posições de várias descrições precisam ser ordenadas
+                    preparo=linhas * math.log2(linhas + 1) * CUSTO_COMPARACAO))
+
+        # 3️⃣ Faixa de total (índice ordenado): os filtros de total continuam
+        # como residuais para respeitar < e > estritos
+        filtros_total = tuple(filtro for filtro in filtros if self._faixa_de_total(filtro))
+        ordem_total = self._ordem is not None and self._ordem[0] == 'total'
+        if filtros_total or ordem_total:
+            minimo, maximo = float('-inf'), float('inf')
+            for filtro in filtros_total:
+                faixa = self._faixa_de_total(filtro)
+                minimo, maximo = max(minimo, faixa[0]), min(maximo, faixa[1])
+            indice = data.indice_totais
+            inicio, fim = indice.intervalo(minimo, maximo)
+            preparo = math.log2(len(data.vendas) + 1) * CUSTO_COMPARACAO
+            # map() sobre um range: começa direto em `inicio`, sem copiar a faixa
+            if ordem_total and self._ordem[1]:
+                # Decrescente: percorre o índice de trás para frente
+                caminhos.append(self._caminho(
+                    'índice ordenado de total (decrescente)', fim - inicio,
+                    partial(map, indice.posicoes.__getitem__, range(fim - 1, inicio - 1, -1)),
+                    ('total', True), filtros_total, residuais=filtros, preparo=preparo))
+            else:
+                caminhos.append(self._caminho(
+                    'índice ordenado de total', fim - inicio,
+                    partial(map, indice.posicoes.__getitem__, range(inicio, fim)),
+                    ('total', False), filtros_total, residuais=filtros, preparo=preparo))
+
+        # 4️⃣ Varredura de todas as linhas, na ordem original (sempre possível)
+        caminhos.append(self._caminho('varredura completa', len(data.vendas),
+                                      partial(range, len(data.vendas)), None, ()))
+        return caminhos
+
+    def _caminho(self, nome: str, linhas: int, fonte: Callable[[], Any],
+                 ordem: Optional[Tuple[str, bool]], cobertos: Tuple,
+                 residuais: Optional[List] = None, preparo: float = 0.0) -> Dict[str, Any]:
+        """Descrição de um caminho; residuais padrão: os filtros não cobertos"""
+        if residuais is None:
+            residuais = [filtro for filtro in self._filtros
+                         if not any(filtro is coberto for coberto in cobertos)]
+        # Só os filtros que a fonte não garante reduzem as linhas lidas
+        restantes = [filtro for filtro in self._filtros
+                     if not any(filtro is coberto for coberto in cobertos)]
+        return {
+            'caminho': nome,
+            'linhas': linhas,
+            'fonte': fonte,
+            'ordem': ordem,
+            'residuais': list(residuais),
+            'seletividade_residual': math.prod(map(self._seletividade, restantes)),
+            'preparo': preparo
+        }
+
+    def _custo(self, caminho: Dict[str, Any]) -> float:
+        """
+        Custo estimado (em "linhas lidas") de executar a consulta pelo caminho.
+
+        - Cada linha lida custa CUSTO_LINHA mais CUSTO_FILTRO por residual
+        - Com limite e sem ordenação extra, a leitura para cedo: lê em
+          média (pular + limite) / seletividade dos residuais
+        - Ordem não fornecida pelo caminho: todas as linhas são lidas e
+          as aprovadas passam por um heap (com limite) ou por um sort
+        """
+        linhas = caminho['linhas']
+        seletividade = caminho['seletividade_residual']
+        por_linha = CUSTO_LINHA + CUSTO_FILTRO * len(caminho['residuais'])
+        custo = caminho['preparo']
+
+        if self._ordem is None or self._ordem == caminho['ordem']:
+            if self._limite is not None and linhas:
+                necessarias = self._pular + self._limite
+                linhas = min(linhas, necessarias / max(seletividade, 1 / linhas))
+            return custo + linhas * por_linha
+
+        aprovadas = linhas * seletividade
+        k = aprovadas if self._limite is None else min(aprovadas, self._pular + self._limite)
+        return custo + linhas * por_linha + aprovadas * math.log2(k + 1) * CUSTO_COMPARACAO
+
+    def _seletividade(self, filtro: Tuple[str, str, Any]) -> float:
+        """
+        Fração estimada das linhas que atendem ao filtro.
+
+        Filtros com índice usam contagens exatas (tamanho das listas do
+        índice hash ou invertido, bisect no índice ordenado); os demais,
+        as estatísticas da coluna (mais comuns e histograma).
+        """
+        data = self.data
+        campo, operador, valor = filtro
+        total = len(data.vendas)
+        if not total:
+            return 0.0
+        if operador == 'palavras':
+            indice = data.indice_descricoes
+            return sum(len(indice[descricao]) for descricao in self._descricoes(valor)) / total
+        if campo in CAMPOS_INDICE_HASH and operador in ('==', 'in'):
+            indice = getattr(data, CAMPOS_INDICE_HASH[campo])
+            chaves = valor if operador == 'in' else (valor,)
+            return sum(len(indice.get(chave, ())) for chave in dict.fromkeys(chaves)) / total
+        faixa = self._faixa_de_total(filtro)
+        if faixa:
+            return data.indice_totais.contar(*faixa) / total
+        return data.estatisticas_da_coluna(campo).seletividade(operador, valor)
+
+    def _descricoes(self, consulta: str) -> set:
+        """Descrições da busca por palavras (calculadas uma vez por planejamento)"""
+        descricoes = self._descricoes_em_cache.get(consulta)
+        if descricoes is None:
+            descricoes = self._descricoes_em_cache[consulta] = self.data.descricoes_por_texto(consulta)
+        return descricoes
+
+    @staticmethod
+    def _faixa_de_total(filtro: Tuple[str, str, Any]) -> Optional[Tuple[float, float]]:
+        """Faixa [mínimo, máximo] de total que o filtro delimita (ou None)"""
+        campo, operador, valor = filtro
+        if campo != 'total':
+            return None
+        if operador in ('>', '>='):
+            return valor, float('inf')
+        if operador in ('<', '<='):
+            return float('-inf'), valor
+        if operador == '==':
+            return valor, valor
+        if operador == 'entre':
+            return valor[0], valor[1]
+        return None
+
+
+# ============================================================================
+# AGRUPAMENTO - Group-by e cubo de agregações em uma única varredura
+# ============================================================================
+
+def _mes_da_data(data: str) -> Optional[str]:
+    """'2010-12' (mesmo período dos rollups) ou None se a data for inválida"""
+    _, periodos = converter_data(data)
+    return periodos[2] if periodos else None
+
+
+def _hora_do_timestamp(momento: int) -> Optional[int]:
+    """Hora do dia (0 a 23) ou None se a data for inválida"""
+    return momento // 3600 % 24 if momento != DATA_INVALIDA else None
+
+
+def _dia_semana_do_timestamp(momento: int) -> Optional[int]:
+    """Dia da semana (0 = segunda) ou None; 1970-01-01 foi uma quinta (3)"""
+    return (momento // 86400 + 3) % 7 if momento != DATA_INVALIDA else None
+
+
+# 🕒 Dimensões derivadas da data: nome -> (origem, função que gera a chave)
+# - Origem 'timestamps' é o array de DataStructure (datas já convertidas)
+# - Chave None (data inválida) deixa a linha fora dos grupos
+DIMENSOES_DATA: Dict[str, Tuple[str, Callable[[Any], Any]]] = {
+    'mes': ('invoice_date', _mes_da_data),
+    'hora': ('timestamps', _hora_do_timestamp),
+    'dia_semana': ('timestamps', _dia_semana_do_timestamp)
+}
+
+# ➗ Funções de agregação aceitas em uma medida (função, campo)
+FUNCOES_AGREGACAO: Tuple[str, ...] = ('soma', 'contagem', 'media', 'minimo', 'maximo', 'distintos')
+
+# 🧊 Cubo pré-calculado pelos relatórios (dimensões e medidas mais usadas)
+DIMENSOES_CUBO_PADRAO: Tuple[str, ...] = ('country', 'mes', 'dia_semana')
+MEDIDAS_CUBO_PADRAO: Tuple[Tuple[str, Optional[str]], ...] = (
+    ('soma', 'total'), ('soma', 'quantity'), ('contagem', None),
+    ('distintos', 'invoice_no'), ('distintos', 'customer_id')
+)
+
+
+class Agrupamento:
+    """
+      Motor de Agrupamento (GROUP BY / CUBE)
+
+    Demonstra:
+    - Uma única varredura das vendas para qualquer combinação de
+      dimensões e medidas
+    - Chaves codificadas por dicionário: cada combinação de valores das
+      dimensões vira um número de grupo (no armazenamento colunar as
+      colunas de texto já são códigos inteiros, comparados sem ler texto)
+    - Medidas calculadas coluna a coluna sobre o número do grupo
+    - Acumuladores que se combinam (soma, contagem, mínimo, máximo e
+      conjuntos de distintos): o cubo agrega o nível mais detalhado para
+      todos os subconjuntos de dimensões sem varrer de novo
+
+    Uso:
+        Agrupamento(data, ['country', 'mes'], [('soma', 'total'), ('contagem', None)]).calcular()
+        -> {('France', '2011-01'): (12345.6, 321), ...}
+    """
+
+    def __init__(self, data: 'DataStructure', dimensoes, medidas):
+        self.data = data
+        self.dimensoes: Tuple[str, ...] = tuple(dimensoes)
+        self.medidas: Tuple[Tuple[str, Optional[str]], ...] = tuple(
+            (funcao, campo) for funcao, campo in medidas)
         
-        Demonstra:
-        - Uso do defaultdict para evitar erros
-        - Múltiplas estruturas para diferentes propósitos
-        - Eficiência de contadores automáticos
+        for dimensao in self.dimensoes:
+            if dimensao not in CAMPOS_VENDA and dimensao not in DIMENSOES_DATA:
+                raise ValueError(f"Dimensão desconhecida: {dimensao}")
+        for funcao, campo in self.medidas:
+            if funcao not in FUNCOES_AGREGACAO:
+                raise ValueError(f"Função de agregação desconhecida: {funcao}")
+            if funcao != 'contagem' and campo not in CAMPOS_VENDA:
+                raise ValueError(f"Campo desconhecido para {funcao}: {campo}")
+            if funcao in ('soma', 'media') and campo not in TIPOS_NUMERICOS:
+                raise ValueError(f"{funcao} exige campo numérico: {campo}")
+
+    def calcular(self) -> Dict[Tuple[Any, ...], Tuple[Any, ...]]:
+        """Chave (um valor por dimensão) -> resultados (um por medida)"""
+        return {chave: self._finalizar(estado) for chave, estado in self._acumular().items()}
+
+    def cubo(self) -> Dict[Tuple[str, ...], Dict[Tuple[Any, ...], Tuple[Any, ...]]]:
+        """
+        Todos os agrupamentos possíveis (2^d) a partir de UMA varredura.
+
+        Returns:
+            Dict: dimensões do agrupamento (na ordem original, () = total
+            geral) -> resultado no mesmo formato de calcular()
+        """
+        detalhado = self._acumular()
+        cubo = {}
+        for tamanho in range(len(self.dimensoes), -1, -1):
+            for indices in combinations(range(len(self.dimensoes)), tamanho):
+                agregado: Dict[Tuple[Any, ...], List[Any]] = {}
+                for chave, estado in detalhado.items():
+                    chave = tuple(chave[indice] for indice in indices)
+                    if chave in agregado:
+                        self._mesclar(agregado[chave], estado)
+                    else:
+                        agregado[chave] = self._copiar(estado)
+                nomes = tuple(self.dimensoes[indice] for indice in indices)
+                cubo[nomes] = {chave: self._finalizar(estado) for chave, estado in agregado.items()}
+        return cubo
+
+    # ------------------------------------------------------------------
+    # Varredura
+    # ------------------------------------------------------------------
+
+    def _ativas(self) -> Optional[List[int]]:
+        """Posições das linhas ativas, ou None se não há lápides"""
+        data = self.data
+        return list(data._sem_removidas(range(len(data.vendas)))) if data.removidas else None
+
+    def _coluna(self, campo: str, ativas: Optional[List[int]], codificada: bool = False):
+        """
+        Valores de um campo nas linhas ativas.
+
+        Com codificada=True, colunas de texto do armazenamento colunar
+        devolvem (códigos, tabela de tradução) em vez do texto.
         """
+        data = self.data
+        if campo == 'timestamps':
+            valores = data.timestamps
+            return map(valores.__getitem__, ativas) if ativas is not None else valores, None
+        if codificada and isinstance(data.vendas, ArmazenamentoColunar) and campo not in TIPOS_NUMERICOS:
+            coluna = data.vendas.coluna(campo)
+            codigos = coluna.codigos
+            return map(codigos.__getitem__, ativas) if ativas is not None else codigos, coluna.valores
+        if ativas is not None:
+            return data.valores_nas_posicoes(campo, ativas), None
+        return data._valores_coluna(campo), None
+
+    def _acumular(self) -> Dict[Tuple[Any, ...], List[Any]]:
+        """Estado dos acumuladores de cada grupo (nível mais detalhado)"""
+        ativas = self._ativas()
         
-        # ================================================================
-        # ETAPA 1: EXTRAIR E VALIDAR PAÍS
-        # ================================================================
+        # 🔑 DIMENSÕES: colunas (códigos quando possível) e como decodificar
+        colunas, tradutores = [], []
+        for dimensao in self.dimensoes:
+            if dimensao in DIMENSOES_DATA:
+                campo, derivar = DIMENSOES_DATA[dimensao]
+                valores, _ = self._coluna(campo, ativas)
+                valores = list(valores)
+                # Uma chamada por valor distinto; as linhas são traduzidas em C
+                derivados = {valor: derivar(valor) for valor in set(valores)}
+                colunas.append(list(map(derivados.__getitem__, valores)))
+                tradutores.append(None)
+            else:
+                valores, tabela = self._coluna(dimensao, ativas, codificada=True)
+                colunas.append(valores)
+                tradutores.append(tabela)
         
-        pais = venda['country']
+        # 🔢 Número do grupo de cada linha: combinação -> 0, 1, 2, ...
+        grupos: Dict[Tuple[Any, ...], int] = {}
+        ids = [grupos.setdefault(chave, len(grupos)) for chave in zip(*colunas)]
+        if not self.dimensoes:
+            linhas = len(ativas) if ativas is not None else len(self.data.vendas)
+            grupos, ids = ({(): 0}, [0] * linhas) if linhas else ({}, [])
+        quantidade = len(grupos)
         
-        # 🌍 Por que validar país?
-        # - Alguns registros podem ter país vazio
-        # - Evita processamento desnecessário
+        # ➗ MEDIDAS: uma passada por coluna, acumulando por número do grupo
+        estados = []
+        contagem_grupos = None
+        for funcao, campo in self.medidas:
+            if funcao in ('contagem', 'media') and contagem_grupos is None:
+                contagem_grupos = [0] * quantidade
+                for grupo, linhas in Counter(ids).items():
+                    contagem_grupos[grupo] = linhas
+            if funcao == 'contagem':
+                estados.append(contagem_grupos)
+                continue
+            valores, _ = self._coluna(campo, ativas)
+            if funcao in ('soma', 'media'):
+                somas = [0] * quantidade
+                for grupo, valor in zip(ids, valores):
+                    somas[grupo] += valor
+                estados.append(somas if funcao == 'soma' else list(zip(somas, contagem_grupos)))
+            elif funcao in ('minimo', 'maximo'):
+                melhor = min if funcao == 'minimo' else max
+                extremos = [None] * quantidade
+                for grupo, valor in zip(ids, valores):
+                    atual = extremos[grupo]
+                    extremos[grupo] = valor if atual is None else melhor(atual, valor)
+                estados.append(extremos)
+            else:  # distintos (valores vazios, como venda sem cliente, não contam)
+                conjuntos = [set() for _ in range(quantidade)]
+                for grupo, valor in set(zip(ids, valores)):
+                    if valor != '':
+                        conjuntos[grupo].add(valor)
+                estados.append(conjuntos)
         
-        if pais:
-            # ============================================================
-            # ETAPA 2: ADICIONAR VENDA À LISTA DO PAÍS
-            # ============================================================
-            
-            # 📝 Por que usar defaultdict(list)?
-            # - Se país não existe, cria lista vazia automaticamente
-            # - Sem defaultdict, precisaríamos: if pais not in self.paises: self.paises[pais] = []
-            # - append() adiciona o número da fatura à lista do país
-            self.paises[pais].append(venda['invoice_no'])
-            
-            # ============================================================
-            # ETAPA 3: INCREMENTAR CONTADOR DO PAÍS
-            # ============================================================
-            
-            # 📈 Por que usar Counter?
-            # - Conta automaticamente vendas por país
-            # - Counter[pais] += 1 incrementa o contador
-            # - Método .most_common() já ordena por quantidade
-            self.contador_vendas_pais[pais] += 1
+        # 🔓 Chaves decodificadas; grupos com data inválida ficam de fora
+        resultado = {}
+        for chave, grupo in grupos.items():
+            chave = tuple(tabela[valor] if tabela is not None else valor
+                          for valor, tabela in zip(chave, tradutores))
+            if None not in chave:
+                resultado[chave] = [estado[grupo] for estado in estados]
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Acumuladores
+    # ------------------------------------------------------------------
+
+    def _mesclar(self, destino: List[Any], origem: List[Any]):
+        """Combina o estado de um grupo detalhado no grupo agregado"""
+        for indice, (funcao, _) in enumerate(self.medidas):
+            atual, outro = destino[indice], origem[indice]
+            if funcao in ('soma', 'contagem'):
+                destino[indice] = atual + outro
+            elif funcao == 'media':
+                destino[indice] = (atual[0] + outro[0], atual[1] + outro[1])
+            elif funcao == 'minimo':
+                destino[indice] = min(atual, outro)
+            elif funcao == 'maximo':
+                destino[indice] = max(atual, outro)
+            else:
+                atual |= outro
+
+    @staticmethod
+    def _copiar(estado: List[Any]) -> List[Any]:
+        """Cópia do estado (conjuntos novos: o original não é alterado)"""
+        return [set(valor) if isinstance(valor, set) else valor for valor in estado]
+
+    def _finalizar(self, estado: List[Any]) -> Tuple[Any, ...]:
+        """Estado dos acumuladores -> valores finais das medidas"""
+        resultado = []
+        for (funcao, _), valor in zip(self.medidas, estado):
+            if funcao == 'media':
+                soma, linhas = valor
+                resultado.append(soma / linhas if linhas else 0.0)
+            elif funcao == 'distintos':
+                resultado.append(len(valor))
+            else:
+                resultado.append(valor)
+        return tuple(resultado)
+
+
+# ============================================================================
+# SEGMENTAÇÃO RFM - Recência, frequência e valor de cada cliente
+# ============================================================================
+
+# 🎚️ Notas de 1 a 5: cada quintil dos clientes recebe uma nota
+QUANTIS_RFM = 5
+
+# 🏷️ Segmentos pelas notas de recência (R) e frequência (F), na ordem
+# em que são testados: (faixa de R, faixa de F, nome)
+SEGMENTOS_RFM: Tuple[Tuple[range, range, str], ...] = (
+    (range(5, 6), range(4, 6), 'Campeões'),
+    (range(3, 5), range(4, 6), 'Clientes fiéis'),
+    (range(4, 6), range(2, 4), 'Potenciais fiéis'),
+    (range(5, 6), range(1, 2), 'Novos clientes'),
+    (range(4, 5), range(1, 2), 'Promissores'),
+    (range(3, 4), range(3, 4), 'Precisam de atenção'),
+    (range(3, 4), range(1, 3), 'Quase dormindo'),
+    (range(1, 3), range(5, 6), 'Não podemos perder'),
+    (range(1, 3), range(3, 5), 'Em risco'),
+    (range(1, 3), range(1, 3), 'Hibernando')
+)
+
+
+def _notas_por_quantil(valores: Dict[str, float]) -> Dict[str, int]:
+    """
+    Nota de 1 (menores valores) a QUANTIS_RFM (maiores) pelos pontos de
+    corte dos quintis, com busca binária.
+
+    Um valor igual ao corte fica no quintil de baixo, então valores
+    iguais têm sempre a mesma nota: milhares de clientes de uma única
+    compra ficam todos com F = 1, e os quintis saem de tamanhos
+    diferentes. Sem empates, cada quintil tem 1/QUANTIS_RFM dos clientes.
+    """
+    if not valores:
+        return {}
+    ordenados = sorted(valores.values())
+    total = len(ordenados)
+    # Corte q = último valor dos q primeiros quintis (rank ⌈q·total/5⌉ - 1)
+    cortes = [ordenados[(q * total - 1) // QUANTIS_RFM] for q in range(1, QUANTIS_RFM)]
+    return {chave: 1 + bisect_left(cortes, valor) for chave, valor in valores.items()}
+
+
+def segmento_rfm(recencia: int, frequencia: int) -> str:
+    """Nome do segmento para as notas de recência e frequência"""
+    for recencias, frequencias, nome in SEGMENTOS_RFM:
+        if recencia in recencias and frequencia in frequencias:
+            return nome
+    return 'Sem segmento'
+
+
+# ============================================================================
+# CESTAS DE COMPRAS - Itens frequentes e regras de associação (FP-growth)
+# ============================================================================
+
+# 🎚️ Padrões: item em 2% das faturas; regra certa em 50% das vezes
+SUPORTE_MINIMO_PADRAO = 0.02
+CONFIANCA_MINIMA_PADRAO = 0.5
+
+# 📮 Códigos que não são produtos (frete, taxas, ajustes): fora das cestas
+CODIGOS_SEM_PRODUTO = frozenset({
+    'POST', 'DOT', 'M', 'C2', 'BANK CHARGES', 'AMAZONFEE', 'CRUK', 'D', 'PADS', 'S', 'B'
+})
+
+
+class ArvoreFP:
+    """
+      Árvore FP: Cestas Comprimidas em Prefixos Compartilhados
+
+    Demonstra:
+    - Cada cesta entra como caminho da raiz, com os itens do mais
+      frequente ao menos frequente: cestas parecidas dividem os nós
+      do começo e viram contagens, não cópias
+    - Nós em listas paralelas (item, contagem, pai) com inteiros, em vez
+      de um objeto por nó
+    - Cabeçalho item -> nós daquele item: o suporte e os caminhos de um
+      item saem sem percorrer a árvore inteira
+    """
+
+    __slots__ = ('itens', 'contagens', 'pais', 'filhos', 'cabecalho')
+
+    def __init__(self):
+        self.itens: List[int] = [-1]        # Nó 0 = raiz
+        self.contagens: List[int] = [0]
+        self.pais: List[int] = [-1]
+        self.filhos: List[Dict[int, int]] = [{}]
+        self.cabecalho: Dict[int, List[int]] = defaultdict(list)
+
+    def inserir(self, caminho, contagem: int):
+        """Acrescenta um caminho (itens já na ordem da árvore) `contagem` vezes"""
+        no = 0
+        for item in caminho:
+            filho = self.filhos[no].get(item)
+            if filho is None:
+                filho = len(self.itens)
+                self.itens.append(item)
+                self.contagens.append(0)
+                self.pais.append(no)
+                self.filhos.append({})
+                self.filhos[no][item] = filho
+                self.cabecalho[item].append(filho)
+            self.contagens[filho] += contagem
+            no = filho
+
+    def caminhos_do_item(self, item: int) -> List[Tuple[List[int], int]]:
+        """Base condicional: (prefixo até a raiz, contagem) de cada nó do item"""
+        itens, pais, contagens = self.itens, self.pais, self.contagens
+        base = []
+        for no in self.cabecalho[item]:
+            prefixo = []
+            pai = pais[no]
+            while pai > 0:
+                prefixo.append(itens[pai])
+                pai = pais[pai]
+            if prefixo:
+                prefixo.reverse()
+                base.append((prefixo, contagens[no]))
+        return base
+
+
+class MineradorFPGrowth:
+    """
+      FP-growth: Conjuntos de Itens Frequentes sem Gerar Candidatos
+
+    Demonstra:
+    - Duas passadas nas cestas: contar os itens e montar a árvore FP
+      só com os frequentes (itens raros nunca entram)
+    - Mineração recursiva: para cada item, a base condicional (caminhos
+      que terminam nele) vira uma árvore menor, minerada da mesma forma
+    - Regras de associação a partir dos suportes já contados: nenhuma
+      cesta é lida de novo
+
+    Args:
+        transacoes: Cestas como sequências de ids inteiros (sem repetição)
+        suporte_minimo: Fração mínima das cestas (0.02) ou contagem (>= 1)
+        tamanho_maximo: Maior conjunto minerado (None = sem limite)
+    """
+
+    def __init__(self, transacoes, suporte_minimo: float = SUPORTE_MINIMO_PADRAO,
+                 tamanho_maximo: Optional[int] = None):
+        self.transacoes = transacoes
+        self.total = len(transacoes)
+        self.contagem_minima = max(math.ceil(suporte_minimo * self.total) if suporte_minimo < 1
+                                   else int(suporte_minimo), 1)
+        self.tamanho_maximo = tamanho_maximo
+        self.frequentes: Dict[Tuple[int, ...], int] = {}
+
+    def itemsets_frequentes(self) -> Dict[Tuple[int, ...], int]:
+        """Conjunto (ids em ordem crescente) -> número de cestas que o contêm"""
+        contagens = Counter(chain.from_iterable(self.transacoes))
+        self.frequentes = {}
+        self._minerar([(cesta, 1) for cesta in self.transacoes], contagens, ())
+        return self.frequentes
+
+    def _minerar(self, base: List[Tuple[Any, int]], contagens: Counter, sufixo: Tuple[int, ...]):
+        """Monta a árvore da base (condicional) e minera cada item frequente"""
+        minimo = self.contagem_minima
+        ordem = {item: rank for rank, (item, _) in enumerate(sorted(
+            ((item, contagem) for item, contagem in contagens.items() if contagem >= minimo),
+            key=lambda par: (-par[1], par[0])))}
+        if not ordem:
+            return
+        
+        arvore = ArvoreFP()
+        for caminho, contagem in base:
+            caminho = sorted((item for item in caminho if item in ordem), key=ordem.__getitem__)
+            if caminho:
+                arvore.inserir(caminho, contagem)
+        
+        # ⬆️ Do item menos frequente ao mais frequente (fim dos caminhos)
+        for item in sorted(ordem, key=ordem.__getitem__, reverse=True):
+            conjunto = sufixo + (item,)
+            self.frequentes[tuple(sorted(conjunto))] = contagens[item]
+            if self.tamanho_maximo is not None and len(conjunto) >= self.tamanho_maximo:
+                continue
+            condicional = arvore.caminhos_do_item(item)
+            if condicional:
+                contagens_condicionais = Counter()
+                for caminho, contagem in condicional:
+                    for anterior in caminho:
+                        contagens_condicionais[anterior] += contagem
+                self._minerar(condicional, contagens_condicionais, conjunto)
+
+    def regras(self, confianca_minima: float = CONFIANCA_MINIMA_PADRAO) -> List[Dict[str, Any]]:
+        """
+        Regras antecedente -> consequente dos conjuntos frequentes.
+
+        suporte = cestas com todos os itens / cestas; confiança =
+        suporte(conjunto) / suporte(antecedente); lift = confiança /
+        suporte(consequente) (acima de 1 = compram juntos mais do que o acaso).
+        """
+        if not self.frequentes:
+            self.itemsets_frequentes()
+        frequentes, total = self.frequentes, self.total
+        regras = []
+        for conjunto, contagem in frequentes.items():
+            for tamanho in range(1, len(conjunto)):
+                for antecedente in combinations(conjunto, tamanho):
+                    confianca = contagem / frequentes[antecedente]
+                    if confianca < confianca_minima:
+                        continue
+                    consequente = tuple(item for item in conjunto if item not in antecedente)
+                    regras.append({
+                        'antecedente': antecedente,
+                        'consequente': consequente,
+                        'cestas': contagem,
+                        'suporte': contagem / total,
+                        'confianca': confianca,
+                        'lift': confianca / (frequentes[consequente] / total)
+                    })
+        regras.sort(key=lambda regra: (-regra['lift'], -regra['confianca'], regra['antecedente']))
+        return regras
+
+
+# ============================================================================
+# CARREGAMENTO PARALELO - Leitura do CSV em vários processos
+# ============================================================================
+
+# 📏 Arquivos menores que isso carregam mais rápido em um único processo
+# (criar processos e juntar resultados também custa tempo)
+TAMANHO_MINIMO_PARALELO = 8 * 1024 * 1024
+
+
+def dividir_csv_em_fatias(caminho_csv: str, quantidade: int) -> List[Tuple[int, int]]:
+    """
+      Divide o Arquivo em Faixas de Bytes
+
+    Cada faixa começa logo após uma quebra de linha, então nenhum
+    registro é cortado ao meio. O cabeçalho fica de fora.
+
+    ⚠️ Supõe registros sem quebra de linha dentro de campos entre aspas
+    (é o caso do dataset Online Retail).
+
+    Args:
+        caminho_csv: Caminho do arquivo CSV
+        quantidade: Número desejado de fatias
+
+    Returns:
+        List[Tuple[int, int]]: Pares (início, fim) em bytes
+    """
+    tamanho = os.path.getsize(caminho_csv)
+    fatias = []
+
+    with open(caminho_csv, 'rb') as arquivo:
+        arquivo.readline()  # Pular cabeçalho
+        inicio = arquivo.tell()
+        passo = max(1, (tamanho - inicio) // max(1, quantidade))
+
+        while inicio < tamanho:
+            alvo = inicio + passo
+            if alvo >= tamanho:
+                fim = tamanho
+            else:
+                # 🔍 Avança até o fim da linha em que o alvo caiu
+                arquivo.seek(alvo)
+                arquivo.readline()
+                fim = arquivo.tell()
+            fatias.append((inicio, fim))
+            inicio = fim
+
+    return fatias
+
+
+def _carregar_fatia_csv(caminho_csv: str, inicio: int, fim: int, colunas: List[str],
+                        armazenamento_colunar: bool) -> Dict[str, Any]:
+    """
+    Processa uma fatia do CSV dentro de um processo trabalhador.
+
+    Função de módulo (e não método) porque precisa ser serializada
+    pelo pickle para ser enviada aos outros processos.
+
+    Returns:
+        Dict: estrutura parcial e contadores no mesmo formato do
+        carregamento sequencial
+    """
+    with open(caminho_csv, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        bruto = arquivo.read(fim - inicio)
+
+    dados = DataStructure(armazenamento_colunar=armazenamento_colunar)
+
+    # 📖 csv.reader sobre a fatia em memória; linhas em branco são
+    # ignoradas, como no csv.DictReader do carregamento sequencial
+    texto = bruto.decode('latin-1')
+    linhas = [linha for linha in csv.reader(io.StringIO(texto, newline='')) if linha]
+    # 🔑 Sem índices: o processo principal indexa tudo uma única vez, e
+    # a estrutura volta pelo pickle só com linhas, agregados e sketches
+    lote = dados.adicionar_vendas(linhas, colunas, numero_inicial=0, somente_texto=True, indexar=False)
+
+    resultado = {
+        'dados': dados,
+        'registros': len(linhas),
+        'carregados': len(lote['aceitas']),
+        'com_erro': len(lote['rejeitadas']),
+        'erros': lote['rejeitadas'][:5]  # (número do registro na fatia, motivo)
+    }
+    return resultado
 
 
 # ============================================================================
@@ -482,7 +4669,7 @@ class EcommerceCRUD:
           Operação READ - Busca Por Chave Primária
         
         Demonstra:
-        - Busca linear em lista (algoritmo O(n))
+        - Busca em índice hash (algoritmo O(1))
         - Uso de Optional para indicar "pode não encontrar"
         - Retorno None quando não encontra
         
@@ -490,19 +4677,17 @@ class EcommerceCRUD:
             invoice_no: Número da fatura para buscar
             
         Returns:
-            Optional[Dict]: Venda encontrada ou None
+            Optional[Dict]: Primeira linha da fatura ou None
         """
         try:
-            # 🔄 BUSCA LINEAR:
-            # - Percorre toda a lista de vendas
-            # - Compara cada invoice_no com o buscado
-            # - Para quando encontra o primeiro match
+            # 🔑 ÍNDICE HASH:
+            # - indice_faturas[invoice_no] já tem as posições das linhas
+            # - Nenhuma venda é percorrida, não importa o tamanho da lista
             
-            for venda in self.data.vendas:
-                if venda['invoice_no'] == invoice_no:
-                    return venda  # ✅ Encontrou!
+            posicoes = self.data.posicoes_da_fatura(invoice_no)
+            if posicoes:
+                return self.data.vendas[posicoes[0]]  # ✅ Encontrou!
             
-            # Se chegou aqui, não encontrou nada
             return None  # ❌ Não encontrado
             
         except Exception as e:
@@ -510,13 +4695,33 @@ class EcommerceCRUD:
             print(f"Erro ao buscar venda: {e}")
             return None
     
+    def buscar_vendas_por_invoice(self, invoice_no: str) -> List[Dict[str, Any]]:
+        """
+          Operação READ - Todas as Linhas de uma Fatura
+        
+        Uma fatura costuma ter vários itens (uma linha por produto).
+        O índice guarda todas as posições, então buscar a fatura inteira
+        custa o mesmo que buscar uma linha.
+        
+        Args:
+            invoice_no: Número da fatura
+            
+        Returns:
+            List[Dict]: Linhas da fatura (vazia se não existir)
+        """
+        try:
+            return self.data.vendas_nas_posicoes(self.data.posicoes_da_fatura(invoice_no))
+        except Exception as e:
+            print(f"Erro ao buscar vendas da fatura: {e}")
+            return []
+    
     def buscar_vendas_por_produto(self, stock_code: str) -> List[Dict[str, Any]]:
         """
-          Busca com Filtro - List Comprehension
+          Busca com Índice Secundário
         
         Demonstra:
-        - List comprehension (sintaxe compacta do Python)
-        - Filtro por critério específico
+        - Índice secundário (chave não única -> várias posições)
+        - Custo proporcional ao resultado, não ao tamanho da base
         - Retorno de lista (pode ter 0, 1 ou N resultados)
         
         Args:
@@ -526,17 +4731,9 @@ class EcommerceCRUD:
             List[Dict]: Lista de vendas do produto (pode estar vazia)
         """
         try:
-            # 📜 LIST COMPREHENSION EXPLICADA:
-            # Sintaxe: [expressão for item in lista if condição]
-            # 
-            # Equivale a:
-            # resultado = []
-            # for venda in self.data.vendas:
-            #     if venda['stock_code'] == stock_code:
-            #         resultado.append(venda)
-            # return resultado
-            
-            return [venda for venda in self.data.vendas if venda['stock_code'] == stock_code]
+            # 📇 O índice já sabe em quais posições o produto aparece:
+            # nenhuma venda de outro produto é visitada
+            return self.data.vendas_nas_posicoes(self.data.posicoes_do_produto(stock_code))
             
         except Exception as e:
             print(f"Erro ao buscar vendas por produto: {e}")
@@ -544,11 +4741,11 @@ class EcommerceCRUD:
     
     def buscar_vendas_por_pais(self, pais: str) -> List[Dict[str, Any]]:
         """
-          Busca com Comparação Case-Insensitive
+          Busca Case-Insensitive com Índice Secundário
         
         Demonstra:
         - Comparação ignorando maiúsculas/minúsculas
-        - Método .lower() para normalizar strings
+        - Método .casefold() para normalizar strings (chave do índice)
         - Busca mais amigável ao usuário
         
         Args:
@@ -558,28 +4755,134 @@ class EcommerceCRUD:
             List[Dict]: Vendas do país (qualquer capitalização)
         """
         try:
-            # 🔤 COMPARAÇÃO CASE-INSENSITIVE:
-            # - .lower() converte para minúsculas
-            # - "Brasil".lower() == "brasil".lower() é True
-            # - Usuário pode digitar "brasil", "Brasil" ou "BRASIL"
-            
-            return [venda for venda in self.data.vendas 
-                   if venda['country'].lower() == pais.lower()]
+            # 🔤 O índice é montado com country.casefold(), então
+            # "brasil", "Brasil" e "BRASIL" levam às mesmas posições
+            return self.data.vendas_nas_posicoes(self.data.posicoes_do_pais(pais))
                    
         except Exception as e:
             print(f"Erro ao buscar vendas por país: {e}")
             return []
     
+    def consultar(self) -> 'Consulta':
+        """
+          Consulta Composta e Preguiçosa
+        
+        Demonstra:
+        - Filtros encadeados: .onde('country', '==', 'France').onde('total', '>', 100)
+        - Ordenação, limite, deslocamento e projeção
+        - Só as linhas efetivamente percorridas são lidas
+        
+        Returns:
+            Consulta: construtor de consultas sobre as vendas
+        """
+        return self.data.consultar()
+
+    def paginar_vendas(self, itens_por_pagina: int = 10, cursor: Optional[Dict[str, Any]] = None,
+                       ordenar_por: Optional[str] = None,
+                       decrescente: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+          Paginação por Cursor (Keyset Pagination)
+
+        Demonstra:
+        - Cursor = chave da última linha vista, e não número da página
+        - Retomada por busca binária: a página 1.000 custa o mesmo que a 1ª
+        - Nenhuma cópia da base: só as linhas da página são lidas
+        - Estável com inserções e remoções entre as páginas
+
+        Exemplo:
+            pagina, cursor = crud.paginar_vendas(10, ordenar_por='total')
+            while cursor:
+                pagina, cursor = crud.paginar_vendas(10, cursor)
+
+        Args:
+            itens_por_pagina: Quantidade de vendas por página
+            cursor: Devolvido pela página anterior (a ordem vem nele)
+            ordenar_por: None (ordem original) ou 'total'
+            decrescente: Ordem decrescente
+
+        Returns:
+            Tuple: (vendas da página, cursor da próxima ou None se acabou)
+        """
+        try:
+            if cursor is not None:
+                ordenar_por, decrescente = cursor['ordenar_por'], cursor['decrescente']
+            posicoes, chave = self.data.pagina_de_vendas(
+                itens_por_pagina, ordenar_por, decrescente,
+                None if cursor is None else cursor['chave'])
+            proximo = None if chave is None else {
+                'ordenar_por': ordenar_por, 'decrescente': decrescente, 'chave': chave}
+            return self.data.vendas_nas_posicoes(posicoes), proximo
+
+        except Exception as e:
+            print(f"Erro ao paginar vendas: {e}")
+            return [], None
+
+    def paginar_produtos(self, itens_por_pagina: int = 10, cursor: Optional[Dict[str, Any]] = None,
+                         decrescente: bool = False) -> Tuple[List[Tuple[str, Dict[str, Any]]], Optional[Dict[str, Any]]]:
+        """
+          Paginação de Produtos por Cursor (ordem de stock_code)
+
+        Args:
+            itens_por_pagina: Quantidade de produtos por página
+            cursor: Devolvido pela página anterior
+            decrescente: Ordem decrescente de código
+
+        Returns:
+            Tuple: ([(stock_code, dados)], cursor da próxima ou None se acabou)
+        """
+        try:
+            if cursor is not None:
+                decrescente = cursor['decrescente']
+            codigos, tem_mais = self.data.pagina_de_produtos(
+                itens_por_pagina, decrescente, None if cursor is None else cursor['chave'])
+            produtos = self.data.produtos
+            proximo = {'ordenar_por': 'stock_code', 'decrescente': decrescente,
+                       'chave': codigos[-1]} if tem_mais else None
+            return [(codigo, produtos[codigo]) for codigo in codigos], proximo
+
+        except Exception as e:
+            print(f"Erro ao paginar produtos: {e}")
+            return [], None
+
+    def buscar_vendas_por_texto(self, consulta: str) -> List[Dict[str, Any]]:
+        """
+          Busca por Palavras da Descrição (Índice Invertido)
+        
+        Demonstra:
+        - Índice invertido: palavra -> descrições -> posições
+        - Consultas com E (padrão), OR e prefixo ("LANTERN*")
+        
+        Args:
+            consulta: Ex.: "RED HEART", "HEART OR STAR", "LANTERN*"
+            
+        Returns:
+            List[Dict]: Vendas encontradas, na ordem original
+        """
+        try:
+            return self.data.vendas_nas_posicoes(self.data.posicoes_por_texto(consulta))
+        except Exception as e:
+            print(f"Erro na busca por texto: {e}")
+            return []
+    
+    def buscar_produtos_por_texto(self, consulta: str) -> List[str]:
+        """Códigos dos produtos vendidos com descrições que atendem à consulta"""
+        try:
+            return self.data.produtos_das_posicoes(self.data.posicoes_por_texto(consulta))
+        except Exception as e:
+            print(f"Erro na busca por texto: {e}")
+            return []
+    
     # ========================================================================
     # ✏️ UPDATE - ATUALIZAR REGISTROS EXISTENTES
     # ========================================================================
     
-    def atualizar_venda(self, invoice_no: str, novos_dados: Dict[str, Any]) -> bool:
+    def atualizar_venda(self, invoice_no: str, novos_dados: Dict[str, Any],
+                        todas_linhas: bool = False) -> bool:
         """
           Operação UPDATE do CRUD
         
         Demonstra:
-        - Busca com enumerate() para obter índice
+        - Busca da posição pelo índice hash (sem percorrer a lista)
         - Validação de campos permitidos (segurança)
         - Recalculo automático de campos derivados
         - Atualização parcial (só campos fornecidos)
@@ -587,48 +4890,49 @@ class EcommerceCRUD:
         Args:
             invoice_no: Identificador da venda
             novos_dados: Dicionário com campos a atualizar
+            todas_linhas: Se True, atualiza todas as linhas da fatura;
+                senão, apenas a primeira
             
         Returns:
             bool: True se atualizou, False se não encontrou
         """
         try:
-            # 🔢 ENUMERATE PARA OBTER ÍNDICE:
-            # - enumerate(lista) retorna (index, item)
-            # - Precisamos do índice para atualizar a posição correta
+            # 🔑 POSIÇÕES PELO ÍNDICE:
+            posicoes = self.data.posicoes_da_fatura(invoice_no)
+            if not posicoes:
+                return False  # ❌ Não encontrou a venda
             
-            for i, venda in enumerate(self.data.vendas):
-                if venda['invoice_no'] == invoice_no:
-                    
-                    # ============================================================
-                    # SEGURANÇA: Só PERMITIR CAMPOS ESPECÍFICOS
-                    # ============================================================
-                    
-                    # 🔒 Por que restringir campos?
-                    # - Evita modificação acidental de dados críticos
-                    # - invoice_no nunca deve mudar (chave primária)
-                    # - customer_id e country são dados históricos
-                    
-                    campos_permitidos = ['quantity', 'unit_price', 'description']
-                    
-                    for campo in campos_permitidos:
-                        if campo in novos_dados:
-                            # Atualizar apenas se campo foi fornecido
-                            venda[campo] = novos_dados[campo]
-                    
-                    # ============================================================
-                    # RECALCULAR CAMPOS DERIVADOS
-                    # ============================================================
-                    
-                    # 📊 Por que recalcular?
-                    # - Total depende de quantity e unit_price
-                    # - Se qualquer um mudou, total deve ser atualizado
-                    # - Mantém consistência dos dados
-                    
-                    venda['total'] = venda['quantity'] * venda['unit_price']
-                    
-                    return True  # ✅ Atualizou com sucesso
+            if not todas_linhas:
+                posicoes = posicoes[:1]
+            
+            # ============================================================
+            # SEGURANÇA: Só PERMITIR CAMPOS ESPECÍFICOS
+            # ============================================================
+            
+            # 🔒 Por que restringir campos?
+            # - Evita modificação acidental de dados críticos
+            # - invoice_no nunca deve mudar (chave primária e chave do índice)
+            # - customer_id e country são dados históricos
             
-            return False  # ❌ Não encontrou a venda
+            campos_permitidos = ['quantity', 'unit_price', 'description']
+            
+            # Atualizar apenas os campos fornecidos
+            alteracoes = {campo: novos_dados[campo]
+                          for campo in campos_permitidos if campo in novos_dados}
+            
+            for posicao in posicoes:
+                # ============================================================
+                # RECALCULAR CAMPOS DERIVADOS
+                # ============================================================
+                
+                # 📊 Por que recalcular?
+                # - Total depende de quantity e unit_price
+                # - Se qualquer um mudou, total deve ser atualizado
+                # - Mantém consistência dos dados (e do índice por total)
+                
+                self.data.atualizar_linha(posicao, alteracoes)
+            
+            return True  # ✅ Atualizou com sucesso
             
         except Exception as e:
             print(f"Erro ao atualizar venda: {e}")
@@ -638,42 +4942,38 @@ class EcommerceCRUD:
     # 🗑️ DELETE - REMOVER REGISTROS
     # ========================================================================
     
-    def deletar_venda(self, invoice_no: str) -> bool:
+    def deletar_venda(self, invoice_no: str, todas_linhas: bool = False) -> bool:
         """
           Operação DELETE do CRUD
         
         Demonstra:
-        - Busca com enumerate() para deleção segura
-        - Uso de del para remover item de lista
-        - Deleção por índice (mais eficiente)
+        - Localização da linha pelo índice hash
+        - Delegação da remoção para DataStructure (que mantém os índices)
+        - Remoção de uma linha ou da fatura inteira
         
         ⚠️ ATENÇÃO: Esta operação é irreversível!
         
         Args:
             invoice_no: Identificador da venda a deletar
+            todas_linhas: Se True, remove todas as linhas da fatura;
+                senão, apenas a primeira
             
         Returns:
             bool: True se deletou, False se não encontrou
         """
         try:
             # 🔍 BUSCAR VENDA A DELETAR:
-            for i, venda in enumerate(self.data.vendas):
-                if venda['invoice_no'] == invoice_no:
-                    
-                    # ========================================================
-                    # DELEÇÃO SEGURA POR ÍNDICE
-                    # ========================================================
-                    
-                    # 🗑️ Por que del por índice?
-                    # - del lista[index] é mais eficiente
-                    # - lista.remove(item) precisa buscar o item novamente
-                    # - Já temos o índice do enumerate()
-                    
-                    del self.data.vendas[i]
-                    
-                    return True  # ✅ Deletou com sucesso
+            posicoes = self.data.posicoes_da_fatura(invoice_no)
+            if not posicoes:
+                return False  # ❌ Não encontrou para deletar
+            
+            if not todas_linhas:
+                posicoes = posicoes[:1]
             
-            return False  # ❌ Não encontrou para deletar
+            # 🗑️ Remoção + atualização dos índices em um só lugar
+            self.data.remover_vendas(posicoes)
+            
+            return True  # ✅ Deletou com sucesso
             
         except Exception as e:
             print(f"Erro ao deletar venda: {e}")
@@ -695,8 +4995,9 @@ class EcommerceCRUD:
         # - Retorna a lista original (não uma cópia)
         # - Mais eficiente em memória
         # - Cuidado: modificações na lista retornada afetam os dados originais
+        # - Com linhas removidas (lápides), retorna só as ativas
         
-        return self.data.vendas
+        return self.data.vendas_ativas()
 
 
 # ============================================================================
@@ -743,6 +5044,12 @@ class RelatoriosAnalytics:
         Mantém separação entre dados e análise.
         """
         self.data = data_structure
+        
+        # 🧊 Cubo pré-calculado e a versão dos dados em que foi calculado
+        self.cubo: Optional[Dict[Tuple[str, ...], Dict[Tuple[Any, ...], Tuple[Any, ...]]]] = None
+        self.dimensoes_cubo: Tuple[str, ...] = ()
+        self.medidas_cubo: Tuple[Tuple[str, Optional[str]], ...] = ()
+        self.versao_cubo = -1
     
     def calcular_medias(self) -> Dict[str, float]:
         """
@@ -750,8 +5057,9 @@ class RelatoriosAnalytics:
         
         Demonstra:
         - Validação antes de cálculos (evita divisão por zero)
-        - Função sum() com generator expression
-        - Agregações múltiplas de uma única passada
+        - Agregados mantidos incrementalmente: as somas já estão prontas
+          em DataStructure.somas, então o custo é O(1) para qualquer
+          tamanho de base
         - Retorno estruturado em dicionário
         
         Returns:
@@ -767,24 +5075,25 @@ class RelatoriosAnalytics:
             # - Retorna resultado consistente (dict vazio)
             # - Falha rápida se não há dados
             
-            if not self.data.vendas:
+            # 🔢 Contar total de vendas (base para todas as médias)
+            total_vendas = self.data.quantidade_vendas()
+            
+            if not total_vendas:
                 return {}  # Sem dados, sem cálculos
             
             # ================================================================
-            # CÁLCULOS DE AGREGAÇÃO
+            # SOMAS CORRENTES
             # ================================================================
             
-            # 🔢 Contar total de vendas (base para todas as médias)
-            total_vendas = len(self.data.vendas)
-            
-            # 💰 SOMA DE VALORES com Generator Expression:
-            # sum(expressão for item in lista) é eficiente em memória
-            # Não cria lista temporária, processa item por item
-            soma_valores = sum(venda['total'] for venda in self.data.vendas)
-            
-            # 📦 Soma de quantidades vendidas
-            soma_quantidades = sum(venda['quantity'] for venda in self.data.vendas)
-            
+            # ➕ Por que não somar aqui?
+            # - Percorrer todas as vendas a cada abertura da tela é O(n)
+            # - Inserção, alteração e remoção já aplicam seus deltas às
+            #   somas (lápides inclusive), então basta lê-las
+            somas = self.data.somas
+            soma_valores = somas['total']
+            soma_quantidades = somas['quantity']
+            soma_precos = somas['unit_price']
+
             # ================================================================
             # RETORNO ESTRUTURADO
             # ================================================================
@@ -801,8 +5110,8 @@ class RelatoriosAnalytics:
                 # Média de itens por venda
                 'quantidade_media_por_venda': soma_quantidades / total_vendas,
                 
-                # Preço médio dos produtos (recalculado para demonstração)
-                'preco_medio_unitario': sum(venda['unit_price'] for venda in self.data.vendas) / total_vendas,
+                # Preço médio dos produtos
+                'preco_medio_unitario': soma_precos / total_vendas,
                 
                 # Totais absolutos (não são médias, mas úteis no contexto)
                 'receita_total': soma_valores,
@@ -814,105 +5123,506 @@ class RelatoriosAnalytics:
             print(f"Erro ao calcular médias: {e}")
             return {}  # Retorno consistente mesmo com erro
     
-    def ranking_produtos_mais_vendidos(self, top_n: int = 10) -> List[Tuple[str, Dict[str, Any]]]:
+    def ranking_produtos_mais_vendidos(self, top_n: int = 10,
+                                       criterio: str = 'quantidade_total') -> List[Tuple[str, Dict[str, Any]]]:
+        """
+          Rankings sem Ordenar Tudo a Cada Consulta
+        
+        Demonstra:
+        - Top-K mantido incrementalmente: quantidade, receita e número de
+          vendas já estão em ordem em DataStructure.rankings_produtos
+        - heapq.nlargest() para critérios sem ranking mantido: seleção
+          parcial em O(n log K), sem ordenar os ~4 mil produtos
+        - Trabalho com tuplas como retorno
+        
+        Args:
+            top_n: Quantos produtos incluir no ranking (padrão 10)
+            criterio: Campo numérico de produtos usado na ordenação
+            
+        Returns:
+            List[Tuple]: Lista de tuplas (stock_code, dados_produto); com
+            heavy hitters (quantidade) os dados trazem 'quantidade_estimada'
+        """
+        try:
+            produtos = self.data.produtos
+            
+            # 🔥 Heavy hitters no lugar dos rankings exatos: top-K do
+            # Space-Saving, em memória fixa
+            monitor = self.data.heavy_hitters
+            if monitor is not None and criterio == 'quantidade_total':
+                return [(stock_code, dict(produtos[stock_code], quantidade_estimada=estimativa))
+                        for stock_code, estimativa in monitor.maiores('stock_code', top_n)
+                        if stock_code in produtos]
+            
+            # ================================================================
+            # RANKING MANTIDO: LEITURA DOS K PRIMEIROS (O(K))
+            # ================================================================
+            
+            # 🏆 Por que não usar sorted()?
+            # - sorted() ordena TODOS os produtos para aproveitar só top_n
+            # - O ranking já é atualizado a cada inserção, alteração e
+            #   remoção, então basta ler o começo da lista
+            ranking = self.data.rankings_produtos.get(criterio)
+            if ranking is not None:
+                return [(stock_code, produtos[stock_code]) for stock_code, _ in ranking.maiores(top_n)]
+            
+            # ================================================================
+            # SELEÇÃO PARCIAL COM HEAP (CRITÉRIO AD-HOC)
+            # ================================================================
+            
+            # 🔝 heapq.nlargest mantém um heap de apenas top_n itens
+            # - x = (stock_code, dados_produto); x[1][criterio] = valor
+            return heapq.nlargest(top_n, produtos.items(), key=lambda x: x[1][criterio])
+            
+        except Exception as e:
+            print(f"Erro ao gerar ranking de produtos: {e}")
+            return []  # Lista vazia em caso de erro
+    
+    def ranking_paises_por_vendas(self, top_n: int = 10) -> List[Tuple[str, int]]:
+        """
+        Gera ranking dos países por número de vendas (ranking mantido, O(K)).
+
+        Com heavy hitters, a contagem vem do monitor (aproximada).
+        """
+        try:
+            monitor = self.data.heavy_hitters
+            if monitor is not None:
+                return [(pais, round(estimativa)) for pais, estimativa in monitor.maiores('country', top_n)]
+            return self.data.ranking_paises.maiores(top_n)
+        except Exception as e:
+            print(f"Erro ao gerar ranking de países: {e}")
+            return []
+    
+    def ranking_clientes(self, top_n: int = 10,
+                         criterio: str = 'gasto_total') -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Gera ranking dos clientes pelo critério escolhido.
+
+        Gasto, quantidade e número de compras vêm do ranking mantido
+        (O(K)); outros critérios usam seleção parcial com heap.
+        Com heavy hitters, o gasto vem do monitor ('gasto_estimado' nos
+        dados).
+
+        Returns:
+            List[Tuple]: Lista de tuplas (customer_id, dados_cliente)
+        """
+        try:
+            clientes = self.data.clientes
+            monitor = self.data.heavy_hitters
+            if monitor is not None and criterio == 'gasto_total':
+                return [(customer_id, dict(clientes[customer_id], gasto_estimado=estimativa))
+                        for customer_id, estimativa in monitor.maiores('customer_id', top_n)
+                        if customer_id in clientes]
+            ranking = self.data.rankings_clientes.get(criterio)
+            if ranking is not None:
+                return [(customer_id, clientes[customer_id]) for customer_id, _ in ranking.maiores(top_n)]
+            return heapq.nlargest(top_n, clientes.items(), key=lambda x: x[1][criterio])
+        except Exception as e:
+            print(f"Erro ao gerar ranking de clientes: {e}")
+            return []
+    
+    def segmentacao_rfm(self) -> List[Dict[str, Any]]:
+        """
+          Segmentação RFM (Recência, Frequência e Valor)
+        
+        Demonstra:
+        - Uma única varredura das vendas (DataStructure.metricas_rfm):
+          última compra, faturas distintas e gasto de cada cliente
+        - Notas por quintil (1 a 5): pontos de corte tirados de sorted()
+          sobre ~4 mil clientes (e não sobre as ~540 mil vendas) e
+          bisect para cada valor; clientes iguais recebem a mesma nota
+        - Segmentos nomeados pelas notas de recência e frequência
+        
+        Recência é contada em dias até o dia seguinte à compra mais
+        recente do dataset (a base é histórica, "hoje" não serve).
+        
+        Returns:
+            List[Dict]: Um dicionário por cliente, do maior gasto ao menor
+        """
+        try:
+            metricas = self.data.metricas_rfm()
+            if not metricas:
+                return []
+            
+            ultimas = {cliente: valores[0] for cliente, valores in metricas.items()}
+            notas_r = _notas_por_quantil(ultimas)  # Mais recente = maior nota
+            notas_f = _notas_por_quantil({cliente: valores[1] for cliente, valores in metricas.items()})
+            notas_m = _notas_por_quantil({cliente: valores[2] for cliente, valores in metricas.items()})
+            referencia = max(ultimas.values()) // 86400 + 1
+            
+            clientes = self.data.clientes
+            resultado = []
+            for cliente, (ultima, frequencia, gasto) in metricas.items():
+                r, f, m = notas_r[cliente], notas_f[cliente], notas_m[cliente]
+                valida = ultima != DATA_INVALIDA
+                resultado.append({
+                    'customer_id': cliente,
+                    'pais': clientes[cliente]['pais'] if cliente in clientes else '',
+                    'ultima_compra': (_EPOCA + timedelta(seconds=ultima)).strftime('%Y-%m-%d') if valida else '',
+                    'recencia_dias': referencia - ultima // 86400 if valida else None,
+                    'frequencia': frequencia,
+                    'monetario': round(gasto, 2),
+                    'r': r,
+                    'f': f,
+                    'm': m,
+                    'rfm': f"{r}{f}{m}",
+                    'segmento': segmento_rfm(r, f)
+                })
+            resultado.sort(key=lambda linha: (-linha['monetario'], linha['customer_id']))
+            return resultado
+            
+        except Exception as e:
+            print(f"Erro ao calcular segmentação RFM: {e}")
+            return []
+    
+    def regras_de_associacao(self, suporte_minimo: float = SUPORTE_MINIMO_PADRAO,
+                             confianca_minima: float = CONFIANCA_MINIMA_PADRAO,
+                             tamanho_maximo: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+          Análise de Cestas: O que é Comprado Junto
+        
+        Demonstra:
+        - Cestas montadas das faturas com ids inteiros (array('I')):
+          comparar e guardar inteiros custa menos que textos
+        - FP-growth (MineradorFPGrowth): conjuntos frequentes sem
+          testar combinações candidatas
+        - Regras traduzidas de volta para códigos e descrições
+        
+        Args:
+            suporte_minimo: Fração mínima das faturas com o conjunto
+            confianca_minima: Confiança mínima das regras (0 a 1)
+            tamanho_maximo: Maior conjunto de itens (None = sem limite)
+            
+        Returns:
+            List[Dict]: Regras do maior lift ao menor
+        """
+        try:
+            codigos, cestas = self.data.cestas_de_compras()
+            if not cestas:
+                return []
+            
+            minerador = MineradorFPGrowth(cestas, suporte_minimo, tamanho_maximo)
+            produtos = self.data.produtos
+            
+            def descrever(itens):
+                return [produtos[codigos[item]]['description'] if codigos[item] in produtos else ''
+                        for item in itens]
+            
+            regras = []
+            for regra in minerador.regras(confianca_minima):
+                regras.append({
+                    'antecedente': [codigos[item] for item in regra['antecedente']],
+                    'consequente': [codigos[item] for item in regra['consequente']],
+                    'descricao_antecedente': descrever(regra['antecedente']),
+                    'descricao_consequente': descrever(regra['consequente']),
+                    'faturas': regra['cestas'],
+                    'suporte': regra['suporte'],
+                    'confianca': regra['confianca'],
+                    'lift': regra['lift']
+                })
+            return regras
+            
+        except Exception as e:
+            print(f"Erro ao minerar regras de associação: {e}")
+            return []
+    
+    @staticmethod
+    def resumo_rfm(clientes_rfm: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resume a segmentação RFM por segmento.
+
+        Returns:
+            Dict: segmento -> {'clientes', 'percentual', 'recencia_media',
+                  'frequencia_media', 'monetario_medio', 'receita'},
+                  do segmento com maior receita ao de menor
+        """
+        grupos: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for linha in clientes_rfm:
+            grupos[linha['segmento']].append(linha)
+        
+        resumo = {}
+        for segmento, linhas in grupos.items():
+            recencias = [linha['recencia_dias'] for linha in linhas if linha['recencia_dias'] is not None]
+            receita = math.fsum(linha['monetario'] for linha in linhas)
+            resumo[segmento] = {
+                'clientes': len(linhas),
+                'percentual': len(linhas) / len(clientes_rfm) * 100,
+                'recencia_media': sum(recencias) / len(recencias) if recencias else None,
+                'frequencia_media': sum(linha['frequencia'] for linha in linhas) / len(linhas),
+                'monetario_medio': receita / len(linhas),
+                'receita': receita
+            }
+        return dict(sorted(resumo.items(), key=lambda item: -item[1]['receita']))
+    
+    def filtrar_vendas_por_valor(self, valor_minimo: float = 0, valor_maximo: float = float('inf')) -> List[Dict[str, Any]]:
+        """
+        Filtra vendas por faixa de valor usando o índice ordenado por total.
+
+        O resultado vem em ordem crescente de total e, no armazenamento
+        colunar, as linhas só são criadas quando percorridas.
+        """
+        try:
+            posicoes = self.data.posicoes_por_total(valor_minimo, valor_maximo)
+            return self.data.vendas_nas_posicoes(posicoes)
+        except Exception as e:
+            print(f"Erro ao filtrar vendas por valor: {e}")
+            return []
+    
+    def resumo_vendas_por_valor(self, valor_minimo: float = 0, valor_maximo: float = float('inf')) -> Dict[str, Any]:
+        """Quantidade e receita de uma faixa de valor, sem montar as linhas"""
+        try:
+            return {
+                'total_vendas': self.data.contar_por_total(valor_minimo, valor_maximo),
+                'receita_total': self.data.somar_por_total(valor_minimo, valor_maximo)
+            }
+        except Exception as e:
+            print(f"Erro ao resumir vendas por valor: {e}")
+            return {'total_vendas': 0, 'receita_total': 0.0}
+    
+    def filtrar_vendas_combinado(self, paises: Optional[List[str]] = None,
+                                 canceladas: Optional[bool] = None,
+                                 com_cliente: Optional[bool] = None,
+                                 valor_minimo: Optional[float] = None,
+                                 valor_maximo: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Filtro composto (países, cancelamento, cliente e faixa de total).
+
+        Ex.: filtrar_vendas_combinado(['France', 'Germany'], canceladas=False,
+        valor_minimo=100) combina os bitmaps com & e | antes de buscar linhas.
+        """
+        try:
+            posicoes = self.data.filtrar_combinado(paises, canceladas, com_cliente,
+                                                   valor_minimo, valor_maximo)
+            return self.data.vendas_nas_posicoes(posicoes)
+        except Exception as e:
+            print(f"Erro no filtro combinado: {e}")
+            return []
+    
+    def relatorio_por_pais(self, pais: str, exato: bool = True) -> Dict[str, Any]:
+        """
+        Gera relatório detalhado por país (leitura do agregado mantido, O(1)).
+
+        Com exato=False, produtos e clientes únicos vêm dos sketches
+        HyperLogLog (erro padrão em 'erro_distintos').
+        """
+        try:
+            # 🗺️ Agregado por país: nada é percorrido, só lido
+            agregado = self.data.agregados_paises.get(pais.casefold())
+            
+            if not agregado:
+                return {'erro': f'Nenhuma venda encontrada para {pais}'}
+            
+            relatorio = self._montar_relatorio_pais(pais, agregado)
+            if not exato:
+                for campo in ('produtos', 'clientes'):
+                    relatorio[f'{campo}_unicos'] = self.data.contar_distintos('pais', pais, campo)
+                relatorio['erro_distintos'] = HyperLogLog(self.data.precisao_hll).erro_padrao
+            return relatorio
+        except Exception as e:
+            print(f"Erro ao gerar relatório por país: {e}")
+            return {'erro': str(e)}
+    
+    def relatorio_todos_paises(self) -> List[Dict[str, Any]]:
+        """
+        Relatório de todos os países, do maior para o menor em receita.
+
+        Uma passada pelos agregados (um por país), sem tocar nas vendas.
+        """
+        try:
+            relatorios = [self._montar_relatorio_pais(agregado['pais'], agregado)
+                          for agregado in self.data.agregados_paises.values()]
+            relatorios.sort(key=itemgetter('receita_total'), reverse=True)
+            return relatorios
+        except Exception as e:
+            print(f"Erro ao gerar relatório de países: {e}")
+            return []
+    
+    def percentis(self, campo: str = 'total', percentis=(50, 90, 99),
+                  pais: Optional[str] = None, exato: bool = False) -> Dict[str, Any]:
+        """
+          Mediana e Percentis (Dados com Cauda Longa)
+        
+        Demonstra:
+        - Por que percentis? Pedidos de atacado enormes e cancelamentos
+          negativos puxam a média; a mediana e o p99 mostram a distribuição
+        - Modo aproximado: sketch KLL mantido na carga (global ou do país),
+          sem ordenar as ~540 mil vendas
+        - Modo exato: ordena os valores das linhas ativas (O(n log n))
+        
+        Args:
+            campo: 'total', 'unit_price' ou 'quantity'
+            percentis: Percentis desejados, de 0 a 100
+            pais: Restringe ao país (None = todas as vendas)
+            exato: True para ordenar os valores de verdade
+            
+        Returns:
+            Dict: {'campo', 'pais', 'linhas', 'minimo', 'maximo',
+                   'percentis': {percentil: valor}, 'exato'}
+        """
+        try:
+            if campo not in CAMPOS_QUANTIS:
+                return {'erro': f'Campo sem percentis: {campo}'}
+            fracoes = [percentil / 100 for percentil in percentis]
+            
+            if exato:
+                # 📋 Valores reais, ordenados: percentil pelo rank mais próximo
+                posicoes = (self.data.posicoes_do_pais(pais) if pais
+                            else self.data._sem_removidas(range(len(self.data.vendas))))
+                valores = sorted(self.data.valores_nas_posicoes(campo, posicoes))
+                if not valores:
+                    return {'erro': 'Nenhuma venda encontrada'}
+                ultimo = len(valores) - 1
+                resultados = [valores[min(max(math.ceil(fracao * len(valores)) - 1, 0), ultimo)]
+                              for fracao in fracoes]
+                linhas, minimo, maximo = len(valores), valores[0], valores[-1]
+            else:
+                # 📐 Sketch KLL: só os ~k itens guardados são consultados
+                if pais:
+                    sketches = self.data.quantis_paises.get(pais.casefold())
+                    if not sketches:
+                        return {'erro': f'Nenhuma venda encontrada para {pais}'}
+                    sketch = sketches[campo]
+                else:
+                    sketch = self.data.quantis[campo]
+                if not len(sketch):
+                    return {'erro': 'Nenhuma venda encontrada'}
+                resultados = sketch.quantis(fracoes)
+                linhas, minimo, maximo = len(sketch), sketch.minimo, sketch.maximo
+            
+            return {
+                'campo': campo,
+                'pais': pais,
+                'linhas': linhas,
+                'minimo': minimo,
+                'maximo': maximo,
+                'percentis': dict(zip(percentis, resultados)),
+                'exato': exato
+            }
+        except Exception as e:
+            print(f"Erro ao calcular percentis: {e}")
+            return {'erro': str(e)}
+    
+    def serie_temporal(self, granularidade: str = 'mes') -> List[Dict[str, Any]]:
         """
-          Algoritmo de Ordenação e Rankings
+          Série Temporal a Partir dos Rollups Materializados
         
         Demonstra:
-        - Função sorted() para ordenação personalizada
-        - Lambda functions para critérios de ordenação
-        - Slicing de listas para limitar resultados
-        - Trabalho com tuplas como retorno
+        - Leitura de agregados já prontos por período (nenhuma venda e
+          nenhum texto de data é percorrido aqui)
+        - Ordenação só das chaves dos períodos ('2010-12' < '2011-01')
+        - Variação percentual em relação ao período anterior
         
         Args:
-            top_n: Quantos produtos incluir no ranking (padrão 10)
+            granularidade: 'dia', 'semana' ou 'mes'
             
         Returns:
-            List[Tuple]: Lista de tuplas (stock_code, dados_produto)
+            List[Dict]: Um dicionário por período, em ordem cronológica
         """
         try:
-            # ================================================================
-            # ALGORITMO DE ORDENAÇÃO PERSONALIZADA
-            # ================================================================
-            
-            # 🔄 SORTED() COM KEY PERSONALIZADA:
-            # - sorted() não modifica o dicionário original
-            # - .items() retorna tuplas (chave, valor)
-            # - lambda x: x[1]['quantidade_total'] define critério
-            # - reverse=True para ordem decrescente (maior primeiro)
+            periodos = self.data.rollups[granularidade]
+            serie = []
+            receita_anterior = None
             
-            produtos_ordenados = sorted(
-                self.data.produtos.items(),  # Lista de tuplas (stock_code, dados)
+            for periodo in sorted(periodos):
+                agregado = periodos[periodo]
+                receita = agregado['receita_total']
                 
-                # 🎯 LAMBDA FUNCTION EXPLICADA:
-                # x = (stock_code, dados_produto)
-                # x[0] = stock_code (string)
-                # x[1] = dados_produto (dicionário)
-                # x[1]['quantidade_total'] = critério de ordenação
-                key=lambda x: x[1]['quantidade_total'],
+                # 📈 Variação: None no primeiro período (ou se o anterior for zero)
+                variacao = ((receita - receita_anterior) / abs(receita_anterior) * 100
+                            if receita_anterior else None)
                 
-                reverse=True  # Decrescente: maior quantidade primeiro
-            )
-            
-            # ================================================================
-            # SLICING PARA LIMITAR RESULTADOS
-            # ================================================================
-            
-            # 🔢 [:top_n] = pega os primeiros top_n elementos
-            # Exemplo: [:5] pega os 5 primeiros
-            # Se lista tem menos elementos, retorna todos
-            
-            return produtos_ordenados[:top_n]
-            
-        except Exception as e:
-            print(f"Erro ao gerar ranking de produtos: {e}")
-            return []  # Lista vazia em caso de erro
-    
-    def ranking_paises_por_vendas(self, top_n: int = 10) -> List[Tuple[str, int]]:
-        """Gera ranking dos países por número de vendas"""
-        try:
-            return self.data.contador_vendas_pais.most_common(top_n)
+                serie.append({
+                    'periodo': periodo,
+                    'receita_total': receita,
+                    'quantidade_total': agregado['quantidade_total'],
+                    'total_vendas': agregado['vendas_total'],
+                    'faturas': len(agregado['faturas']),
+                    'clientes_ativos': len(agregado['clientes']),
+                    'variacao_receita': variacao
+                })
+                receita_anterior = receita
+            
+            return serie
         except Exception as e:
-            print(f"Erro ao gerar ranking de países: {e}")
+            print(f"Erro ao gerar série temporal: {e}")
             return []
     
-    def filtrar_vendas_por_valor(self, valor_minimo: float = 0, valor_maximo: float = float('inf')) -> List[Dict[str, Any]]:
-        """Filtra vendas por faixa de valor"""
+    def agrupar(self, dimensoes, medidas) -> List[Dict[str, Any]]:
+        """
+          Relatório Genérico (GROUP BY)
+        
+        Demonstra:
+        - Um único motor (Agrupamento) no lugar de um laço por relatório
+        - Dimensões: campos das vendas ou 'mes', 'hora' e 'dia_semana'
+        - Medidas: (função, campo) com soma, contagem, media, minimo,
+          maximo e distintos
+        - Se o cubo pré-calculado cobre o pedido, nada é varrido
+        
+        Args:
+            dimensoes: Ex.: ['country', 'mes']
+            medidas: Ex.: [('soma', 'total'), ('distintos', 'customer_id')]
+            
+        Returns:
+            List[Dict]: Uma linha por grupo, com as dimensões e as medidas
+            (nomeadas 'soma_total', 'contagem', 'distintos_customer_id'...)
+        """
         try:
-            return [
-                venda for venda in self.data.vendas 
-                if valor_minimo <= venda['total'] <= valor_maximo
-            ]
+            dimensoes = tuple(dimensoes)
+            medidas = tuple((funcao, campo) for funcao, campo in medidas)
+            resultado = self._do_cubo(dimensoes, medidas)
+            if resultado is None:
+                resultado = self.data.agrupar(dimensoes, medidas)
+            
+            nomes = [funcao if campo is None else f'{funcao}_{campo}' for funcao, campo in medidas]
+            return [{**dict(zip(dimensoes, chave)), **dict(zip(nomes, valores))}
+                    for chave, valores in sorted(resultado.items())]
         except Exception as e:
-            print(f"Erro ao filtrar vendas por valor: {e}")
+            print(f"Erro ao agrupar vendas: {e}")
             return []
     
-    def relatorio_por_pais(self, pais: str) -> Dict[str, Any]:
-        """Gera relatório detalhado por país"""
-        try:
-            vendas_pais = [venda for venda in self.data.vendas if venda['country'].lower() == pais.lower()]
-            
-            if not vendas_pais:
-                return {'erro': f'Nenhuma venda encontrada para {pais}'}
-            
-            receita_total = sum(venda['total'] for venda in vendas_pais)
-            quantidade_total = sum(venda['quantity'] for venda in vendas_pais)
-            
-            produtos_unicos = set(venda['stock_code'] for venda in vendas_pais)
-            clientes_unicos = set(venda['customer_id'] for venda in vendas_pais if venda['customer_id'])
-            
-            return {
-                'pais': pais,
-                'total_vendas': len(vendas_pais),
-                'receita_total': receita_total,
-                'quantidade_total': quantidade_total,
-                'receita_media': receita_total / len(vendas_pais),
-                'produtos_unicos': len(produtos_unicos),
-                'clientes_unicos': len(clientes_unicos)
-            }
-        except Exception as e:
-            print(f"Erro ao gerar relatório por país: {e}")
-            return {'erro': str(e)}
+    def precalcular_cubo(self, dimensoes=DIMENSOES_CUBO_PADRAO, medidas=MEDIDAS_CUBO_PADRAO):
+        """
+        Calcula o cubo (todas as combinações das dimensões) em uma varredura.
+
+        Pedidos de agrupar() sobre essas dimensões e medidas passam a ser
+        uma leitura de dicionário até a próxima alteração dos dados.
+        """
+        agrupamento = Agrupamento(self.data, dimensoes, medidas)
+        self.cubo = agrupamento.cubo()
+        self.dimensoes_cubo = agrupamento.dimensoes
+        self.medidas_cubo = agrupamento.medidas
+        self.versao_cubo = self.data.versao_dados
+        return self.cubo
+    
+    def _do_cubo(self, dimensoes: Tuple[str, ...],
+                 medidas: Tuple[Tuple[str, Optional[str]], ...]) -> Optional[Dict[Tuple[Any, ...], Tuple[Any, ...]]]:
+        """Resultado lido do cubo, ou None se ele não cobre o pedido ou está velho"""
+        if self.cubo is None or self.versao_cubo != self.data.versao_dados:
+            return None
+        if len(set(dimensoes)) != len(dimensoes) or not set(dimensoes) <= set(self.dimensoes_cubo):
+            return None
+        if not set(medidas) <= set(self.medidas_cubo):
+            return None
+        
+        # 🔀 O cubo guarda as dimensões na ordem dele: reordena chaves e medidas
+        ordem_cubo = tuple(dimensao for dimensao in self.dimensoes_cubo if dimensao in dimensoes)
+        posicao_chave = [ordem_cubo.index(dimensao) for dimensao in dimensoes]
+        posicao_medida = [self.medidas_cubo.index(medida) for medida in medidas]
+        return {tuple(chave[i] for i in posicao_chave): tuple(valores[i] for i in posicao_medida)
+                for chave, valores in self.cubo[ordem_cubo].items()}
+    
+    @staticmethod
+    def _montar_relatorio_pais(pais: str, agregado: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte o agregado mantido no dicionário do relatório"""
+        return {
+            'pais': pais,
+            'total_vendas': agregado['vendas_total'],
+            'receita_total': agregado['receita_total'],
+            'quantidade_total': agregado['quantidade_total'],
+            'receita_media': agregado['receita_total'] / agregado['vendas_total'],
+            'produtos_unicos': len(agregado['produtos']),
+            'clientes_unicos': len(agregado['clientes'])
+        }
 
 
 # ============================================================================
@@ -995,7 +5705,10 @@ class ExportadorCSV:
                 # VALIDAÇÃO ANTES DE EXPORTAR
                 # ============================================================
                 
-                if not self.data.vendas:
+                # 🪦 Só as vendas ativas (linhas removidas ficam de fora)
+                vendas = self.data.vendas_ativas()
+                
+                if not vendas:
                     print("Nenhuma venda para exportar")
                     return False
                 
@@ -1007,7 +5720,7 @@ class ExportadorCSV:
                 # - Pega chaves do primeiro dicionário
                 # - Assume que todos têm as mesmas chaves
                 # - Cria colunas automaticamente
-                fieldnames = self.data.vendas[0].keys()
+                fieldnames = vendas[0].keys()
                 
                 # 📊 DICTWRITER:
                 # - Especializado em escrever dicionários como CSV
@@ -1024,7 +5737,7 @@ class ExportadorCSV:
                 
                 # 📝 Escrever todas as linhas de dados
                 # writerows() escreve lista de dicionários de uma vez
-                writer.writerows(self.data.vendas)
+                writer.writerows(vendas)
                 
                 # ============================================================
                 # CONFIRMAÇÃO DE SUCESSO
@@ -1058,15 +5771,23 @@ class ExportadorCSV:
             return False
     
     def exportar_relatorio_paises(self, nome_arquivo: str = 'paises_relatorio.csv') -> bool:
-        """Exporta relatório de países para CSV"""
+        """Exporta relatório de países para CSV (a partir dos agregados por país)"""
         try:
             with open(nome_arquivo, 'w', newline='', encoding='utf-8') as arquivo:
-                fieldnames = ['pais', 'total_vendas']
+                fieldnames = ['pais', 'total_vendas', 'receita_total', 'quantidade_total',
+                              'produtos_unicos', 'clientes_unicos']
                 writer = csv.DictWriter(arquivo, fieldnames=fieldnames)
                 writer.writeheader()
                 
-                for pais, total in self.data.contador_vendas_pais.items():
-                    writer.writerow({'pais': pais, 'total_vendas': total})
+                for agregado in self.data.agregados_paises.values():
+                    writer.writerow({
+                        'pais': agregado['pais'],
+                        'total_vendas': agregado['vendas_total'],
+                        'receita_total': round(agregado['receita_total'], 2),
+                        'quantidade_total': agregado['quantidade_total'],
+                        'produtos_unicos': len(agregado['produtos']),
+                        'clientes_unicos': len(agregado['clientes'])
+                    })
                 
                 print(f"Relatório de países exportado para {nome_arquivo}")
                 return True
@@ -1074,6 +5795,73 @@ class ExportadorCSV:
         except Exception as e:
             print(f"Erro ao exportar relatório de países: {e}")
             return False
+    
+    def exportar_segmentacao_rfm(self, nome_arquivo: str = 'clientes_rfm.csv',
+                                 clientes_rfm: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Exporta a segmentação RFM (um cliente por linha) para CSV.
+
+        Args:
+            clientes_rfm: Resultado de RelatoriosAnalytics.segmentacao_rfm()
+                já calculado (None = calcula agora)
+        """
+        try:
+            if clientes_rfm is None:
+                clientes_rfm = RelatoriosAnalytics(self.data).segmentacao_rfm()
+            
+            with open(nome_arquivo, 'w', newline='', encoding='utf-8') as arquivo:
+                fieldnames = ['customer_id', 'pais', 'ultima_compra', 'recencia_dias', 'frequencia',
+                              'monetario', 'r', 'f', 'm', 'rfm', 'segmento']
+                writer = csv.DictWriter(arquivo, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(clientes_rfm)
+                
+                print(f"Segmentação RFM exportada para {nome_arquivo}")
+                return True
+                
+        except Exception as e:
+            print(f"Erro ao exportar segmentação RFM: {e}")
+            return False
+    
+    def exportar_regras_associacao(self, nome_arquivo: str = 'regras_associacao.csv',
+                                   regras: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Exporta as regras de associação (uma por linha) para CSV.
+
+        Itens de um lado da regra ficam juntos, separados por ' + '.
+
+        Args:
+            regras: Resultado de RelatoriosAnalytics.regras_de_associacao()
+                já calculado (None = minera agora com os padrões)
+        """
+        try:
+            if regras is None:
+                regras = RelatoriosAnalytics(self.data).regras_de_associacao()
+            
+            with open(nome_arquivo, 'w', newline='', encoding='utf-8') as arquivo:
+                fieldnames = ['antecedente', 'consequente', 'descricao_antecedente',
+                              'descricao_consequente', 'faturas', 'suporte', 'confianca', 'lift']
+                writer = csv.DictWriter(arquivo, fieldnames=fieldnames)
+                writer.writeheader()
+                
+                for regra in regras:
+                    writer.writerow({
+                        'antecedente': ' + '.join(regra['antecedente']),
+                        'consequente': ' + '.join(regra['consequente']),
+                        'descricao_antecedente': ' + '.join(regra['descricao_antecedente']),
+                        'descricao_consequente': ' + '.join(regra['descricao_consequente']),
+                        'faturas': regra['faturas'],
+                        'suporte': round(regra['suporte'], 4),
+                        'confianca': round(regra['confianca'], 4),
+                        'lift': round(regra['lift'], 2)
+                    })
+                
+                print(f"Regras de associação exportadas para {nome_arquivo}")
+                return True
+                
+        except Exception as e:
+            print(f"Erro ao exportar regras de associação: {e}")
+            return False
 
 
 # ============================================================================
@@ -1128,7 +5916,9 @@ class EcommerceSystem:
         # ================================================================
         
         # 📁 ESTRUTURA DE DADOS (componente central)
-        self.data_structure = DataStructure()
+        # - Armazenamento colunar: o dataset completo (~540 mil linhas)
+        #   ocupa uma fração da memória de uma lista de dicionários
+        self.data_structure = DataStructure(armazenamento_colunar=True, remocao_logica=True)
         
         # 🔧 INJEÇÃO DE DEPENDÊNCIA:
         # - Todas as classes recebem a mesma instância de DataStructure
@@ -1154,7 +5944,7 @@ class EcommerceSystem:
         # - Evita erros e confusão
         self.dataset_carregado = False
     
-    def carregar_dataset_kaggle(self) -> bool:
+    def carregar_dataset_kaggle(self, processos: Optional[int] = None) -> bool:
         """
           Integração com APIs Externas e Processamento de Dados
         
@@ -1163,8 +5953,13 @@ class EcommerceSystem:
         - Manipulação de caminhos de arquivos
         - Leitura de CSV com DictReader
         - Processamento em lote com feedback
+        - Processamento paralelo em vários processos
         - Tratamento de diferentes tipos de erro
         
+        Args:
+            processos: Número de processos (padrão: núcleos da máquina;
+                1 força o carregamento sequencial)
+        
         Returns:
             bool: True se carregou com sucesso
         """
@@ -1206,6 +6001,19 @@ class EcommerceSystem:
             
             print(f"📊 Carregando dados de: {caminho_csv}")
             
+            # ================================================================
+            # SNAPSHOT EM CACHE - CSV JÁ PROCESSADO ANTES?
+            # ================================================================
+            
+            # ⚡ Se o CSV não mudou, lemos o snapshot binário em bloco
+            # em vez de converter centenas de milhares de linhas
+            estrutura_vazia = not self.data_structure.vendas
+            if estrutura_vazia and self.data_structure.restaurar_snapshot(caminho_csv):
+                print("⚡ Dados restaurados do snapshot em cache (CSV inalterado)")
+                print(f"   📈 Total de vendas: {self.data_structure.quantidade_vendas()}")
+                self.dataset_carregado = True
+                return True
+            
             # ================================================================
             # ABERTURA DO ARQUIVO CSV COM ENCODING LATIN-1
             # ================================================================
@@ -1225,11 +6033,12 @@ class EcommerceSystem:
             # ================================================================
             
             try:
-                leitor_csv = csv.DictReader(arquivo_csv)
+                leitor_csv = csv.reader(arquivo_csv)
+                colunas = next(leitor_csv, [])
                 
                 # 📋 MOSTRAR ESTRUTURA DOS DADOS
                 print("📋 Colunas encontradas:")
-                for coluna in leitor_csv.fieldnames:
+                for coluna in colunas:
                     print(f"   - {coluna}")
                 
                 # ============================================================
@@ -1241,35 +6050,38 @@ class EcommerceSystem:
                 registros_com_erro = 0
                 registros_encoding_erro = 0  # Novo contador para erros de encoding
                 
-                # 🔄 PROCESSAMENTO LINHA POR LINHA COM TRATAMENTO DE ERRO:
-                for numero_linha, registro in enumerate(leitor_csv, start=2):  # start=2 (cabeçalho = linha 1)
-                    try:
-                        # Tentar adicionar cada registro
-                        if self.data_structure.adicionar_venda(registro):
-                            registros_carregados += 1
-                        else:
+                # ⚡ ARQUIVO GRANDE + VÁRIOS NÚCLEOS: carregamento paralelo
+                if self._usar_carregamento_paralelo(caminho_csv, processos):
+                    registros_carregados, registros_com_erro, registros_encoding_erro = \
+                        self._carregar_csv_paralelo(caminho_csv, colunas, processos)
+                else:
+                    # 🔄 INSERÇÃO EM LOTE, EM BLOCOS DE 50.000 LINHAS:
+                    # - adicionar_vendas converte e agrega o bloco inteiro de uma vez
+                    # - Blocos limitam a memória e permitem mostrar o progresso
+                    # - Linhas em branco são ignoradas (como no csv.DictReader)
+                    linhas = (linha for linha in leitor_csv if linha)
+                    numero_linha = 2  # Cabeçalho = linha 1
+                    
+                    while True:
+                        bloco = list(islice(linhas, 50000))
+                        if not bloco:
+                            break
+                        
+                        lote = self.data_structure.adicionar_vendas(
+                            bloco, colunas, numero_inicial=numero_linha, somente_texto=True
+                        )
+                        numero_linha += len(bloco)
+                        registros_carregados += len(lote['aceitas'])
+                        
+                        # 🚨 LINHAS REJEITADAS: contar todas, mostrar as 5 primeiras
+                        for numero, motivo in lote['rejeitadas']:
                             registros_com_erro += 1
-                            
-                    except UnicodeDecodeError as e:
-                        # 🚨 ERRO DE ENCODING EM LINHA ESPECÍFICA:
-                        # - Alguns caracteres podem ainda causar problemas
-                        # - Registra erro mas continua processamento
-                        registros_encoding_erro += 1
-                        print(f"⚠️ Erro de encoding na linha {numero_linha}: {e}")
-                        continue
+                            if registros_com_erro <= 5:
+                                print(f"⚠️ Erro na linha {numero}: {motivo}")
                         
-                    except Exception as e:
-                        # 🚨 OUTROS ERROS DE PROCESSAMENTO:
-                        registros_com_erro += 1
-                        if registros_com_erro <= 5:  # Mostrar apenas primeiros 5 erros
-                            print(f"⚠️ Erro na linha {numero_linha}: {e}")
-                        continue
-                    
-                    # 📈 FEEDBACK DE PROGRESSO:
-                    # - A cada 50.000 registros, mostra progresso
-                    # - Usuário sabe que sistema não travou
-                    # - Útil para datasets grandes
-                    if registros_carregados % 50000 == 0 and registros_carregados > 0:
+                        # 📈 FEEDBACK DE PROGRESSO:
+                        # - Usuário sabe que sistema não travou
+                        # - Útil para datasets grandes
                         print(f"   ✅ {registros_carregados} registros carregados...")
                 
                 # ============================================================
@@ -1297,6 +6109,10 @@ class EcommerceSystem:
                 # ATUALIZAR ESTADO DO SISTEMA
                 # ============================================================
                 
+                # 💾 Snapshot para a próxima execução (só de uma carga completa)
+                if estrutura_vazia and self.data_structure.salvar_snapshot(caminho_csv):
+                    print("   💾 Snapshot salvo para inicialização rápida")
+                
                 self.dataset_carregado = True
                 return True
                 
@@ -1327,6 +6143,86 @@ class EcommerceSystem:
             print(f"❌ Erro ao carregar dataset: {e}")
             return False
     
+    def restaurar_ultimo_snapshot(self) -> bool:
+        """
+          Inicialização Rápida pelo Snapshot
+
+        Usa a origem gravada no cabeçalho do snapshot, sem consultar o
+        Kaggle. Se o CSV de origem sumiu ou mudou, nada é restaurado e o
+        usuário carrega o dataset normalmente pelo menu.
+
+        Returns:
+            bool: True se os dados foram restaurados
+        """
+        cabecalho = ler_cabecalho_snapshot()
+        if not cabecalho or not os.path.exists(cabecalho['origem']):
+            return False
+
+        if self.data_structure.restaurar_snapshot(cabecalho['origem']):
+            self.dataset_carregado = True
+            print(f"⚡ Dataset restaurado do cache: {self.data_structure.quantidade_vendas():,} vendas")
+            return True
+        return False
+
+    def _usar_carregamento_paralelo(self, caminho_csv: str, processos: Optional[int]) -> bool:
+        """Decide se vale a pena dividir o arquivo entre processos"""
+        processos = processos or os.cpu_count() or 1
+        return processos > 1 and os.path.getsize(caminho_csv) >= TAMANHO_MINIMO_PARALELO
+
+    def _carregar_csv_paralelo(self, caminho_csv: str, colunas: List[str],
+                               processos: Optional[int]) -> Tuple[int, int, int]:
+        """
+          Carregamento Paralelo com Processos
+
+        Demonstra:
+        - Divisão do arquivo em faixas de bytes (uma por processo)
+        - ProcessPoolExecutor para usar todos os núcleos da CPU
+        - Junção dos resultados parciais na ordem original do arquivo
+        - Processos só convertem e agregam; os índices são montados uma
+          única vez no final, sobre todas as linhas
+
+        Returns:
+            Tuple[int, int, int]: (carregados, com erro, erro de encoding)
+        """
+        processos = processos or os.cpu_count() or 1
+        fatias = dividir_csv_em_fatias(caminho_csv, processos)
+        colunar = isinstance(self.data_structure.vendas, ArmazenamentoColunar)
+        print(f"⚡ Carregamento paralelo: {len(fatias)} fatias em {processos} processos")
+
+        registros_carregados = 0
+        registros_com_erro = 0
+        erros_exibidos = 0
+        registros_anteriores = 0  # Para converter número local em número de linha
+
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = [
+                executor.submit(_carregar_fatia_csv, caminho_csv, inicio, fim, colunas, colunar)
+                for inicio, fim in fatias
+            ]
+
+            # 🔄 Juntar NA ORDEM das fatias (mesma ordem do arquivo)
+            for futuro in futuros:
+                parcial = futuro.result()
+                self.data_structure.mesclar(parcial['dados'], indexar=False)
+
+                for numero, mensagem in parcial['erros']:
+                    numero_linha = registros_anteriores + numero + 2  # cabeçalho = linha 1
+                    if erros_exibidos < 5:  # Mostrar apenas primeiros 5 erros
+                        erros_exibidos += 1
+                        print(f"⚠️ Erro na linha {numero_linha}: {mensagem}")
+
+                registros_anteriores += parcial['registros']
+                registros_carregados += parcial['carregados']
+                registros_com_erro += parcial['com_erro']
+                print(f"   ✅ {registros_carregados} registros carregados...")
+
+        print("   🔑 Montando índices...")
+        self.data_structure.indexar_pendentes()
+
+        # 🔤 A fatia é decodificada inteira em latin-1, que aceita qualquer
+        # byte: não existem erros de encoding por linha neste caminho
+        return registros_carregados, registros_com_erro, 0
+
     def mostrar_menu_principal(self):
         """Mostra o menu principal do sistema"""
         print("\n" + "="*60)
@@ -1404,6 +6300,15 @@ class EcommerceSystem:
             if venda:
                 print("\n✅ Venda encontrada:")
                 self._exibir_venda(venda)
+                
+                # 🧾 Fatura com vários itens: oferecer as demais linhas
+                linhas = self.crud.buscar_vendas_por_invoice(invoice_no)
+                if len(linhas) > 1:
+                    ver_todas = input(f"\n📄 A fatura tem {len(linhas)} itens. Mostrar todos? (s/N): ").lower()
+                    if ver_todas == 's':
+                        for i, item in enumerate(linhas, 1):
+                            print(f"{i:3d}. 📦 {item['stock_code']} | {item['description'][:30]} | "
+                                  f"Qtd: {item['quantity']} | Total: R$ {item['total']:.2f}")
             else:
                 print("❌ Venda não encontrada!")
                 
@@ -1438,7 +6343,9 @@ class EcommerceSystem:
             if nova_desc.strip():
                 novos_dados['description'] = nova_desc
             
-            if novos_dados and self.crud.atualizar_venda(invoice_no, novos_dados):
+            todas_linhas = self._perguntar_todas_linhas(invoice_no, "atualizar")
+            
+            if novos_dados and self.crud.atualizar_venda(invoice_no, novos_dados, todas_linhas):
                 print("✅ Venda atualizada com sucesso!")
             else:
                 print("❌ Nenhuma alteração realizada!")
@@ -1459,9 +6366,11 @@ class EcommerceSystem:
             print("\n🗑️ Venda a ser deletada:")
             self._exibir_venda(venda)
             
+            todas_linhas = self._perguntar_todas_linhas(invoice_no, "deletar")
+            
             confirmacao = input("\n⚠️ Confirma a exclusão? (s/N): ").lower()
             if confirmacao == 's':
-                if self.crud.deletar_venda(invoice_no):
+                if self.crud.deletar_venda(invoice_no, todas_linhas):
                     print("✅ Venda deletada com sucesso!")
                 else:
                     print("❌ Erro ao deletar venda!")
@@ -1471,31 +6380,40 @@ class EcommerceSystem:
         except Exception as e:
             print(f"❌ Erro: {e}")
     
+    def _perguntar_todas_linhas(self, invoice_no: str, acao: str) -> bool:
+        """Pergunta se a ação vale para todas as linhas de uma fatura com vários itens"""
+        quantidade = len(self.data_structure.posicoes_da_fatura(invoice_no))
+        if quantidade <= 1:
+            return False
+        resposta = input(f"🧾 A fatura tem {quantidade} itens. {acao.capitalize()} todos? (s/N): ").lower()
+        return resposta == 's'
+    
     def _listar_vendas(self):
         """Interface para listar vendas"""
         try:
-            vendas = self.crud.listar_todas_vendas()
+            total_vendas = self.data_structure.quantidade_vendas()
             
-            if not vendas:
+            if not total_vendas:
                 print("❌ Nenhuma venda encontrada!")
                 return
             
-            print(f"\n📋 Total de vendas: {len(vendas)}")
+            print(f"\n📋 Total de vendas: {total_vendas}")
             
             # Opção de paginação
             pagina = 0
             itens_por_pagina = 10
+            cursor = None
             
             while True:
                 inicio = pagina * itens_por_pagina
-                fim = inicio + itens_por_pagina
-                vendas_pagina = vendas[inicio:fim]
+                # 📄 Cursor: a próxima página continua da última venda exibida
+                vendas_pagina, cursor = self.crud.paginar_vendas(itens_por_pagina, cursor)
                 
                 if not vendas_pagina:
                     print("❌ Fim da lista!")
                     break
                 
-                print(f"\n📄 Página {pagina + 1} (itens {inicio + 1}-{min(fim, len(vendas))} de {len(vendas)}):")
+                print(f"\n📄 Página {pagina + 1} (itens {inicio + 1}-{inicio + len(vendas_pagina)} de {total_vendas}):")
                 print("-" * 80)
                 
                 for venda in vendas_pagina:
@@ -1503,7 +6421,7 @@ class EcommerceSystem:
                           f"{venda['description'][:30]}... | Qtd: {venda['quantity']} | "
                           f"Total: R$ {venda['total']:.2f}")
                 
-                if fim >= len(vendas):
+                if cursor is None:
                     break
                 
                 continuar = input("\n➡️ Próxima página? (s/N): ").lower()
@@ -1539,6 +6457,12 @@ class EcommerceSystem:
             print("3. 🌍 Ranking Países por Vendas")
             print("4. 💰 Filtrar por Faixa de Valor")
             print("5. 🇧🇷 Relatório por País")
+            print("6. 👥 Ranking Clientes")
+            print("7. 📅 Série Temporal (dia, semana, mês)")
+            print("8. 🧮 Agrupamento Personalizado")
+            print("9. 📐 Percentis (mediana, p90, p99)")
+            print("10. 🎯 Segmentação RFM de Clientes")
+            print("11. 🛒 Produtos Comprados Juntos (regras de associação)")
             print("0. ⬅️ Voltar")
             print("-"*40)
             
@@ -1554,6 +6478,18 @@ class EcommerceSystem:
                 self._filtrar_por_valor()
             elif opcao == '5':
                 self._relatorio_por_pais()
+            elif opcao == '6':
+                self._mostrar_ranking_clientes()
+            elif opcao == '7':
+                self._mostrar_serie_temporal()
+            elif opcao == '8':
+                self._mostrar_agrupamento()
+            elif opcao == '9':
+                self._mostrar_percentis()
+            elif opcao == '10':
+                self._mostrar_segmentacao_rfm()
+            elif opcao == '11':
+                self._mostrar_regras_associacao()
             elif opcao == '0':
                 break
             else:
@@ -1592,19 +6528,28 @@ class EcommerceSystem:
                 return
             
             top_n = int(input("Quantos produtos mostrar (padrão 10): ") or "10")
-            ranking = self.relatorios.ranking_produtos_mais_vendidos(top_n)
+            print("Ordenar por: 1. Quantidade  2. Receita  3. Nº de vendas")
+            opcao = input("Critério (padrão 1): ").strip() or '1'
+            criterio, titulo = {
+                '1': ('quantidade_total', 'MAIS VENDIDOS'),
+                '2': ('receita_total', 'POR RECEITA'),
+                '3': ('vendas_total', 'POR Nº DE VENDAS')
+            }.get(opcao, ('quantidade_total', 'MAIS VENDIDOS'))
+            ranking = self.relatorios.ranking_produtos_mais_vendidos(top_n, criterio)
             
             if not ranking:
                 print("❌ Nenhum produto encontrado!")
                 return
             
-            print(f"\n🏆 TOP {top_n} PRODUTOS MAIS VENDIDOS")
+            print(f"\n🏆 TOP {top_n} PRODUTOS {titulo}")
             print("=" * 80)
             
             for i, (stock_code, dados) in enumerate(ranking, 1):
                 print(f"{i:2d}. 📦 {stock_code}")
                 print(f"     📝 {dados['description'][:50]}...")
                 print(f"     📊 Qtd Vendida: {dados['quantidade_total']:,}")
+                if 'quantidade_estimada' in dados:
+                    print(f"     🔥 Qtd Estimada: {dados['quantidade_estimada']:,.0f}")
                 print(f"     💰 Receita: R$ {dados['receita_total']:,.2f}")
                 print(f"     🛒 Nº Vendas: {dados['vendas_total']:,}")
                 print("-" * 80)
@@ -1637,6 +6582,212 @@ class EcommerceSystem:
         except Exception as e:
             print(f"❌ Erro: {e}")
     
+    def _mostrar_ranking_clientes(self):
+        """Mostra ranking dos clientes que mais gastaram"""
+        try:
+            if not self.dataset_carregado:
+                print("❌ Carregue o dataset primeiro!")
+                return
+            
+            top_n = int(input("Quantos clientes mostrar (padrão 10): ") or "10")
+            print("Ordenar por: 1. Gasto  2. Quantidade  3. Nº de compras")
+            opcao = input("Critério (padrão 1): ").strip() or '1'
+            criterio = {'1': 'gasto_total', '2': 'quantidade_total',
+                        '3': 'compras_total'}.get(opcao, 'gasto_total')
+            ranking = self.relatorios.ranking_clientes(top_n, criterio)
+            
+            if not ranking:
+                print("❌ Nenhum cliente encontrado!")
+                return
+            
+            print(f"\n👥 TOP {top_n} CLIENTES")
+            print("=" * 70)
+            
+            for i, (customer_id, dados) in enumerate(ranking, 1):
+                print(f"{i:2d}. 👤 {customer_id} | {dados['pais']:<15} | "
+                      f"🛒 {dados['compras_total']:,} | 📊 {dados['quantidade_total']:,} | "
+                      f"💰 R$ {dados['gasto_total']:,.2f}"
+                      + (f" | 🔥 ~R$ {dados['gasto_estimado']:,.2f}" if 'gasto_estimado' in dados else ""))
+            
+            print("=" * 70)
+                
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+    
+    def _mostrar_serie_temporal(self):
+        """Mostra receita, faturas e clientes ativos por período"""
+        try:
+            if not self.dataset_carregado:
+                print("❌ Carregue o dataset primeiro!")
+                return
+            
+            print("Granularidade: 1. Dia  2. Semana  3. Mês")
+            opcao = input("Escolha (padrão 3): ").strip() or '3'
+            granularidade = {'1': 'dia', '2': 'semana', '3': 'mes'}.get(opcao, 'mes')
+            serie = self.relatorios.serie_temporal(granularidade)
+            
+            if not serie:
+                print("❌ Nenhuma venda com data válida!")
+                return
+            
+            print(f"\n📅 SÉRIE TEMPORAL POR {granularidade.upper()} ({len(serie)} períodos)")
+            print("=" * 88)
+            print(f"{'Período':<12} | {'Receita (R$)':>14} | {'Variação':>9} | {'Qtd':>9} | "
+                  f"{'Faturas':>7} | {'Clientes':>8}")
+            print("-" * 88)
+            for ponto in serie:
+                variacao = ponto['variacao_receita']
+                texto_variacao = f"{variacao:+.1f}%" if variacao is not None else '-'
+                print(f"{ponto['periodo']:<12} | {ponto['receita_total']:>14,.2f} | {texto_variacao:>9} | "
+                      f"{ponto['quantidade_total']:>9,} | {ponto['faturas']:>7,} | {ponto['clientes_ativos']:>8,}")
+            print("=" * 88)
+                
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+    
+    def _mostrar_agrupamento(self):
+        """Agrupa as vendas pelas dimensões escolhidas (maiores receitas primeiro)"""
+        try:
+            if not self.dataset_carregado:
+                print("❌ Carregue o dataset primeiro!")
+                return
+            
+            print("Dimensões: country, stock_code, customer_id, mes, hora, dia_semana")
+            texto = input("Agrupar por (separadas por vírgula, padrão country): ").strip() or 'country'
+            dimensoes = [dimensao.strip() for dimensao in texto.split(',') if dimensao.strip()]
+            medidas = [('soma', 'total'), ('soma', 'quantity'), ('contagem', None),
+                       ('distintos', 'customer_id')]
+            
+            # 🧊 Dimensões comuns: o cubo é calculado uma vez e reaproveitado
+            if (set(dimensoes) <= set(DIMENSOES_CUBO_PADRAO) and
+                    self.relatorios.versao_cubo != self.data_structure.versao_dados):
+                self.relatorios.precalcular_cubo()
+            
+            linhas = self.relatorios.agrupar(dimensoes, medidas)
+            if not linhas:
+                print("❌ Nenhum grupo encontrado!")
+                return
+            
+            linhas.sort(key=itemgetter('soma_total'), reverse=True)
+            print(f"\n🧮 AGRUPAMENTO POR {', '.join(dimensoes).upper()} ({len(linhas)} grupos, top 20)")
+            print("=" * 90)
+            for linha in linhas[:20]:
+                chave = ' / '.join(str(linha[dimensao]) for dimensao in dimensoes)
+                print(f"{chave[:36]:<36} | R$ {linha['soma_total']:>13,.2f} | "
+                      f"Qtd {linha['soma_quantity']:>9,} | {linha['contagem']:>7,} linhas | "
+                      f"{linha['distintos_customer_id']:>5,} clientes")
+            print("=" * 90)
+                
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+    
+    def _mostrar_percentis(self):
+        """Mostra mediana e percentis de total, preço ou quantidade"""
+        try:
+            if not self.dataset_carregado:
+                print("❌ Carregue o dataset primeiro!")
+                return
+            
+            print("Campo: 1. Total da venda  2. Preço unitário  3. Quantidade")
+            opcao = input("Escolha (padrão 1): ").strip() or '1'
+            campo = {'1': 'total', '2': 'unit_price', '3': 'quantity'}.get(opcao, 'total')
+            pais = input("País (Enter = todos): ").strip() or None
+            texto = input("Percentis (padrão 1,5,25,50,75,90,95,99): ").strip()
+            percentis = ([float(parte) for parte in texto.split(',')] if texto
+                         else [1, 5, 25, 50, 75, 90, 95, 99])
+            exato = input("Cálculo exato (ordena todos os valores)? (s/N): ").strip().lower() == 's'
+            
+            resultado = self.relatorios.percentis(campo, percentis, pais, exato)
+            if 'erro' in resultado:
+                print(f"❌ {resultado['erro']}")
+                return
+            
+            modo = "exato" if exato else "aproximado (sketch KLL)"
+            print(f"\n📐 PERCENTIS DE {campo.upper()} - {(pais or 'todos os países').upper()} ({modo})")
+            print("=" * 50)
+            print(f"🔢 Linhas: {resultado['linhas']:,}")
+            print(f"⬇️ Mínimo: {resultado['minimo']:,.2f}")
+            for percentil, valor in resultado['percentis'].items():
+                rotulo = 'Mediana' if percentil == 50 else f'p{percentil:g}'
+                print(f"   {rotulo:<8} {valor:>14,.2f}")
+            print(f"⬆️ Máximo: {resultado['maximo']:,.2f}")
+            print("=" * 50)
+                
+        except ValueError:
+            print("❌ Percentis inválidos! Use números separados por vírgula.")
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+    
+    def _mostrar_segmentacao_rfm(self):
+        """Mostra os segmentos RFM dos clientes e oferece a exportação"""
+        try:
+            if not self.dataset_carregado:
+                print("❌ Carregue o dataset primeiro!")
+                return
+            
+            clientes_rfm = self.relatorios.segmentacao_rfm()
+            if not clientes_rfm:
+                print("❌ Nenhum cliente com compras encontrado!")
+                return
+            
+            print(f"\n🎯 SEGMENTAÇÃO RFM - {len(clientes_rfm):,} CLIENTES")
+            print("=" * 90)
+            print(f"{'Segmento':<22} {'Clientes':>9} {'%':>6} {'Recência':>10} "
+                  f"{'Frequência':>11} {'Gasto médio':>13} {'Receita':>14}")
+            print("-" * 90)
+            for segmento, dados in self.relatorios.resumo_rfm(clientes_rfm).items():
+                recencia = f"{dados['recencia_media']:.0f} d" if dados['recencia_media'] is not None else '-'
+                print(f"{segmento:<22} {dados['clientes']:>9,} {dados['percentual']:>5.1f}% {recencia:>10} "
+                      f"{dados['frequencia_media']:>11.1f} {dados['monetario_medio']:>13,.2f} "
+                      f"{dados['receita']:>14,.2f}")
+            print("=" * 90)
+            
+            if input("Exportar clientes para CSV? (s/N): ").strip().lower() == 's':
+                nome_arquivo = input("Nome do arquivo (clientes_rfm.csv): ") or "clientes_rfm.csv"
+                self.exportador.exportar_segmentacao_rfm(nome_arquivo, clientes_rfm)
+                
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+    
+    def _mostrar_regras_associacao(self):
+        """Mostra as regras de associação entre produtos das mesmas faturas"""
+        try:
+            if not self.dataset_carregado:
+                print("❌ Carregue o dataset primeiro!")
+                return
+            
+            suporte = float(input(f"Suporte mínimo em % das faturas (padrão {SUPORTE_MINIMO_PADRAO:.0%}): ")
+                            or SUPORTE_MINIMO_PADRAO * 100) / 100
+            confianca = float(input(f"Confiança mínima em % (padrão {CONFIANCA_MINIMA_PADRAO:.0%}): ")
+                              or CONFIANCA_MINIMA_PADRAO * 100) / 100
+            top_n = int(input("Quantas regras mostrar (padrão 10): ") or "10")
+            regras = self.relatorios.regras_de_associacao(suporte, confianca)
+            
+            if not regras:
+                print("❌ Nenhuma regra encontrada! Tente um suporte ou confiança menor.")
+                return
+            
+            print(f"\n🛒 TOP {min(top_n, len(regras))} DE {len(regras):,} REGRAS (por lift)")
+            print("=" * 80)
+            for i, regra in enumerate(regras[:top_n], 1):
+                print(f"{i:2d}. {' + '.join(regra['antecedente'])} ➡️ {' + '.join(regra['consequente'])}")
+                for descricao in regra['descricao_antecedente']:
+                    print(f"     📦 {descricao[:60]}")
+                for descricao in regra['descricao_consequente']:
+                    print(f"     ➡️ {descricao[:60]}")
+                print(f"     🧾 {regra['faturas']:,} faturas | suporte {regra['suporte']:.2%} | "
+                      f"confiança {regra['confianca']:.0%} | lift {regra['lift']:.1f}")
+                print("-" * 80)
+            
+            if input("Exportar todas as regras para CSV? (s/N): ").strip().lower() == 's':
+                nome_arquivo = input("Nome do arquivo (regras_associacao.csv): ") or "regras_associacao.csv"
+                self.exportador.exportar_regras_associacao(nome_arquivo, regras)
+                
+        except ValueError:
+            print("❌ Valor inválido! Digite apenas números.")
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+    
     def _filtrar_por_valor(self):
         """Filtra vendas por faixa de valor"""
         try:
@@ -1647,29 +6798,34 @@ class EcommerceSystem:
             valor_min = float(input("Valor mínimo (0): ") or "0")
             valor_max = float(input("Valor máximo (sem limite): ") or "inf")
             
-            vendas_filtradas = self.relatorios.filtrar_vendas_por_valor(valor_min, valor_max)
+            # 📊 Contagem e soma saem direto do índice ordenado
+            resumo = self.relatorios.resumo_vendas_por_valor(valor_min, valor_max)
             
-            if not vendas_filtradas:
+            if not resumo['total_vendas']:
                 print("❌ Nenhuma venda encontrada nesta faixa!")
                 return
             
             print(f"\n💰 VENDAS ENTRE R$ {valor_min:.2f} E R$ {valor_max:.2f}")
             print("=" * 80)
-            print(f"📊 Total encontrado: {len(vendas_filtradas)} vendas")
+            print(f"📊 Total encontrado: {resumo['total_vendas']} vendas")
             
-            receita_total = sum(venda['total'] for venda in vendas_filtradas)
+            receita_total = resumo['receita_total']
             print(f"💰 Receita Total: R$ {receita_total:,.2f}")
-            print(f"📈 Receita Média: R$ {receita_total / len(vendas_filtradas):.2f}")
+            print(f"📈 Receita Média: R$ {receita_total / resumo['total_vendas']:.2f}")
             
             # Mostrar algumas vendas
             mostrar_detalhes = input("\n🔍 Mostrar vendas detalhadas? (s/N): ").lower()
             if mostrar_detalhes == 's':
-                for i, venda in enumerate(vendas_filtradas[:20]):  # Máximo 20
+                # 🔎 Só as 20 primeiras linhas da faixa são lidas
+                vendas_filtradas = (self.crud.consultar()
+                                    .onde('total', 'entre', (valor_min, valor_max))
+                                    .limite(20))
+                for i, venda in enumerate(vendas_filtradas):
                     print(f"\n{i+1}. 🧾 {venda['invoice_no']} | {venda['stock_code']} | "
                           f"Total: R$ {venda['total']:.2f}")
                 
-                if len(vendas_filtradas) > 20:
-                    print(f"\n... e mais {len(vendas_filtradas) - 20} vendas")
+                if resumo['total_vendas'] > 20:
+                    print(f"\n... e mais {resumo['total_vendas'] - 20} vendas")
                 
         except ValueError:
             print("❌ Valor inválido!")
@@ -1683,11 +6839,15 @@ class EcommerceSystem:
                 print("❌ Carregue o dataset primeiro!")
                 return
             
-            pais = input("Digite o nome do país: ").strip()
+            pais = input("Digite o nome do país (ou 'todos'): ").strip()
             if not pais:
                 print("❌ Nome do país é obrigatório!")
                 return
             
+            if pais.casefold() == 'todos':
+                self._relatorio_todos_paises()
+                return
+            
             relatorio = self.relatorios.relatorio_por_pais(pais)
             
             if 'erro' in relatorio:
@@ -1707,6 +6867,23 @@ class EcommerceSystem:
         except Exception as e:
             print(f"❌ Erro: {e}")
     
+    def _relatorio_todos_paises(self):
+        """Mostra o relatório de todos os países em uma tabela"""
+        relatorios = self.relatorios.relatorio_todos_paises()
+        if not relatorios:
+            print("❌ Nenhum país encontrado!")
+            return
+        
+        print(f"\n🌍 RELATÓRIO - TODOS OS PAÍSES ({len(relatorios)})")
+        print("=" * 90)
+        print(f"{'País':<22} | {'Vendas':>8} | {'Receita (R$)':>14} | {'Qtd':>9} | {'Produtos':>8} | {'Clientes':>8}")
+        print("-" * 90)
+        for relatorio in relatorios:
+            print(f"{relatorio['pais'][:22]:<22} | {relatorio['total_vendas']:>8,} | "
+                  f"{relatorio['receita_total']:>14,.2f} | {relatorio['quantidade_total']:>9,} | "
+                  f"{relatorio['produtos_unicos']:>8,} | {relatorio['clientes_unicos']:>8,}")
+        print("=" * 90)
+    
     def menu_exportacao(self):
         """Menu para exportação de dados"""
         while True:
@@ -1716,6 +6893,8 @@ class EcommerceSystem:
             print("1. 📊 Exportar Todas as Vendas")
             print("2. 📦 Exportar Relatório de Produtos")
             print("3. 🌍 Exportar Relatório de Países")
+            print("4. 🎯 Exportar Segmentação RFM de Clientes")
+            print("5. 🛒 Exportar Regras de Associação (cestas)")
             print("0. ⬅️ Voltar")
             print("-"*40)
             
@@ -1730,6 +6909,12 @@ class EcommerceSystem:
             elif opcao == '3':
                 nome_arquivo = input("Nome do arquivo (paises_relatorio.csv): ") or "paises_relatorio.csv"
                 self.exportador.exportar_relatorio_paises(nome_arquivo)
+            elif opcao == '4':
+                nome_arquivo = input("Nome do arquivo (clientes_rfm.csv): ") or "clientes_rfm.csv"
+                self.exportador.exportar_segmentacao_rfm(nome_arquivo)
+            elif opcao == '5':
+                nome_arquivo = input("Nome do arquivo (regras_associacao.csv): ") or "regras_associacao.csv"
+                self.exportador.exportar_regras_associacao(nome_arquivo)
             elif opcao == '0':
                 break
             else:
@@ -1747,6 +6932,7 @@ class EcommerceSystem:
             print("4. 🌍 Lista de Países")
             print("5. 🔍 Buscar por Produto")
             print("6. 🔍 Buscar por País")
+            print("7. 🔎 Buscar por Palavras na Descrição")
             print("0. ⬅️ Voltar")
             print("-"*40)
             
@@ -1764,6 +6950,8 @@ class EcommerceSystem:
                 self._buscar_por_produto()
             elif opcao == '6':
                 self._buscar_por_pais()
+            elif opcao == '7':
+                self._buscar_por_texto()
             elif opcao == '0':
                 break
             else:
@@ -1777,7 +6965,7 @@ class EcommerceSystem:
         
         print("\n📈 ESTATÍSTICAS GERAIS")
         print("=" * 50)
-        print(f"🛒 Total de Vendas: {len(self.data_structure.vendas):,}")
+        print(f"🛒 Total de Vendas: {self.data_structure.quantidade_vendas():,}")
         print(f"📦 Total de Produtos: {len(self.data_structure.produtos):,}")
         print(f"👥 Total de Clientes: {len(self.data_structure.clientes):,}")
         print(f"🌍 Total de Países: {len(self.data_structure.paises):,}")
@@ -1789,14 +6977,13 @@ class EcommerceSystem:
             print("❌ Nenhum produto encontrado!")
             return
         
-        produtos = list(self.data_structure.produtos.items())
         pagina = 0
         itens_por_pagina = 10
+        cursor = None
         
         while True:
-            inicio = pagina * itens_por_pagina
-            fim = inicio + itens_por_pagina
-            produtos_pagina = produtos[inicio:fim]
+            # 📄 Produtos em ordem de código, retomando do último exibido
+            produtos_pagina, cursor = self.crud.paginar_produtos(itens_por_pagina, cursor)
             
             if not produtos_pagina:
                 print("❌ Fim da lista!")
@@ -1812,7 +6999,7 @@ class EcommerceSystem:
                       f"Receita: R$ {dados['receita_total']:.2f}")
                 print("-" * 80)
             
-            if fim >= len(produtos):
+            if cursor is None:
                 break
             
             continuar = input("\n➡️ Próxima página? (s/N): ").lower()
@@ -1848,8 +7035,9 @@ class EcommerceSystem:
         print(f"\n🌍 PAÍSES ({len(self.data_structure.paises)} total)")
         print("-" * 50)
         
-        for pais, vendas in self.data_structure.paises.items():
-            total_vendas = len(vendas)
+        agregados = self.data_structure.agregados_paises
+        for pais in self.data_structure.paises:
+            total_vendas = agregados[pais.casefold()]['vendas_total']
             print(f"🏳️ {pais:<30} | 🛒 {total_vendas:,} vendas")
     
     def _buscar_por_produto(self):
@@ -1860,31 +7048,37 @@ class EcommerceSystem:
                 print("❌ Código do produto é obrigatório!")
                 return
             
-            vendas = self.crud.buscar_vendas_por_produto(stock_code)
-            
-            if not vendas:
-                print("❌ Nenhuma venda encontrada para este produto!")
-                return
-            
-            # Informações do produto
-            if stock_code in self.data_structure.produtos:
-                produto = self.data_structure.produtos[stock_code]
-                print(f"\n📦 PRODUTO: {stock_code}")
-                print(f"📝 Descrição: {produto['description']}")
-                print(f"📊 Total de Vendas: {len(vendas)}")
-                print(f"🔢 Quantidade Total: {produto['quantidade_total']}")
-                print(f"💰 Receita Total: R$ {produto['receita_total']:.2f}")
-                print("-" * 60)
+            if stock_code not in self.data_structure.produtos:
+                # 🔤 Talvez seja (parte de) uma descrição com erro de digitação
+                sugestoes = self.data_structure.sugerir_produtos(stock_code)
+                if not sugestoes:
+                    print("❌ Nenhuma venda encontrada para este produto!")
+                    return
+                stock_code, descricao, _ = sugestoes[0]
+                print(f"🔤 Mostrando o produto mais parecido: {stock_code} - {descricao}")
+                for codigo, outra_descricao, similaridade in sugestoes[1:]:
+                    print(f"   Também parecido: {codigo} - {outra_descricao} ({similaridade:.0%})")
+            
+            # Informações do produto (o total de vendas já está no agregado)
+            produto = self.data_structure.produtos[stock_code]
+            total_vendas = produto['vendas_total']
+            print(f"\n📦 PRODUTO: {stock_code}")
+            print(f"📝 Descrição: {produto['description']}")
+            print(f"📊 Total de Vendas: {total_vendas}")
+            print(f"🔢 Quantidade Total: {produto['quantidade_total']}")
+            print(f"💰 Receita Total: R$ {produto['receita_total']:.2f}")
+            print("-" * 60)
             
-            # Mostrar algumas vendas
-            for i, venda in enumerate(vendas[:10]):  # Máximo 10
+            # Mostrar algumas vendas (a consulta para na 10ª linha)
+            vendas = self.crud.consultar().onde('stock_code', '==', stock_code).limite(10)
+            for i, venda in enumerate(vendas):
                 print(f"{i+1}. 🧾 {venda['invoice_no']} | "
                       f"Qtd: {venda['quantity']} | "
                       f"Total: R$ {venda['total']:.2f} | "
                       f"{venda['country']}")
             
-            if len(vendas) > 10:
-                print(f"\n... e mais {len(vendas) - 10} vendas")
+            if total_vendas > 10:
+                print(f"\n... e mais {total_vendas - 10} vendas")
                 
         except Exception as e:
             print(f"❌ Erro: {e}")
@@ -1897,23 +7091,74 @@ class EcommerceSystem:
                 print("❌ Nome do país é obrigatório!")
                 return
             
-            vendas = self.crud.buscar_vendas_por_pais(pais)
+            agregados = self.data_structure.agregados_paises
+            agregado = agregados.get(pais.casefold())
+            
+            if agregado is None:
+                # 🔤 Nome com erro de digitação? Usa o país mais parecido
+                sugestoes = self.data_structure.sugerir_paises(pais)
+                if not sugestoes:
+                    print("❌ Nenhuma venda encontrada para este país!")
+                    return
+                pais = sugestoes[0][0]
+                print(f"🔤 Você quis dizer: {pais}?")
+                agregado = agregados[pais.casefold()]
+            
+            # Totais do país (já mantidos no agregado, sem somar as linhas)
+            total_vendas = agregado['vendas_total']
+            print(f"\n🌍 VENDAS EM {pais.upper()}")
+            print(f"📊 Total de Vendas: {total_vendas}")
+            print(f"💰 Receita Total: R$ {agregado['receita_total']:,.2f}")
+            print("-" * 60)
+            
+            # Mostrar algumas vendas (a consulta para na 10ª linha)
+            vendas = self.crud.consultar().onde('country', '==', pais).limite(10)
+            for i, venda in enumerate(vendas):
+                print(f"{i+1}. 🧾 {venda['invoice_no']} | "
+                      f"{venda['stock_code']} | "
+                      f"Total: R$ {venda['total']:.2f}")
+            
+            if total_vendas > 10:
+                print(f"\n... e mais {total_vendas - 10} vendas")
+                
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+    
+    def _buscar_por_texto(self):
+        """Busca vendas por palavras da descrição"""
+        try:
+            print("Exemplos: RED HEART  |  HEART OR STAR  |  LANTERN*")
+            consulta = input("Digite as palavras: ").strip()
+            if not consulta:
+                print("❌ Informe ao menos uma palavra!")
+                return
+            
+            vendas = self.crud.buscar_vendas_por_texto(consulta)
             
             if not vendas:
-                print("❌ Nenhuma venda encontrada para este país!")
+                print("❌ Nenhuma venda encontrada para esta busca!")
                 return
             
-            print(f"\n🌍 VENDAS EM {pais.upper()}")
-            print(f"📊 Total de Vendas: {len(vendas)}")
+            produtos = self.crud.buscar_produtos_por_texto(consulta)
+            
+            print(f"\n🔎 RESULTADOS PARA: {consulta}")
+            print(f"📦 Produtos: {len(produtos)} | 🛒 Vendas: {len(vendas)}")
+            print("-" * 60)
+            
+            # Produtos encontrados (máximo 10)
+            for stock_code in produtos[:10]:
+                produto = self.data_structure.produtos.get(stock_code, {})
+                print(f"📦 {stock_code} | {produto.get('description', '')}")
+            
+            if len(produtos) > 10:
+                print(f"... e mais {len(produtos) - 10} produtos")
             
-            receita_total = sum(venda['total'] for venda in vendas)
-            print(f"💰 Receita Total: R$ {receita_total:,.2f}")
             print("-" * 60)
             
             # Mostrar algumas vendas
             for i, venda in enumerate(vendas[:10]):  # Máximo 10
                 print(f"{i+1}. 🧾 {venda['invoice_no']} | "
-                      f"{venda['stock_code']} | "
+                      f"{venda['description']} | "
                       f"Total: R$ {venda['total']:.2f}")
             
             if len(vendas) > 10:
@@ -1940,6 +7185,9 @@ class EcommerceSystem:
         
         print("🎉 Bem-vindo ao Sistema de Análise de E-commerce!")
         
+        # ⚡ Snapshot válido em cache? Menus liberados sem recarregar o CSV
+        self.restaurar_ultimo_snapshot()
+        
         # ================================================================
         # LOOP PRINCIPAL DA APLICAÇÃO
         # ================================================================
@@ -1955,6 +7203,10 @@ class EcommerceSystem:
                 # APRESENTAÇÃO DO MENU E CAPTURA DA OPÇÃO
                 # ============================================================
                 
+                # 🪦 Volta ao menu = momento ocioso: recupera o espaço das
+                # lápides aqui, e não no meio de uma remoção
+                self.data_structure.compactar_se_necessario()
+                
                 self.mostrar_menu_principal()
                 
                 # 📝 INPUT COM LIMPEZA:
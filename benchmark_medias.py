@@ -0,0 +1,91 @@
+"""
+Benchmark - Tela de Médias com Agregados Incrementais
+=====================================================
+Mede o tempo da tela "Médias Gerais" (menu de relatórios) para bases de
+tamanhos diferentes, gerando vendas sintéticas em memória.
+
+🎯 O QUE ESPERAR:
+- Tela de médias: tempo praticamente constante, porque as somas são
+  mantidas em DataStructure.somas a cada inserção, alteração e remoção
+- Recálculo completo (uma passada por coluna, como era antes): cresce
+  linearmente com a quantidade de vendas
+
+Uso:
+    python benchmark_medias.py                 # 10 mil, 100 mil e 500 mil linhas
+    python benchmark_medias.py 1000 50000      # tamanhos escolhidos
+"""
+
+import io
+import sys
+import time
+import random
+from contextlib import redirect_stdout
+from statistics import median
+from typing import Callable, List
+
+from app import EcommerceSystem
+
+# 📏 Tamanhos padrão (o dataset real tem ~540 mil linhas)
+TAMANHOS_PADRAO = (10_000, 100_000, 500_000)
+
+# 🔁 Execuções por medição (o resultado é a mediana)
+REPETICOES = 200
+
+COLUNAS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity',
+           'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+PAISES = ['United Kingdom', 'France', 'Germany', 'EIRE', 'Spain', 'Netherlands']
+
+
+def gerar_linhas(quantidade: int, semente: int = 42) -> List[List[str]]:
+    """Linhas no formato do csv.reader (todas as colunas como texto)"""
+    aleatorio = random.Random(semente)
+    linhas = []
+    for i in range(quantidade):
+        produto = aleatorio.randrange(4000)
+        linhas.append([
+            str(536365 + i // 20),
+            str(20000 + produto),
+            f'PRODUTO {produto}',
+            str(aleatorio.randint(1, 24)),
+            f'{aleatorio.randint(1, 12)}/{aleatorio.randint(1, 28)}/2011 10:00',
+            f'{aleatorio.uniform(0.5, 20):.2f}',
+            str(12000 + aleatorio.randrange(4000)),
+            aleatorio.choice(PAISES)
+        ])
+    return linhas
+
+
+def medir(funcao: Callable[[], object]) -> float:
+    """Mediana do tempo de REPETICOES chamadas, em microssegundos"""
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return median(tempos) * 1_000_000
+
+
+def recalculo_completo(sistema: EcommerceSystem):
+    """O cálculo anterior: uma passada completa por coluna"""
+    vendas = sistema.data_structure.vendas
+    return (sum(vendas.coluna('total')), sum(vendas.coluna('quantity')),
+            sum(vendas.coluna('unit_price')))
+
+
+def executar(tamanhos) -> None:
+    print(f"{'Vendas':>10} | {'Tela de médias (µs)':>20} | {'Recálculo completo (µs)':>24}")
+    print("-" * 62)
+    for tamanho in tamanhos:
+        sistema = EcommerceSystem()
+        sistema.data_structure.adicionar_vendas(gerar_linhas(tamanho), COLUNAS, 2, somente_texto=True)
+        sistema.dataset_carregado = True
+
+        # A tela imprime o resultado: a saída é descartada durante a medição
+        with redirect_stdout(io.StringIO()):
+            tela = medir(sistema._mostrar_medias)
+        recalculo = medir(lambda: recalculo_completo(sistema))
+        print(f"{tamanho:>10,} | {tela:>20.1f} | {recalculo:>24.1f}")
+
+
+if __name__ == "__main__":
+    executar([int(argumento) for argumento in sys.argv[1:]] or TAMANHOS_PADRAO)
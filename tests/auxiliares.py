@@ -0,0 +1,51 @@
+"""
+Auxiliares dos Testes
+=====================
+Vendas sintéticas (com semente fixa) no formato do csv.reader e atalhos
+para montar estruturas e ler as linhas ativas.
+"""
+
+import random
+
+from app import CAMPOS_VENDA, DataStructure
+
+COLUNAS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity',
+           'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+PAISES = ['United Kingdom', 'France', 'FRANCE', 'Germany', 'EIRE', 'Spain', '']
+PALAVRAS = ['RED', 'HEART', 'T-LIGHT', 'HOLDER', 'WHITE', 'METAL', 'LANTERN', 'CAKE', 'BAG']
+
+
+def gerar_linhas(aleatorio: random.Random, quantidade: int, inicio: int = 0):
+    """Linhas no formato do csv.reader, com canceladas, sem cliente e países repetidos"""
+    linhas = []
+    for i in range(inicio, inicio + quantidade):
+        fatura = str(536365 + i // 4)
+        if aleatorio.random() < 0.05:
+            fatura = 'C' + fatura
+        produto = aleatorio.randrange(60)
+        linhas.append([
+            fatura,
+            str(20000 + produto),
+            ' '.join(aleatorio.sample(PALAVRAS, 2 + produto % 3)),
+            str(aleatorio.randint(-3, 24) or 1),
+            f'{aleatorio.randint(1, 12)}/{aleatorio.randint(1, 28)}/2011 '
+            f'{aleatorio.randint(0, 23)}:{aleatorio.randint(0, 59):02d}',
+            f'{aleatorio.uniform(0.1, 20):.2f}',
+            '' if aleatorio.random() < 0.1 else str(12000 + aleatorio.randrange(80)),
+            aleatorio.choice(PAISES)
+        ])
+    return linhas
+
+
+def nova_estrutura(aleatorio: random.Random, quantidade: int, **opcoes) -> DataStructure:
+    data = DataStructure(**opcoes)
+    data.adicionar_vendas(gerar_linhas(aleatorio, quantidade), COLUNAS, 2, somente_texto=True)
+    return data
+
+
+def posicoes_ativas(data: DataStructure):
+    return [posicao for posicao in range(len(data.vendas)) if posicao not in data.removidas]
+
+
+def registro(venda):
+    return tuple(venda[campo] for campo in CAMPOS_VENDA)
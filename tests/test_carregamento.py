@@ -0,0 +1,82 @@
+"""
+Testes - Carregamento Paralelo x Serial
+=======================================
+O mesmo CSV carregado em fatias por vários processos (e mesclado no
+processo principal) tem que resultar nas mesmas linhas, agregados,
+rankings e sketches da carga serial em um único lote.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import csv
+import io
+import os
+import random
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from app import DataStructure, EcommerceSystem, RelatoriosAnalytics
+from auxiliares import COLUNAS, gerar_linhas, registro
+
+
+class TesteCarregamentoParalelo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.diretorio = tempfile.TemporaryDirectory()
+        cls.caminho = os.path.join(cls.diretorio.name, 'vendas.csv')
+        linhas = gerar_linhas(random.Random(31), 6000)
+        linhas[1234][3] = 'muitas'  # Linha inválida: rejeitada nas duas cargas
+        with open(cls.caminho, 'w', newline='', encoding='latin-1') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(COLUNAS)
+            escritor.writerows(linhas)
+
+        with redirect_stdout(io.StringIO()):
+            cls.serial = DataStructure(armazenamento_colunar=True)
+            cls.serial.adicionar_vendas(linhas, COLUNAS, 2, somente_texto=True)
+
+            sistema = EcommerceSystem()
+            cls.resultado = sistema._carregar_csv_paralelo(cls.caminho, COLUNAS, 3)
+            cls.paralelo = sistema.data_structure
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.diretorio.cleanup()
+
+    def test_mesmas_linhas(self):
+        self.assertEqual(self.resultado, (len(self.serial.vendas), 1, 0))
+        self.assertEqual([registro(venda) for venda in self.paralelo.vendas],
+                         [registro(venda) for venda in self.serial.vendas])
+        self.assertEqual(list(self.paralelo.ids_linhas), list(self.serial.ids_linhas))
+
+    def test_mesmos_agregados(self):
+        divergencias = []
+        for nome in ('produtos', 'clientes', 'agregados_paises'):
+            DataStructure._comparar_registros(nome, getattr(self.paralelo, nome),
+                                              getattr(self.serial, nome), divergencias)
+        for granularidade, periodos in self.serial.rollups.items():
+            DataStructure._comparar_registros(granularidade, self.paralelo.rollups[granularidade],
+                                              periodos, divergencias)
+        self.assertEqual(divergencias, [])
+        for campo, soma in self.serial.somas.items():
+            self.assertAlmostEqual(self.paralelo.somas[campo], soma, places=4)
+
+        resultado = self.paralelo.verificar_consistencia()
+        self.assertTrue(resultado['consistente'], resultado['divergencias'][:5])
+
+    def test_mesmos_rankings_e_sketches(self):
+        paralelo, serial = RelatoriosAnalytics(self.paralelo), RelatoriosAnalytics(self.serial)
+        self.assertEqual(paralelo.ranking_paises_por_vendas(5), serial.ranking_paises_por_vendas(5))
+        self.assertEqual([codigo for codigo, _ in paralelo.ranking_produtos_mais_vendidos(10)],
+                         [codigo for codigo, _ in serial.ranking_produtos_mais_vendidos(10)])
+        # HyperLogLog mesclado = sketch da união: estimativas idênticas
+        for pais in ('france', 'germany', 'eire'):
+            self.assertEqual(self.paralelo.contar_distintos('pais', [pais], 'clientes'),
+                             self.serial.contar_distintos('pais', [pais], 'clientes'))
+
+
+if __name__ == '__main__':
+    unittest.main()
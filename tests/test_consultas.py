@@ -0,0 +1,96 @@
+"""
+Testes - Consultas contra a Força Bruta
+=======================================
+Filtros aleatórios (igualdade, 'in', faixas, palavras), combinados e com
+lápides no caminho: qualquer plano que o planejador escolher tem que
+devolver as mesmas linhas da filtragem linha a linha.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import random
+import unittest
+
+from app import tokenizar
+from auxiliares import PAISES, PALAVRAS, nova_estrutura, posicoes_ativas, registro
+
+
+class TesteConsultaForcaBruta(unittest.TestCase):
+    """Consulta (com qualquer plano escolhido) = filtragem linha a linha"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.aleatorio = random.Random(11)
+        cls.data = nova_estrutura(cls.aleatorio, 2000, armazenamento_colunar=True)
+        ativas = posicoes_ativas(cls.data)
+        cls.data.remover_vendas(cls.aleatorio.sample(ativas, 150))  # Lápides no caminho
+
+    def filtro_aleatorio(self):
+        aleatorio, vendas = self.aleatorio, self.data.vendas
+        exemplo = vendas[aleatorio.randrange(len(vendas))]
+        opcoes = [
+            ('country', '==', aleatorio.choice(PAISES[:-1]).lower()),
+            ('country', 'in', aleatorio.sample(PAISES[:-1], 2)),
+            ('stock_code', '==', exemplo['stock_code']),
+            ('stock_code', 'in', [exemplo['stock_code'], '20001', 'inexistente']),
+            ('invoice_no', '==', exemplo['invoice_no']),
+            ('customer_id', '!=', ''),
+            ('total', 'entre', sorted([aleatorio.uniform(-20, 300), aleatorio.uniform(-20, 300)])),
+            ('total', '>=', aleatorio.uniform(0, 400)),
+            ('total', '<', aleatorio.uniform(0, 50)),
+            ('quantity', '<=', aleatorio.randint(1, 10)),
+            ('unit_price', '>', aleatorio.uniform(0, 20)),
+            ('description', 'palavras', aleatorio.choice(PALAVRAS).lower()),
+            ('description', 'palavras', ' '.join(aleatorio.sample(PALAVRAS, 2))),
+        ]
+        return aleatorio.choice(opcoes)
+
+    @staticmethod
+    def atende(venda, filtro) -> bool:
+        campo, operador, valor = filtro
+        atual = venda[campo]
+        if operador == 'palavras':
+            return set(tokenizar(valor)) <= set(tokenizar(atual))
+        if campo == 'country':
+            atual = atual.casefold()
+            valor = [pais.casefold() for pais in valor] if operador == 'in' else valor.casefold()
+        if operador == '==':
+            return atual == valor
+        if operador == '!=':
+            return atual != valor
+        if operador == 'in':
+            return atual in valor
+        if operador == 'entre':
+            return valor[0] <= atual <= valor[1]
+        return {'<': atual < valor, '<=': atual <= valor, '>': atual > valor, '>=': atual >= valor}[operador]
+
+    def test_consultas_aleatorias(self):
+        vendas = [self.data.vendas[posicao] for posicao in posicoes_ativas(self.data)]
+        for rodada in range(300):
+            filtros = [self.filtro_aleatorio() for _ in range(self.aleatorio.randint(1, 3))]
+            consulta = self.data.consultar()
+            for filtro in filtros:
+                consulta.onde(*filtro)
+            esperadas = [venda for venda in vendas if all(self.atende(venda, f) for f in filtros)]
+
+            with self.subTest(rodada=rodada, filtros=filtros):
+                self.assertEqual(consulta.contar(), len(esperadas))
+                ordem = self.aleatorio.choice([None, 'total', 'quantity', 'invoice_date'])
+                if ordem is None:
+                    self.assertEqual(sorted(map(registro, consulta)), sorted(map(registro, esperadas)))
+                    continue
+
+                # Com empates a ordem entre iguais é livre: compara só as chaves
+                decrescente = self.aleatorio.random() < 0.5
+                consulta.ordenar_por(ordem, decrescente)
+                chaves = sorted((venda[ordem] for venda in esperadas), reverse=decrescente)
+                if self.aleatorio.random() < 0.5:
+                    pular, limite = self.aleatorio.randint(0, 5), self.aleatorio.randint(1, 20)
+                    consulta.pular(pular).limite(limite)
+                    chaves = chaves[pular:pular + limite]
+                self.assertEqual([venda[ordem] for venda in consulta], chaves)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Testes - Consistência das Estruturas
+====================================
+Sequências aleatórias (com semente fixa) de inserções, alterações,
+remoções, compactações e mesclagens; depois de cada passo,
+DataStructure.verificar_consistencia() recalcula tudo do zero e compara
+com o estado mantido incrementalmente.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import io
+import random
+import unittest
+from contextlib import redirect_stdout
+
+from app import DataStructure, EcommerceCRUD
+from auxiliares import COLUNAS, PALAVRAS, gerar_linhas, nova_estrutura, posicoes_ativas, registro
+
+
+# 🔧 Configurações exercitadas: armazenamento, remoção e heavy hitters
+CONFIGURACOES = [
+    {},
+    {'armazenamento_colunar': True},
+    {'armazenamento_colunar': True, 'remocao_logica': False},
+    {'armazenamento_colunar': True, 'heavy_hitters': True},
+]
+
+
+class TesteConsistenciaCRUD(unittest.TestCase):
+    """Operações aleatórias mantêm índices, agregados e sketches coerentes"""
+
+    def assertConsistente(self, data: DataStructure, passo: str):
+        resultado = data.verificar_consistencia()
+        self.assertTrue(resultado['consistente'], f"{passo}: {resultado['divergencias'][:5]}")
+
+    def test_operacoes_aleatorias(self):
+        for opcoes in CONFIGURACOES:
+            with self.subTest(**opcoes):
+                aleatorio = random.Random(7)
+                data = nova_estrutura(aleatorio, 300, **opcoes)
+                proxima = 300
+                self.assertConsistente(data, 'carga')
+
+                for passo in range(60):
+                    operacao = aleatorio.choice(
+                        ['venda', 'lote', 'alterar', 'alterar', 'remover', 'remover', 'compactar', 'mesclar'])
+                    ativas = posicoes_ativas(data)
+                    if operacao == 'venda':
+                        linha = gerar_linhas(aleatorio, 1, proxima)[0]
+                        self.assertTrue(data.adicionar_venda(dict(zip(COLUNAS, linha))))
+                        proxima += 1
+                    elif operacao == 'lote':
+                        quantidade = aleatorio.randint(1, 40)
+                        data.adicionar_vendas(gerar_linhas(aleatorio, quantidade, proxima),
+                                              COLUNAS, 2, somente_texto=True)
+                        proxima += quantidade
+                    elif operacao == 'alterar' and ativas:
+                        alteracoes = aleatorio.choice([
+                            {'quantity': aleatorio.randint(1, 30)},
+                            {'unit_price': round(aleatorio.uniform(0.1, 20), 2)},
+                            {'description': ' '.join(aleatorio.sample(PALAVRAS, 3))},
+                        ])
+                        data.atualizar_linha(aleatorio.choice(ativas), alteracoes)
+                    elif operacao == 'remover' and ativas:
+                        data.remover_vendas(aleatorio.sample(ativas, min(len(ativas), aleatorio.randint(1, 25))))
+                    elif operacao == 'compactar':
+                        data.compactar()
+                    elif operacao == 'mesclar':
+                        outra = nova_estrutura(aleatorio, aleatorio.randint(1, 50), **opcoes)
+                        data.mesclar(outra)
+                    self.assertConsistente(data, f"passo {passo} ({operacao})")
+
+                data.compactar()
+                self.assertConsistente(data, 'compactação final')
+                self.assertEqual(data.quantidade_vendas(), len(data.vendas))
+
+class TesteAlteracaoInvalida(unittest.TestCase):
+    """Alteração recusada não deixa a linha mudada com índices e agregados velhos"""
+
+    def test_valores_convertidos_ou_recusados(self):
+        for opcoes in CONFIGURACOES[:2]:
+            with self.subTest(**opcoes):
+                aleatorio = random.Random(29)
+                data = nova_estrutura(aleatorio, 200, **opcoes)
+                data.remover_vendas([3])
+                antes = [registro(venda) for venda in data.vendas]
+                somas = dict(data.somas)
+
+                for posicao, alteracoes in ((0, {'quantity': 'muitas'}),
+                                            (0, {'unit_price': '2.50', 'quantity': None}),
+                                            (0, {'description': 'NOVA', 'country': 'Brazil'}),
+                                            (0, {'total': 1.0}),
+                                            (3, {'quantity': 2})):
+                    with self.assertRaises((ValueError, TypeError), msg=alteracoes):
+                        data.atualizar_linha(posicao, alteracoes)
+                self.assertEqual([registro(venda) for venda in data.vendas], antes)
+                self.assertEqual(data.somas, somas)
+
+                # Texto numérico é convertido como na inserção
+                data.atualizar_linha(1, {'quantity': '5', 'unit_price': '2.5', 'description': 'RED BAG'})
+                self.assertEqual((data.vendas[1]['quantity'], data.vendas[1]['unit_price'],
+                                  data.vendas[1]['total']), (5, 2.5, 12.5))
+                self.assertTrue(data.verificar_consistencia()['consistente'])
+
+                # Pelo CRUD o erro vira False, com a estrutura intacta
+                crud = EcommerceCRUD(data)
+                with redirect_stdout(io.StringIO()):
+                    self.assertFalse(crud.atualizar_venda(data.vendas[2]['invoice_no'], {'quantity': 'x'}, True))
+                self.assertTrue(data.verificar_consistencia()['consistente'])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Testes - FP-growth contra a Enumeração Exaustiva
+================================================
+Os conjuntos frequentes (e seus suportes) têm que ser os mesmos da
+contagem de todas as combinações de cada cesta, e as regras têm que
+bater com as cestas que contêm os itens.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import random
+import unittest
+from collections import Counter
+from itertools import combinations
+
+from app import MineradorFPGrowth
+
+
+class TesteFPGrowth(unittest.TestCase):
+
+    @staticmethod
+    def exaustivo(transacoes, contagem_minima: int, tamanho_maximo=None):
+        contagens = Counter()
+        for cesta in transacoes:
+            itens = sorted(set(cesta))
+            for tamanho in range(1, min(len(itens), tamanho_maximo or len(itens)) + 1):
+                contagens.update(combinations(itens, tamanho))
+        return {conjunto: contagem for conjunto, contagem in contagens.items() if contagem >= contagem_minima}
+
+    def test_conjuntos_frequentes(self):
+        aleatorio = random.Random(13)
+        for rodada in range(20):
+            itens = list(range(aleatorio.randint(4, 12)))
+            transacoes = [aleatorio.sample(itens, aleatorio.randint(1, min(6, len(itens))))
+                          for _ in range(aleatorio.randint(5, 300))]
+            suporte = aleatorio.choice([1, 2, 0.05, 0.2])
+            tamanho_maximo = aleatorio.choice([None, 2, 3])
+            minerador = MineradorFPGrowth(transacoes, suporte, tamanho_maximo)
+            with self.subTest(rodada=rodada, suporte=suporte, tamanho_maximo=tamanho_maximo):
+                self.assertEqual(minerador.itemsets_frequentes(),
+                                 self.exaustivo(transacoes, minerador.contagem_minima, tamanho_maximo))
+
+    def test_regras(self):
+        aleatorio = random.Random(17)
+        transacoes = [aleatorio.sample(range(8), aleatorio.randint(1, 4)) for _ in range(400)]
+        minerador = MineradorFPGrowth(transacoes, 0.02)
+        for regra in minerador.regras(0.1):
+            com_todos = sum(1 for cesta in transacoes
+                            if set(regra['antecedente']) | set(regra['consequente']) <= set(cesta))
+            com_antecedente = sum(1 for cesta in transacoes if set(regra['antecedente']) <= set(cesta))
+            self.assertEqual(regra['cestas'], com_todos)
+            self.assertAlmostEqual(regra['confianca'], com_todos / com_antecedente)
+            self.assertGreaterEqual(regra['confianca'], 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
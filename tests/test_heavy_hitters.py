@@ -0,0 +1,75 @@
+"""
+Testes - Count-Min e Space-Saving contra a Contagem Exata
+=========================================================
+- Count-Min: real ≤ estimativa ≤ real + ε·N (hash estável: determinístico)
+- Space-Saving: contagem - erro ≤ real ≤ contagem, e toda chave acima
+  de N / capacidade está entre as monitoradas
+- Monitor dentro da estrutura: remoções e alterações descontadas
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import random
+import unittest
+from collections import Counter
+
+from app import CountMinSketch, SpaceSaving
+from auxiliares import COLUNAS, gerar_linhas, nova_estrutura, posicoes_ativas
+
+
+class TesteHeavyHitters(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        aleatorio = random.Random(2)
+        cls.pares = [(f'p{int(aleatorio.paretovariate(1.2))}', aleatorio.randint(1, 12))
+                     for _ in range(100_000)]
+        cls.reais = Counter()
+        for chave, peso in cls.pares:
+            cls.reais[chave] += peso
+
+    def test_count_min(self):
+        sketch = CountMinSketch(*CountMinSketch.dimensoes_para_erro(0.01, 0.01))
+        sketch.adicionar_varios(self.pares)
+        limite = sketch.erro * sketch.total
+        for chave, real in self.reais.items():
+            self.assertLessEqual(real, sketch.estimar(chave), chave)
+            self.assertLessEqual(sketch.estimar(chave), real + limite, chave)
+
+    def test_space_saving(self):
+        sketch = SpaceSaving(100)
+        sketch.adicionar_varios(self.pares)
+        for chave, contagem in sketch.contagens.items():
+            self.assertLessEqual(contagem - sketch.erros[chave], self.reais[chave], chave)
+            self.assertLessEqual(self.reais[chave], contagem, chave)
+            self.assertLessEqual(sketch.erros[chave], sketch.erro_maximo)
+        frequentes = {chave for chave, real in self.reais.items() if real > sketch.erro_maximo}
+        self.assertLessEqual(frequentes, set(sketch.contagens))
+
+    def test_monitor_com_remocoes(self):
+        """Na estrutura, remoções e alterações descontam do monitor"""
+        aleatorio = random.Random(8)
+        data = nova_estrutura(aleatorio, 4000, armazenamento_colunar=True, heavy_hitters=True)
+        data.remover_vendas(aleatorio.sample(posicoes_ativas(data), 800))
+        for posicao in aleatorio.sample(posicoes_ativas(data), 200):
+            data.atualizar_linha(posicao, {'quantity': aleatorio.randint(1, 40)})
+        data.adicionar_vendas(gerar_linhas(aleatorio, 500, 4000), COLUNAS, 2,
+                              somente_texto=True)
+
+        monitor = data.heavy_hitters
+        reais = Counter()
+        for posicao in posicoes_ativas(data):
+            venda = data.vendas[posicao]
+            reais[venda['stock_code']] += venda['quantity']
+        limites = monitor.limites_de_erro('stock_code')
+        for chave, real in reais.items():
+            estimativa = monitor.frequencias['stock_code'].estimar(chave)
+            self.assertLessEqual(real, estimativa + 1e-6, chave)
+            self.assertLessEqual(estimativa, real + limites['erro_count_min'], chave)
+        for chave, estimativa in monitor.maiores('stock_code', 10):
+            self.assertLessEqual(abs(estimativa - reais[chave]), limites['erro_space_saving'], chave)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Testes - HyperLogLog contra a Contagem Exata
+============================================
+A estimativa de distintos tem que ficar a até 4 erros padrão do valor
+real, e mesclar sketches (esparsos ou densos) tem que dar o mesmo
+resultado do sketch da união.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import random
+import unittest
+
+from app import HyperLogLog
+from auxiliares import nova_estrutura
+
+
+class TesteHyperLogLog(unittest.TestCase):
+
+    def test_erro_dentro_do_limite(self):
+        for precisao in (8, 11, 14):
+            for quantidade in (50, 1_000, 20_000, 100_000):
+                with self.subTest(precisao=precisao, quantidade=quantidade):
+                    sketch = HyperLogLog(precisao)
+                    sketch.adicionar_varios(f'cliente-{i}' for i in range(quantidade))
+                    sketch.adicionar_varios(f'cliente-{i}' for i in range(0, quantidade, 3))  # Repetidos
+                    self.assertLessEqual(abs(sketch.estimar() - quantidade),
+                                         4 * sketch.erro_padrao * quantidade + 1)
+
+    def test_mesclar_equivale_a_uniao(self):
+        # Esparso + esparso, esparso + denso e denso + denso
+        for tamanhos in ((30, 40), (30, 5_000), (5_000, 8_000)):
+            with self.subTest(tamanhos=tamanhos):
+                a, b, uniao = HyperLogLog(), HyperLogLog(), HyperLogLog()
+                valores_a = [f'a-{i}' for i in range(tamanhos[0])]
+                valores_b = [f'b-{i}' for i in range(tamanhos[1])] + valores_a[:10]
+                a.adicionar_varios(valores_a)
+                b.adicionar_varios(valores_b)
+                uniao.adicionar_varios(valores_a + valores_b)
+                a.mesclar(b)
+                self.assertEqual(a.estimar(), uniao.estimar())
+
+    def test_distintos_da_estrutura(self):
+        aleatorio = random.Random(21)
+        data = nova_estrutura(aleatorio, 3000, armazenamento_colunar=True)
+        for pais in ('France', 'Germany', 'EIRE'):
+            with self.subTest(pais=pais):
+                exato = data.contar_distintos('pais', [pais], 'clientes', exato=True)
+                aproximado = data.contar_distintos('pais', [pais], 'clientes')
+                erro = HyperLogLog(data.precisao_hll).erro_padrao
+                self.assertLessEqual(abs(aproximado - exato), 4 * erro * exato + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
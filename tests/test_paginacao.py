@@ -0,0 +1,61 @@
+"""
+Testes - Paginação por Cursor com a Base Mudando
+================================================
+Entre uma página e outra entram linhas novas, saem linhas (já vistas ou
+não) e às vezes a base é compactada: nenhuma linha pode aparecer duas
+vezes, e nenhuma linha que existia no início e não foi removida pode
+ser pulada.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import random
+import unittest
+
+from auxiliares import COLUNAS, gerar_linhas, nova_estrutura, posicoes_ativas
+
+
+class TestePaginacaoComMutacao(unittest.TestCase):
+    """Cursor por chave: nada repetido e nada pulado entre páginas"""
+
+    def percorrer(self, ordenar_por, decrescente: bool, semente: int):
+        aleatorio = random.Random(semente)
+        data = nova_estrutura(aleatorio, 1200, armazenamento_colunar=True)
+        iniciais = set(data.ids_linhas)
+        removidos, vistos, chave = set(), [], None
+        proxima = 1200
+
+        while True:
+            posicoes, chave = data.pagina_de_vendas(25, ordenar_por, decrescente, chave)
+            pagina = [data.ids_linhas[posicao] for posicao in posicoes]
+            self.assertFalse(removidos.intersection(pagina), "linha removida na página")
+            vistos.extend(pagina)
+            if chave is None:
+                break
+
+            # 🔀 Entre páginas: inserções, remoções (vistas ou não) e compactação
+            quantidade = aleatorio.randint(0, 15)
+            data.adicionar_vendas(gerar_linhas(aleatorio, quantidade, proxima), COLUNAS, 2, somente_texto=True)
+            proxima += quantidade
+            ativas = posicoes_ativas(data)
+            escolhidas = aleatorio.sample(ativas, min(len(ativas), aleatorio.randint(0, 10)))
+            removidos.update(data.ids_linhas[posicao] for posicao in escolhidas)
+            data.remover_vendas(escolhidas)
+            if aleatorio.random() < 0.2:
+                data.compactar()
+
+        self.assertEqual(len(vistos), len(set(vistos)), "linha repetida entre páginas")
+        self.assertEqual(iniciais - removidos - set(vistos), set(), "linha pulada entre páginas")
+
+    def test_ordem_original(self):
+        self.percorrer(None, False, 3)
+        self.percorrer(None, True, 4)
+
+    def test_ordem_de_total(self):
+        self.percorrer('total', False, 5)
+        self.percorrer('total', True, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
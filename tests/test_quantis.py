@@ -0,0 +1,56 @@
+"""
+Testes - Sketch KLL contra os Percentis Exatos
+==============================================
+O erro de rank de cada percentil tem que ficar abaixo de 3 × 1,7 / k
+(o sorteio da compactação varia de uma execução para outra), sozinho
+ou depois de mesclar vários sketches.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import random
+import unittest
+from bisect import bisect_left, bisect_right
+
+from app import SketchQuantis
+
+
+class TesteSketchQuantis(unittest.TestCase):
+
+    def erro_de_rank(self, sketch: SketchQuantis, ordenados) -> float:
+        fracoes = [i / 100 for i in range(1, 100)]
+        pior = 0.0
+        for fracao, valor in zip(fracoes, sketch.quantis(fracoes)):
+            # Com valores repetidos qualquer rank da faixa do valor serve
+            baixo = bisect_left(ordenados, valor) / len(ordenados)
+            alto = bisect_right(ordenados, valor) / len(ordenados)
+            pior = max(pior, 0 if baixo <= fracao <= alto else min(abs(baixo - fracao), abs(alto - fracao)))
+        return pior
+
+    def test_erro_de_rank(self):
+        aleatorio = random.Random(5)
+        for k in (50, 200):
+            with self.subTest(k=k):
+                dados = [aleatorio.lognormvariate(2, 1.5) for _ in range(100_000)]
+                sketch = SketchQuantis(k)
+                for inicio in range(0, len(dados), 1_000):
+                    sketch.adicionar_varios(dados[inicio:inicio + 1_000])
+                self.assertLessEqual(self.erro_de_rank(sketch, sorted(dados)), 3 * 1.7 / k)
+                self.assertEqual(sketch.quantis([0, 1]), [min(dados), max(dados)])
+
+    def test_mesclar(self):
+        aleatorio = random.Random(6)
+        partes = [[aleatorio.uniform(0, 1_000) for _ in range(20_000)] for _ in range(4)]
+        sketch = SketchQuantis()
+        for parte in partes:
+            outro = SketchQuantis()
+            outro.adicionar_varios(parte)
+            sketch.mesclar(outro)
+        todos = sorted(valor for parte in partes for valor in parte)
+        self.assertEqual(len(sketch), len(todos))
+        self.assertLessEqual(self.erro_de_rank(sketch, todos), 3 * 1.7 / sketch.k)
+
+
+if __name__ == '__main__':
+    unittest.main()
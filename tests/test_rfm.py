@@ -0,0 +1,83 @@
+"""
+Testes - Notas RFM com Valores Empatados
+========================================
+Clientes com o mesmo valor (uma única compra, mesma data da última
+compra) têm que receber a mesma nota e cair no mesmo segmento, seja
+qual for o customer_id.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import random
+import unittest
+from collections import Counter, defaultdict
+
+from app import QUANTIS_RFM, DataStructure, RelatoriosAnalytics, _notas_por_quantil
+from auxiliares import COLUNAS
+
+
+class TesteNotasPorQuantil(unittest.TestCase):
+
+    def assertCoerente(self, valores, notas):
+        """Valores iguais, notas iguais; valor maior, nota maior ou igual"""
+        por_valor = defaultdict(set)
+        for chave, valor in valores.items():
+            por_valor[valor].add(notas[chave])
+        self.assertTrue(all(len(distintas) == 1 for distintas in por_valor.values()), por_valor)
+        sequencia = [por_valor[valor].pop() for valor in sorted(por_valor)]
+        self.assertEqual(sequencia, sorted(sequencia))
+        self.assertTrue(all(1 <= nota <= QUANTIS_RFM for nota in sequencia))
+
+    def test_sem_empates_quintis_iguais(self):
+        valores = {f'c{i:03d}': i * 1.5 for i in range(100)}
+        notas = _notas_por_quantil(valores)
+        self.assertCoerente(valores, notas)
+        self.assertEqual(Counter(notas.values()), {nota: 20 for nota in range(1, QUANTIS_RFM + 1)})
+
+    def test_empates_dividem_a_nota(self):
+        # 80% de clientes com uma única compra, como no dataset real
+        valores = {f'c{i:04d}': 1 for i in range(800)}
+        valores.update({f'd{i:04d}': 2 + i % 7 for i in range(200)})
+        notas = _notas_por_quantil(valores)
+        self.assertCoerente(valores, notas)
+        self.assertEqual({notas[f'c{i:04d}'] for i in range(800)}, {1})
+
+    def test_aleatorio(self):
+        aleatorio = random.Random(19)
+        for rodada in range(50):
+            valores = {f'c{i}': aleatorio.randint(0, aleatorio.choice([2, 10, 1000]))
+                       for i in range(aleatorio.randint(1, 300))}
+            with self.subTest(rodada=rodada):
+                self.assertCoerente(valores, _notas_por_quantil(valores))
+
+    def test_vazio(self):
+        self.assertEqual(_notas_por_quantil({}), {})
+
+
+class TesteSegmentacaoRFM(unittest.TestCase):
+
+    def test_clientes_identicos_mesmo_segmento(self):
+        aleatorio = random.Random(23)
+        linhas = []
+        for i in range(600):
+            # Muitos clientes de uma única fatura, poucas datas distintas
+            cliente = str(12000 + i)
+            for fatura in range(1 if i < 450 else aleatorio.randint(2, 6)):
+                data = f'{aleatorio.choice([3, 6, 9, 12])}/1/2011 10:00'
+                linhas.append([f'{540000 + 10 * i + fatura}', '22423', 'REGENCY CAKESTAND', '2',
+                               data, f'{aleatorio.uniform(1, 20):.2f}', cliente, 'France'])
+        data = DataStructure(armazenamento_colunar=True)
+        data.adicionar_vendas(linhas, COLUNAS, 2, somente_texto=True)
+
+        grupos = defaultdict(set)
+        for linha in RelatoriosAnalytics(data).segmentacao_rfm():
+            grupos[(linha['recencia_dias'], linha['frequencia'])].add(
+                (linha['r'], linha['f'], linha['segmento']))
+        self.assertTrue(grupos)
+        for chave, resultados in grupos.items():
+            self.assertEqual(len(resultados), 1, f"{chave}: {resultados}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Testes - Snapshot Binário (Ida e Volta)
+=======================================
+Salvar e restaurar devolve o mesmo estado (linhas, lápides, agregados
+e índices), respeita a configuração da instância que restaura e recusa
+snapshots obsoletos ou montados com outra configuração.
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import csv
+import io
+import os
+import random
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from app import DataStructure, RelatoriosAnalytics
+from auxiliares import COLUNAS, gerar_linhas, posicoes_ativas, registro
+
+
+class TesteSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.origem = os.path.join(self.diretorio.name, 'vendas.csv')
+        self.snapshot = os.path.join(self.diretorio.name, 'vendas.snapshot')
+        self.aleatorio = random.Random(41)
+        linhas = gerar_linhas(self.aleatorio, 3000)
+        with open(self.origem, 'w', newline='', encoding='latin-1') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(COLUNAS)
+            escritor.writerows(linhas)
+
+        self.data = DataStructure(armazenamento_colunar=True)
+        self.data.adicionar_vendas(linhas, COLUNAS, 2, somente_texto=True)
+        self.data.remover_vendas(self.aleatorio.sample(posicoes_ativas(self.data), 200))  # Lápides
+        self.assertTrue(self.data.salvar_snapshot(self.origem, self.snapshot))
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def restaurar(self, **opcoes) -> DataStructure:
+        restaurada = DataStructure(**opcoes)
+        with redirect_stdout(io.StringIO()):
+            self.ok = restaurada.restaurar_snapshot(self.origem, self.snapshot)
+        return restaurada
+
+    def assertConsistente(self, data: DataStructure):
+        resultado = data.verificar_consistencia()
+        self.assertTrue(resultado['consistente'], resultado['divergencias'][:5])
+
+    def test_ida_e_volta(self):
+        restaurada = self.restaurar(armazenamento_colunar=True, limiar_compactacao=0.9)
+        self.assertTrue(self.ok)
+        self.assertConsistente(restaurada)
+        self.assertEqual(restaurada.removidas, self.data.removidas)
+        self.assertEqual(restaurada.somas, self.data.somas)
+        self.assertEqual([registro(venda) for venda in restaurada.vendas_ativas()],
+                         [registro(venda) for venda in self.data.vendas_ativas()])
+        self.assertEqual(RelatoriosAnalytics(restaurada).ranking_paises_por_vendas(5),
+                         RelatoriosAnalytics(self.data).ranking_paises_por_vendas(5))
+        consulta = lambda data: [registro(venda) for venda in data.consultar()
+                                 .onde('description', 'palavras', 'heart').onde('country', '==', 'france')]
+        self.assertEqual(consulta(restaurada), consulta(self.data))
+        self.assertEqual(restaurada.sugerir_paises('Frnce'), self.data.sugerir_paises('Frnce'))
+
+        # ⚙️ Configuração da instância prevalece sobre a do snapshot
+        self.assertEqual(restaurada.limiar_compactacao, 0.9)
+
+        # Continua mutável depois de restaurada
+        restaurada.adicionar_vendas(gerar_linhas(self.aleatorio, 50, 3000), COLUNAS, 2, somente_texto=True)
+        restaurada.remover_vendas(self.aleatorio.sample(posicoes_ativas(restaurada), 30))
+        restaurada.compactar()
+        self.assertConsistente(restaurada)
+
+    def test_compacta_sem_remocao_logica(self):
+        restaurada = self.restaurar(armazenamento_colunar=True, remocao_logica=False)
+        self.assertTrue(self.ok)
+        self.assertFalse(restaurada.removidas)
+        self.assertEqual(restaurada.quantidade_vendas(), self.data.quantidade_vendas())
+        self.assertConsistente(restaurada)
+
+    def test_recusa_outra_configuracao(self):
+        for opcoes in ({}, {'armazenamento_colunar': True, 'heavy_hitters': True},
+                       {'armazenamento_colunar': True, 'precisao_hll': 8}):
+            with self.subTest(**opcoes):
+                restaurada = self.restaurar(**opcoes)
+                self.assertFalse(self.ok)
+                self.assertEqual(len(restaurada.vendas), 0)
+
+    def test_recusa_csv_alterado(self):
+        with open(self.origem, 'a', newline='', encoding='latin-1') as arquivo:
+            csv.writer(arquivo).writerows(gerar_linhas(self.aleatorio, 1, 3000))
+        self.restaurar(armazenamento_colunar=True)
+        self.assertFalse(self.ok)
+
+
+if __name__ == '__main__':
+    unittest.main()